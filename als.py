@@ -0,0 +1,240 @@
+# ===========================
+# Parallel ALS Matrix Factorization
+# (biased MF on CSR-grouped ratings, all cores)
+# ===========================
+
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+Prediction = namedtuple("Prediction", ["uid", "iid", "r_ui", "est", "details"])
+
+
+def _group_by(keys, values, ratings, n_keys):
+    """CSR-style (indptr, indices, data) of `values` / `ratings` grouped by key.
+
+    Unlike a scipy CSR matrix, repeated (key, value) pairs stay separate
+    entries, the way surprise treats repeated ratings.
+    """
+    order = np.argsort(keys, kind="stable")
+    indptr = np.searchsorted(keys[order], np.arange(n_keys + 1))
+    return indptr, values[order], ratings[order]
+
+
+def _solve_rows(indptr, indices, targets, fixed, penalties, rows, out):
+    """Ridge solutions for a block of rows that all have at least one rating.
+
+    Row u solves (X_u^T X_u + D_u) x_u = X_u^T y_u, where X_u stacks
+    `fixed[j]` for the columns j it rated, y_u the matching targets and the
+    diagonal D_u = n_u * per_rating + constant, from `penalties` =
+    (per_rating, constant), one entry per column of `fixed`. Rows are padded to the
+    block's longest row so the normal equations of the whole block are built
+    and solved with batched matmul / solve calls. When rows have fewer
+    ratings than factors (most users in sparse data) the equivalent dual
+    system, n_u x n_u instead of k x k, is solved instead.
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    width = int(lengths.max())
+    offsets = np.arange(width)
+    mask = offsets[None, :] < lengths[:, None]
+    positions = np.where(mask, starts[:, None] + offsets[None, :], 0)
+
+    X = fixed[indices[positions]] * mask[..., None]
+    y = (targets[positions] * mask)[..., None]
+
+    per_rating, constant = penalties
+    diagonal = lengths[:, None] * per_rating + constant
+
+    if width < fixed.shape[1]:
+        # With Z = X D^-1/2: x = D^-1/2 Z^T (Z Z^T + I)^-1 y. Padded rows of X
+        # are zero, so their dual weights come out zero
+        scale = 1.0 / np.sqrt(diagonal[:, None, :])
+        Z = X * scale
+        kernel = np.matmul(Z, Z.transpose(0, 2, 1)) + np.eye(width)
+        out[rows] = (np.matmul(Z.transpose(0, 2, 1), np.linalg.solve(kernel, y)) * scale.transpose(0, 2, 1))[..., 0]
+    else:
+        Xt = X.transpose(0, 2, 1)
+        gram = np.matmul(Xt, X)
+        gram[:, np.arange(fixed.shape[1]), np.arange(fixed.shape[1])] += diagonal
+        out[rows] = np.linalg.solve(gram, np.matmul(Xt, y))[..., 0]
+
+
+def _row_blocks(indptr, block_size, block_cells):
+    """Rows with ratings, sorted by count and cut into blocks of similar length.
+
+    A block holds at most `block_size` rows and, padded to its longest row,
+    about `block_cells` ratings, which bounds per-thread memory.
+    """
+    counts = np.diff(indptr)
+    rows = np.flatnonzero(counts)
+    rows = rows[np.argsort(counts[rows], kind="stable")]
+    sorted_counts = counts[rows]
+
+    blocks, start = [], 0
+    while start < len(rows):
+        stop = min(len(rows), start + block_size)
+        while stop - start > 1 and (stop - start) * sorted_counts[stop - 1] > block_cells:
+            stop = start + max(1, (stop - start) // 2)
+        blocks.append(rows[start:stop])
+        start = stop
+    return blocks
+
+
+def _penalty_terms(n_factors, reg, reg_bias):
+    """(per-rating, constant) ridge penalties for the columns [factors, bias]"""
+    # Factors: ALS-WR penalty growing with the rating count; biases: constant
+    return (np.append(np.full(n_factors, reg), 0.0),
+            np.append(np.zeros(n_factors), reg_bias))
+
+
+def _solve_side(pool, grouped, blocks, fixed_factors, fixed_bias, global_mean, penalties):
+    """Solve every row of `grouped` for (factors, bias) with the other side fixed"""
+    indptr, indices, ratings = grouped
+    # Targets with the global mean and the fixed side's biases removed
+    targets = ratings - global_mean - fixed_bias[indices]
+    fixed = np.hstack([fixed_factors, np.ones((len(fixed_factors), 1))])
+
+    solution = np.zeros((len(indptr) - 1, fixed.shape[1]))
+    list(pool.map(
+        lambda block: _solve_rows(indptr, indices, targets, fixed, penalties, block, solution),
+        blocks,
+    ))
+    return np.ascontiguousarray(solution[:, :-1]), solution[:, -1].copy()
+
+
+def fold_in(indptr, indices, ratings, fixed_factors, fixed_bias, global_mean,
+            reg=0.1, reg_bias=5.0, n_jobs=None, block_size=4096, block_cells=1 << 18):
+    """Factors and biases for new or updated rows against a fixed other side.
+
+    One ALS half-step restricted to the given rows (a CSR-style grouping of
+    their ratings): row u gets the ridge solution [p_u, b_u] for
+    r - global_mean - fixed_bias ~ fixed_factors . p_u + b_u, the same
+    problem `ALSFactorizer` solves. Rows without ratings come back as zeros.
+    Used to add users and items to a trained model without refitting.
+    """
+    fixed_factors = np.asarray(fixed_factors)
+    penalties = _penalty_terms(fixed_factors.shape[1], reg, reg_bias)
+    with ThreadPoolExecutor(n_jobs or os.cpu_count()) as pool:
+        return _solve_side(pool, (indptr, indices, np.asarray(ratings, dtype=np.float64)),
+                           _row_blocks(indptr, block_size, block_cells),
+                           fixed_factors, np.asarray(fixed_bias), global_mean, penalties)
+
+
+def fold_in_rows(indptr, indices, ratings, fixed_factors, fixed_bias, global_mean, reg=0.1, reg_bias=5.0):
+    """`fold_in` for a small batch of rows, solved in the calling thread.
+
+    Meant for request-time fold-in (e.g. cold-start sessions): no thread
+    pool and no blocking, the rows are solved as one batch. `indices` index
+    into `fixed_factors` / `fixed_bias`, so a caller can pass just the
+    gathered rows it needs with local indices. Returns (factors, biases);
+    rows without ratings come back as zeros.
+    """
+    fixed_factors = np.asarray(fixed_factors, dtype=np.float64)
+    targets = np.asarray(ratings, dtype=np.float64) - global_mean - np.asarray(fixed_bias)[indices]
+    fixed = np.hstack([fixed_factors, np.ones((len(fixed_factors), 1))])
+
+    solution = np.zeros((len(indptr) - 1, fixed.shape[1]))
+    rows = np.flatnonzero(np.diff(indptr))
+    if len(rows):
+        _solve_rows(indptr, indices, targets, fixed, _penalty_terms(fixed_factors.shape[1], reg, reg_bias),
+                    rows, solution)
+    return solution[:, :-1], solution[:, -1]
+
+
+class ALSFactorizer:
+    """Biased matrix factorization r_ui ~ mu + bu + bi + pu . qi, fitted by ALS.
+
+    Each half-step fixes one side and solves every user (or item) exactly:
+    the bias rides along as an extra factor, i.e. users solve for [pu, bu]
+    against item vectors [qi, 1] and items for [qi, bi] against [pu, 1].
+    Regularisation is scaled by each row's rating count (ALS-WR). Rows are
+    grouped by rating count into blocks that are solved in batches, spread
+    over a thread pool (NumPy releases the GIL in matmul and solve), so all
+    cores are used.
+
+    Factors are indexed by the raw ids passed to `fit` (the encoded `user` /
+    `item` codes), and `predict(uid, iid).est` mirrors surprise's SVD, so
+    the model drops into Step 2 and `HybridScorer.from_factors`.
+    """
+
+    def __init__(self, n_factors=50, reg=0.1, reg_bias=5.0, n_iters=5, init_std=0.1, rating_scale=(1, 5),
+                 n_jobs=None, block_size=4096, block_cells=1 << 18, seed=42, verbose=False):
+        self.n_factors = n_factors
+        self.reg = reg
+        self.reg_bias = reg_bias
+        self.n_iters = n_iters
+        self.init_std = init_std
+        self.rating_scale = rating_scale
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.block_size = block_size
+        self.block_cells = block_cells
+        self.seed = seed
+        self.verbose = verbose
+
+    # ---------- Training ----------
+
+    def fit(self, users, items, ratings, n_users=None, n_items=None):
+        """Fit on aligned (user code, item code, rating) arrays"""
+        users = np.asarray(users, dtype=np.int64)
+        items = np.asarray(items, dtype=np.int64)
+        ratings = np.asarray(ratings, dtype=np.float64)
+        n_users = n_users or int(users.max()) + 1
+        n_items = n_items or int(items.max()) + 1
+        return self._fit_grouped(_group_by(users, items, ratings, n_users), _group_by(items, users, ratings, n_items),
+                                 (users, items, ratings))
+
+    def fit_interactions(self, store):
+        """Fit on an `InteractionStore`, using its CSR / CSC matrices as the per-user / per-item groupings.
+
+        Building the CSR sums the ratings of repeated (user, item) pairs, so
+        the store should hold deduplicated pairs (as the pipeline's does).
+        `fit` keeps repeats as separate ratings instead.
+        """
+        csr, csc = store.csr, store.csc
+        return self._fit_grouped((csr.indptr, csr.indices, csr.data.astype(np.float64)),
+                                 (csc.indptr, csc.indices, csc.data.astype(np.float64)),
+                                 (store.users, store.items, store.ratings))
+
+    def _fit_grouped(self, by_user, by_item, training):
+        users, items, ratings = training
+        n_items = len(by_item[0]) - 1
+        self.global_mean = float(by_user[2].mean())
+
+        rng = np.random.default_rng(self.seed)
+        self.qi = rng.normal(0, self.init_std, (n_items, self.n_factors))
+        self.bi = np.zeros(n_items)
+
+        penalties = _penalty_terms(self.n_factors, self.reg, self.reg_bias)
+        user_blocks = _row_blocks(by_user[0], self.block_size, self.block_cells)
+        item_blocks = _row_blocks(by_item[0], self.block_size, self.block_cells)
+        with ThreadPoolExecutor(self.n_jobs) as pool:
+            for iteration in range(self.n_iters):
+                self.pu, self.bu = _solve_side(pool, by_user, user_blocks, self.qi, self.bi,
+                                               self.global_mean, penalties)
+                self.qi, self.bi = _solve_side(pool, by_item, item_blocks, self.pu, self.bu,
+                                               self.global_mean, penalties)
+                if self.verbose:
+                    rmse = np.sqrt(np.mean((self.predict_batch(users, items) - ratings) ** 2))
+                    print(f"   ALS iteration {iteration + 1}/{self.n_iters}: train RMSE {rmse:.4f}")
+        return self
+
+    # ---------- Prediction ----------
+
+    def predict_batch(self, users, items):
+        """Clipped estimates for aligned user / item code arrays"""
+        users = np.asarray(users, dtype=np.int64)
+        items = np.asarray(items, dtype=np.int64)
+        est = np.einsum("ij,ij->i", self.pu[users], self.qi[items])
+        est += self.bu[users] + self.bi[items] + self.global_mean
+        low, high = self.rating_scale
+        return np.clip(est, low, high)
+
+    def predict(self, uid, iid, r_ui=None):
+        """Single estimate in the shape of surprise's `predict` (use `.est`)"""
+        known = 0 <= uid < len(self.pu) and 0 <= iid < len(self.qi)
+        est = float(self.predict_batch([uid], [iid])[0]) if known else float(
+            np.clip(self.global_mean, *self.rating_scale))
+        return Prediction(uid, iid, r_ui, est, {"was_impossible": not known})
@@ -0,0 +1,212 @@
+# ===========================
+# Approximate Nearest-Neighbour Index
+# (NumPy IVF for candidate generation)
+# ===========================
+
+import json
+import os
+
+import numpy as np
+
+from retrieval import top_n_indices
+
+
+class IVFIndex:
+    """Inverted-file (IVF) index over item vectors, implemented with NumPy.
+
+    Vectors are clustered with spherical k-means into `n_lists` inverted
+    lists. A query only scans the `n_probe` lists whose centroids match it
+    best, so `n_probe` is the recall/latency knob: `n_probe == n_lists` is an
+    exact scan.
+
+    metric="ip" ranks by inner product (maximum inner product search). The
+    vectors are lifted onto a sphere with one extra coordinate
+    sqrt(M^2 - |x|^2) before clustering so that inner-product ranking becomes
+    angular. metric="cosine" ranks by cosine similarity.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, metric="ip", kmeans_iters=10,
+                 train_size=None, seed=42):
+        if metric not in ("ip", "cosine"):
+            raise ValueError(f"Unknown metric: {metric}")
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.metric = metric
+        self.kmeans_iters = kmeans_iters
+        self.train_size = train_size
+        self.seed = seed
+
+        self.centroids = None
+        self.vectors = None    # item vectors, permuted into list order
+        self.ids = None        # original item index of each row in `vectors`
+        self.offsets = None    # list l occupies rows offsets[l]:offsets[l + 1]
+        self.max_norm = None
+
+    # ---------- Build ----------
+
+    def _to_sphere(self, vectors):
+        if self.metric == "cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            return vectors / np.maximum(norms, 1e-12)
+        sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+        extra = np.sqrt(np.maximum(self.max_norm ** 2 - sq_norms, 0.0))
+        return np.hstack([vectors, extra[:, None]]) / max(self.max_norm, 1e-12)
+
+    def _query_to_sphere(self, queries):
+        if self.metric == "ip":
+            queries = np.hstack([queries, np.zeros((len(queries), 1), dtype=queries.dtype)])
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        return queries / np.maximum(norms, 1e-12)
+
+    def _kmeans(self, points, n_lists, rng):
+        """Spherical k-means: points and centroids stay on the unit sphere"""
+        centroids = points[rng.choice(len(points), n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assign = np.argmax(points @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, points)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty lists with random points
+            sums[empty] = points[rng.choice(len(points), int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+        return centroids
+
+    def build(self, vectors):
+        """Cluster `vectors` (n_items, dim) and fill the inverted lists"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        n_lists = self.n_lists or max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        rng = np.random.default_rng(self.seed)
+
+        self.max_norm = float(np.linalg.norm(vectors, axis=1).max()) if n else 1.0
+        sphere = self._to_sphere(vectors)
+
+        train_size = self.train_size or min(n, 256 * n_lists)
+        sample = sphere[rng.choice(n, train_size, replace=False)] if train_size < n else sphere
+        self.centroids = self._kmeans(sample, n_lists, rng).astype(np.float32)
+
+        assign = np.argmax(sphere @ self.centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=n_lists)
+
+        self.n_lists = n_lists
+        self.ids = order.astype(np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.vectors = vectors[order] if self.metric == "ip" else sphere[order]
+        return self
+
+    # ---------- Search ----------
+
+    def search(self, queries, k, n_probe=None, exclude=None):
+        """Approximate top-k item ids and scores for each query.
+
+        `exclude` is an optional list (one entry per query) of item ids to
+        skip. Returns two (B, k) arrays padded with id -1 / score -inf when a
+        query's probed lists hold fewer than k items.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probes = top_n_indices(self._query_to_sphere(queries) @ self.centroids.T, n_probe)
+
+        if self.metric == "cosine":
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries = queries / np.maximum(norms, 1e-12)
+
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for b, lists in enumerate(probes):
+            rows = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+            ids = self.ids[rows]
+            scores = self.vectors[rows] @ queries[b]
+            if exclude is not None and len(exclude[b]):
+                scores[np.isin(ids, exclude[b])] = -np.inf
+
+            best = top_n_indices(scores, k)
+            best = best[np.isfinite(scores[best])]
+            out_ids[b, :len(best)] = ids[best]
+            out_scores[b, :len(best)] = scores[best]
+        return out_ids, out_scores
+
+    # ---------- Persistence ----------
+
+    def save(self, directory):
+        """Write the index as .npy arrays plus a JSON config"""
+        os.makedirs(directory, exist_ok=True)
+        for name in ("centroids", "vectors", "ids", "offsets"):
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        config = {
+            "n_lists": self.n_lists, "n_probe": self.n_probe, "metric": self.metric,
+            "kmeans_iters": self.kmeans_iters, "train_size": self.train_size,
+            "seed": self.seed, "max_norm": self.max_norm,
+        }
+        with open(os.path.join(directory, "index.json"), "w") as f:
+            json.dump(config, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """Load an index saved with `save`; arrays are memory-mapped by default"""
+        with open(os.path.join(directory, "index.json")) as f:
+            config = json.load(f)
+        max_norm = config.pop("max_norm")
+        index = cls(**config)
+        index.max_norm = max_norm
+        for name in ("centroids", "vectors", "ids", "offsets"):
+            setattr(index, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+        return index
+
+
+class ANNCandidateGenerator:
+    """Candidate generation stage feeding the hybrid re-ranker.
+
+    The SVD index holds [qi, bi] so a query [pu, 1] ranks items by the SVD
+    estimate (bu and the global mean are constant per user). The optional NCF
+    index holds the NCF item embedding table and is queried with the mean
+    embedding of the user's seen items, adding behaviourally similar items.
+    """
+
+    def __init__(self, svd_index, pu, seen_index, ncf_index=None, ncf_item_embeddings=None,
+                 n_candidates=200, ncf_candidates=50, n_probe=None):
+        self.svd_index = svd_index
+        self.pu = pu
+        self.seen_index = seen_index
+        self.ncf_index = ncf_index
+        self.ncf_item_embeddings = ncf_item_embeddings
+        self.n_candidates = n_candidates
+        self.ncf_candidates = ncf_candidates
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(cls, scorer, seen_index, ncf_item_embeddings=None, n_lists=None, **kwargs):
+        """Build the SVD (and optionally NCF) IVF indexes from a HybridScorer"""
+        svd_vectors = np.hstack([scorer.qi, scorer.bi[:, None]])
+        svd_index = IVFIndex(n_lists=n_lists, metric="ip").build(svd_vectors)
+
+        ncf_index = None
+        if ncf_item_embeddings is not None:
+            ncf_index = IVFIndex(n_lists=n_lists, metric="cosine").build(ncf_item_embeddings)
+
+        return cls(svd_index, scorer.pu, seen_index, ncf_index, ncf_item_embeddings, **kwargs)
+
+    def candidates(self, users):
+        """(B, C) candidate item ids per user, padded with -1"""
+        users = np.asarray(users)
+        seen = [self.seen_index.indices[self.seen_index.indptr[u]:self.seen_index.indptr[u + 1]] for u in users]
+
+        queries = np.hstack([self.pu[users], np.ones((len(users), 1), dtype=self.pu.dtype)])
+        ids, _ = self.svd_index.search(queries, self.n_candidates, self.n_probe, exclude=seen)
+
+        if self.ncf_index is None:
+            return ids
+
+        extra = np.full((len(users), self.ncf_candidates), -1, dtype=np.int64)
+        for b, items in enumerate(seen):
+            if len(items) == 0:
+                continue
+            query = self.ncf_item_embeddings[items].mean(axis=0)
+            found, _ = self.ncf_index.search(query, self.ncf_candidates, self.n_probe,
+                                             exclude=[np.concatenate([items, ids[b]])])
+            extra[b] = found[0]
+        return np.hstack([ids, extra])
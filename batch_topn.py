@@ -0,0 +1,175 @@
+# ===========================
+# Batch Top-N Precomputation
+# (top-N for every user, sharded over a process pool, resumable)
+# ===========================
+#
+#   python batch_topn.py artifacts/bundles artifacts/topn --top-n 50 --workers 4
+#
+# Output directory:
+#   manifest.json                    job settings and the bundle's model_version
+#   user_classes.npy / item_classes.npy
+#   shard-00000.items.npy            (users in shard, top_n) int32 item codes, -1 padded
+#   shard-00000.scores.npy           (users in shard, top_n) float32 hybrid scores, -inf padded
+#
+# Shard k covers user codes [k * shard_size, (k + 1) * shard_size). Each shard
+# file is written under a temporary name and renamed, so a rerun after an
+# interruption skips the finished shards and redoes only the rest.
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from bundle import load_bundle, resolve_bundle
+
+MANIFEST = "manifest.json"
+
+# Set per worker process by `_init_worker`
+_recommender = None
+
+
+def _shard_path(out_dir, shard, kind):
+    return os.path.join(out_dir, f"shard-{shard:05d}.{kind}.npy")
+
+
+def _save_atomic(path, array):
+    tmp = path[:-len(".npy")] + ".tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def _shard_done(out_dir, shard):
+    return all(os.path.exists(_shard_path(out_dir, shard, kind)) for kind in ("scores", "items"))
+
+
+def _init_worker(bundle_dir, pool_size):
+    global _recommender
+    _recommender = load_bundle(bundle_dir)
+    _recommender.retriever.pool_size = pool_size
+
+
+def _run_shard(out_dir, shard, start, stop, top_n, block_size):
+    """Top-N for user codes [start, stop) in blocks of `block_size` users"""
+    items = np.empty((stop - start, top_n), dtype=np.int32)
+    scores = np.empty((stop - start, top_n), dtype=np.float32)
+    for block_start in range(start, stop, block_size):
+        users = np.arange(block_start, min(stop, block_start + block_size))
+        block_items, block_scores = _recommender.retriever.recommend_batch(users, top_n)
+        rows = slice(block_start - start, block_start - start + len(users))
+        items[rows, :block_items.shape[1]] = block_items
+        scores[rows, :block_scores.shape[1]] = block_scores
+        # Catalogs smaller than top_n
+        items[rows, block_items.shape[1]:] = -1
+        scores[rows, block_scores.shape[1]:] = -np.inf
+
+    # Scores first: a shard counts as done once its items file exists
+    _save_atomic(_shard_path(out_dir, shard, "scores"), scores)
+    _save_atomic(_shard_path(out_dir, shard, "items"), items)
+    return shard
+
+
+def precompute_top_n(bundle, out_dir, top_n=50, shard_size=50_000, block_size=512, pool_size=None,
+                     n_workers=None, verbose=True):
+    """Top-N item codes and hybrid scores for every user of a bundle.
+
+    Each shard of users is handled by one worker process, which hybrid-scores
+    `block_size` users at a time against the whole catalog with batched NCF
+    calls and masks their seen items (`ExactRetriever.recommend_batch`);
+    with `pool_size` only the best that many items by SVD are hybrid-scored.
+    Workers load the bundle memory-mapped, so the factor arrays are shared
+    through the page cache instead of being copied into every process.
+    Peak memory per worker is about block_size x n_items x 8 bytes.
+
+    Finished shards in `out_dir` are kept when the job is rerun for the
+    same model version; a different version or job setting is an error.
+    Returns the output manifest.
+    """
+    bundle_dir = resolve_bundle(bundle)
+    recommender = load_bundle(bundle_dir)
+    n_users = len(recommender.users)
+    n_shards = -(-n_users // shard_size)
+    manifest = {
+        "model_version": recommender.model_version,
+        "n_users": n_users,
+        "n_items": len(recommender.items),
+        "top_n": top_n,
+        "shard_size": shard_size,
+        "n_shards": n_shards,
+        "pool_size": pool_size,
+    }
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise ValueError(f"{out_dir} holds results of another job ({previous}); use a new directory")
+    else:
+        np.save(os.path.join(out_dir, "user_classes.npy"), recommender.users.classes)
+        np.save(os.path.join(out_dir, "item_classes.npy"), recommender.items.classes)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    todo = [k for k in range(n_shards) if not _shard_done(out_dir, k)]
+    if verbose:
+        print(f"📬 Top-{top_n} for {n_users:,} users: {n_shards - len(todo)}/{n_shards} shards done, "
+              f"{len(todo)} to go")
+
+    start_time = time.perf_counter()
+    jobs = [(out_dir, k, k * shard_size, min(n_users, (k + 1) * shard_size), top_n, block_size) for k in todo]
+    if n_workers == 1:
+        _init_worker(bundle_dir, pool_size)
+        finished = (_run_shard(*job) for job in jobs)
+        _report(finished, len(todo), start_time, verbose)
+    else:
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker,
+                                 initargs=(bundle_dir, pool_size)) as pool:
+            futures = [pool.submit(_run_shard, *job) for job in jobs]
+            _report((f.result() for f in as_completed(futures)), len(todo), start_time, verbose)
+    return manifest
+
+
+def _report(finished, total, start_time, verbose):
+    for done, shard in enumerate(finished, 1):
+        if verbose:
+            print(f"   shard {shard} done ({done}/{total}, {time.perf_counter() - start_time:.1f}s)")
+
+
+def load_top_n(out_dir, mmap_mode="r"):
+    """(manifest, items, scores) of a finished job; row u belongs to user code u"""
+    with open(os.path.join(out_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+    missing = [k for k in range(manifest["n_shards"]) if not _shard_done(out_dir, k)]
+    if missing:
+        raise ValueError(f"{len(missing)} shards of {out_dir} are not finished yet")
+
+    def load(kind):
+        shards = [np.load(_shard_path(out_dir, k, kind), mmap_mode=mmap_mode)
+                  for k in range(manifest["n_shards"])]
+        return shards[0] if len(shards) == 1 else np.concatenate(shards)
+
+    return manifest, load("items"), load("scores")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute top-N recommendations for every user")
+    parser.add_argument("bundle", help="bundle root (follows LATEST) or a version directory")
+    parser.add_argument("out", help="output directory (rerun with the same one to resume)")
+    parser.add_argument("--top-n", type=int, default=50)
+    parser.add_argument("--shard-size", type=int, default=50_000, help="users per output shard")
+    parser.add_argument("--block-size", type=int, default=512, help="users scored per matrix product")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="hybrid-score only this many SVD-best items per user (default: every item)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    options = parser.parse_args(argv)
+
+    precompute_top_n(options.bundle, options.out, top_n=options.top_n, shard_size=options.shard_size,
+                     block_size=options.block_size, pool_size=options.pool_size, n_workers=options.workers)
+
+
+if __name__ == "__main__":
+    main()
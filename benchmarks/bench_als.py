@@ -0,0 +1,73 @@
+# ===========================
+# Benchmark: matrix factorization backends
+# surprise SVD (SGD) vs parallel ALS: wall time and test RMSE
+# ===========================
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from common import random_ratings
+from als import ALSFactorizer
+from scoring import HybridScorer
+
+
+def rmse(pred, actual):
+    return float(np.sqrt(np.mean((pred - actual) ** 2)))
+
+
+def bench_surprise(train, test, n_users, n_items, n_factors):
+    import pandas as pd
+    from surprise import SVD, Dataset, Reader
+
+    frame = pd.DataFrame({"user": train[0], "item": train[1], "rating": train[2]})
+    start = time.perf_counter()
+    trainset = Dataset.load_from_df(frame, Reader(rating_scale=(1, 5))).build_full_trainset()
+    model = SVD(n_factors=n_factors, random_state=42)
+    model.fit(trainset)
+    seconds = time.perf_counter() - start
+
+    scorer = HybridScorer.from_surprise(model, n_users, n_items)
+    return seconds, rmse(scorer.svd_scores(test[0], test[1][:, None])[:, 0], test[2])
+
+
+def bench_als(train, test, n_users, n_items, n_factors, n_iters, n_jobs):
+    start = time.perf_counter()
+    model = ALSFactorizer(n_factors=n_factors, n_iters=n_iters, n_jobs=n_jobs)
+    model.fit(*train, n_users=n_users, n_items=n_items)
+    seconds = time.perf_counter() - start
+    return seconds, rmse(model.predict_batch(test[0], test[1]), test[2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="surprise SVD vs ALS: fit time and RMSE")
+    parser.add_argument("--rows", type=int, nargs="+", default=[500_000, 2_000_000])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--factors", type=int, default=50)
+    parser.add_argument("--als-iters", type=int, default=5)
+    parser.add_argument("--skip-surprise", action="store_true")
+    args = parser.parse_args()
+
+    jobs = sorted({1, os.cpu_count()})
+    print(f"{'rows':>10} {'backend':>16} {'fit s':>9} {'test RMSE':>10}")
+    for n_rows in args.rows:
+        users, items, ratings = random_ratings(args.users, args.items, n_rows)
+        split = np.random.default_rng(0).random(n_rows) < 0.8
+        train = (users[split], items[split], ratings[split])
+        test = (users[~split], items[~split], ratings[~split])
+
+        results = []
+        if not args.skip_surprise:
+            results.append(("surprise SVD", bench_surprise(train, test, args.users, args.items, args.factors)))
+        for n_jobs in jobs:
+            results.append((f"ALS {n_jobs} thread(s)",
+                            bench_als(train, test, args.users, args.items, args.factors, args.als_iters, n_jobs)))
+        for name, (seconds, error) in results:
+            print(f"{n_rows:>10} {name:>16} {seconds:>9.2f} {error:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
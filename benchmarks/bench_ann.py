@@ -0,0 +1,52 @@
+# ===========================
+# Benchmark: IVF candidate generation
+# recall@N vs latency against exact scoring
+# ===========================
+
+import argparse
+
+import numpy as np
+
+from common import random_scorer, summarize, time_calls
+from ann_index import IVFIndex
+from retrieval import top_n_indices
+
+
+def exact_top_n(queries, vectors, n):
+    return top_n_indices(queries @ vectors.T, n)
+
+
+def recall_at_n(found, truth):
+    hits = [len(np.intersect1d(f, t)) for f, t in zip(found, truth)]
+    return float(np.sum(hits)) / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF recall@N vs latency")
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-n", type=int, default=100)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    scorer = random_scorer(args.queries, args.items)
+    vectors = np.hstack([scorer.qi, scorer.bi[:, None]]).astype(np.float32)
+    queries = np.hstack([scorer.pu, np.ones((args.queries, 1))]).astype(np.float32)
+
+    index = IVFIndex(n_lists=args.n_lists, metric="ip").build(vectors)
+    print(f"Index: {args.items} items, {index.n_lists} lists")
+
+    truth = exact_top_n(queries, vectors, args.top_n)
+    exact = summarize(time_calls(exact_top_n, [(q[None], vectors, args.top_n) for q in queries]))
+
+    print(f"{'n_probe':>8} {'recall@N':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    print(f"{'exact':>8} {1.0:>9.3f} {exact['p50_ms']:>9.3f} {exact['p99_ms']:>9.3f}")
+    for n_probe in args.n_probe:
+        found, _ = index.search(queries, args.top_n, n_probe=n_probe)
+        latency = summarize(time_calls(index.search, [(q, args.top_n, n_probe) for q in queries]))
+        print(f"{n_probe:>8} {recall_at_n(found, truth):>9.3f} {latency['p50_ms']:>9.3f} {latency['p99_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
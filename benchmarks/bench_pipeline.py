@@ -0,0 +1,176 @@
+# ===========================
+# Benchmark: end-to-end pipeline and serving functions at scale
+# Synthetic 2019-Nov-style logs, per-stage time / memory, saved for regression checks
+# ===========================
+#
+#   python benchmarks/bench_pipeline.py --sizes 1e5,1e6
+#   python benchmarks/bench_pipeline.py --sizes 1e5,1e6 --baseline benchmarks/results/<earlier>.json
+#
+# Every size runs in a fresh subprocess, so peak RSS is per size. Event logs
+# are generated once per (size, seed) into --data-dir and reused. 1e7 rows
+# take minutes per stage; 1e8 needs tens of GB of RAM and the ALS backend.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import REPO_ROOT
+from synthetic_data import SyntheticEventLog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVING_FUNCTIONS = ["recommend_for_user", "search_product_by_name", "recommend_similar_products",
+                     "get_popular_products"]
+
+
+def dataset_path(data_dir, n_rows, seed):
+    path = os.path.join(data_dir, f"events-{n_rows}-seed{seed}.csv")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        SyntheticEventLog(n_users=max(n_rows // 20, 100), n_products=max(n_rows // 50, 100),
+                          seed=seed).write_csv(path, n_rows)
+        print(f"   generated {path} in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def run_pipeline(path, backend, ncf_epochs, serve_calls, seed):
+    """All pipeline stages on one event log; returns the profiler report"""
+    from instrumentation import PipelineProfiler
+    from pipeline import Pipeline, PipelineConfig
+
+    profiler = PipelineProfiler().start()
+    # No stage cache: every stage is measured from scratch
+    config = PipelineConfig(data_path=path, mf_backend=backend, ncf_epochs=ncf_epochs, cache_dir=None)
+    pipeline = Pipeline(config, profiler=profiler, verbose=False)
+    pipeline.run(["ingest", "encode", "train_svd", "train_ncf", "build_metadata"])
+    with profiler.stage("predict"):
+        _, test = pipeline.interaction_split()
+        pipeline.scorer().svd_scores_pairs(test.users, test.items)
+    with profiler.stage("metadata"):
+        recommender = pipeline.recommender()
+        recommender.search_index
+    catalog = recommender.catalog
+    n_users, n_items = pipeline.n_users, pipeline.n_items
+
+    rng = np.random.default_rng(seed)
+    users = rng.choice(recommender.users.classes, serve_calls)
+    products = rng.choice(catalog.product_ids, serve_calls)
+    terms = rng.choice(np.concatenate([catalog.brands, catalog.categories]).astype(str), serve_calls)
+    categories = rng.choice(np.append(catalog.categories.astype(object), None), serve_calls)
+    calls = {
+        "recommend_for_user": [((u,), {"top_n": 10}) for u in users],
+        "search_product_by_name": [((t,), {}) for t in terms],
+        "recommend_similar_products": [((p,), {"top_n": 10}) for p in products],
+        "get_popular_products": [((), {"top_n": 10, "category": c}) for c in categories],
+    }
+    with profiler.stage("serve"):
+        for name in SERVING_FUNCTIONS:
+            fn = profiler.timed(name)(getattr(recommender, name))
+            for args, kwargs in calls[name]:
+                fn(*args, **kwargs)
+
+    report = profiler.report()
+    report["data"] = {"interactions": len(pipeline.interaction_store()), "users": n_users, "items": n_items}
+    return report
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print per-stage / per-function ratios against a baseline run; returns the regressions"""
+    regressions = []
+    print(f"\nComparison with baseline ({baseline['environment'].get('commit')}), tolerance {tolerance:.0%}:")
+    for size, report in results["sizes"].items():
+        base = baseline["sizes"].get(size)
+        if base is None:
+            continue
+        rows = [(f"stage {name} (ms)", 1000 * report["stages"][name]["wall_s"],
+                 1000 * base["stages"][name]["wall_s"])
+                for name in report["stages"] if name in base["stages"]]
+        rows += [(f"{name} p50 (ms)", report["latency"][name]["p50_ms"], base["latency"][name]["p50_ms"])
+                 for name in report["latency"] if name in base["latency"]]
+        for label, now, before in rows:
+            ratio = now / before if before > 0 else 1.0
+            flag = ""
+            # Sub-50us differences are timer noise
+            if ratio > 1 + tolerance and now - before > 0.05:
+                flag = "  <-- REGRESSION"
+                regressions.append((size, label, ratio))
+            print(f"   {size:>11} {label:<40} {before:>10.3f} -> {now:>10.3f}  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline and serving benchmark on synthetic event logs")
+    parser.add_argument("--sizes", default="1e5,1e6", help="comma-separated event counts, e.g. 1e5,1e6,1e7,1e8")
+    parser.add_argument("--backend", choices=["als", "surprise"], default="als")
+    parser.add_argument("--ncf-epochs", type=int, default=1, help="0 skips NCF training")
+    parser.add_argument("--serve-calls", type=int, default=200, help="calls per serving function")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(HERE, "data"))
+    parser.add_argument("--results-dir", default=os.path.join(HERE, "results"))
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown ratio flagged as a regression")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    parser.add_argument("--report", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        report = run_pipeline(args.run_one, args.backend, args.ncf_epochs, args.serve_calls, args.seed)
+        with open(args.report, "w") as f:
+            json.dump(report, f)
+        return
+
+    config = {k: getattr(args, k) for k in ("backend", "ncf_epochs", "serve_calls", "seed")}
+    results = {"environment": environment(), "config": config, "sizes": {}}
+    for n_rows in (int(float(s)) for s in args.sizes.split(",")):
+        print(f"📏 {n_rows:,} events")
+        path = dataset_path(args.data_dir, n_rows, args.seed)
+        with tempfile.NamedTemporaryFile(suffix=".json") as out:
+            subprocess.run([sys.executable, __file__, "--run-one", path, "--report", out.name,
+                            "--backend", args.backend, "--ncf-epochs", str(args.ncf_epochs),
+                            "--serve-calls", str(args.serve_calls), "--seed", str(args.seed)], check=True)
+            report = json.load(open(out.name))
+        results["sizes"][str(n_rows)] = report
+
+        for name, stage in report["stages"].items():
+            print(f"   {name:<10} {stage['wall_s']:>9.2f}s wall {stage['cpu_s']:>9.2f}s CPU "
+                  f"peak RSS {stage['peak_rss_mb']:>8,.0f} MB")
+        for name, latency in report["latency"].items():
+            print(f"   {name:<28} p50 {latency['p50_ms']:>8.3f} ms  p99 {latency['p99_ms']:>8.3f} ms")
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    path = os.path.join(args.results_dir, f"pipeline-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(f"{len(regressions)} regression(s) above {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# ===========================
+# Benchmark: exact full-catalog retrieval
+# Per-request latency vs catalog size
+# ===========================
+
+import argparse
+
+import numpy as np
+
+from common import random_interactions, random_scorer, summarize, time_calls
+from retrieval import ExactRetriever, build_seen_index
+
+
+def bench_catalog_size(n_items, n_users, requests, pool_size, batch_size):
+    scorer = random_scorer(n_users, n_items)
+    users, items = random_interactions(n_users, n_items)
+    seen = build_seen_index(users, items, n_users, n_items)
+    retriever = ExactRetriever(scorer, seen, pool_size=pool_size)
+
+    rng = np.random.default_rng(0)
+    request_users = rng.integers(0, n_users, requests)
+
+    single = summarize(time_calls(retriever.recommend, [(u, 10) for u in request_users]))
+
+    blocks = [(request_users[k:k + batch_size], 10) for k in range(0, requests, batch_size)]
+    batched = time_calls(retriever.recommend_batch, blocks)
+    per_user_ms = batched.sum() / requests * 1000.0
+
+    return single, per_user_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact retrieval latency vs catalog size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 500_000])
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"{'items':>10} {'p50 ms':>10} {'p99 ms':>10} {'batched ms/user':>16}")
+    for n_items in args.sizes:
+        single, per_user_ms = bench_catalog_size(
+            n_items, args.users, args.requests, args.pool_size, args.batch_size
+        )
+        print(f"{n_items:>10} {single['p50_ms']:>10.3f} {single['p99_ms']:>10.3f} {per_user_ms:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
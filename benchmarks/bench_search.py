@@ -0,0 +1,57 @@
+# ===========================
+# Benchmark: product search
+# Inverted index vs the old linear catalog scan
+# ===========================
+
+import argparse
+
+import numpy as np
+
+from common import random_catalog, summarize, time_calls
+from search_index import ProductSearchIndex
+
+
+def linear_scan(catalog, search_term, limit=10):
+    """The previous search_product_by_name: scan every product"""
+    search_term = str(search_term).lower()
+    matches = []
+    for row in range(len(catalog)):
+        info = catalog.info(row)
+        category = str(info['category_code']).lower()
+        brand = str(info['brand']).lower()
+        product_name = catalog.names[row].lower()
+        if search_term in category or search_term in brand or search_term in product_name:
+            matches.append(row)
+            if len(matches) >= limit:
+                break
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inverted-index search vs linear scan")
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    catalog = random_catalog(args.products)
+    catalog.names  # build names once, outside the timings
+
+    queries = ["brand42", "brand4", "smart", "head", "electronics.tablet", "note", "video cards", "zzz", "tv"]
+
+    index = ProductSearchIndex(catalog)
+
+    # Both paths must find the same set of products
+    for q in queries:
+        expected = set(linear_scan(catalog, q, limit=len(catalog)))
+        found = set(index.search_rows(q, limit=len(catalog)).tolist())
+        assert expected == found, q
+
+    print(f"{'query':>20} {'scan p50 ms':>12} {'index p50 ms':>13} {'index p99 ms':>13}")
+    for q in queries:
+        scan = summarize(time_calls(linear_scan, [(catalog, q)] * max(1, args.repeats // 10)))
+        indexed = summarize(time_calls(index.search_rows, [(q,)] * args.repeats))
+        print(f"{q:>20} {scan['p50_ms']:>12.3f} {indexed['p50_ms']:>13.3f} {indexed['p99_ms']:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
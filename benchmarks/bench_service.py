@@ -0,0 +1,82 @@
+# ===========================
+# Benchmark: HTTP recommendation service under load
+# Closed-loop load generator, p50 / p99 latency and QPS
+# ===========================
+#
+#   python http_service.py artifacts/bundles --port 8000 [--max-batch 1] [--cache-size 0]
+#   python benchmarks/bench_service.py artifacts/bundles --port 8000 --concurrency 32
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from common import summarize
+from bundle import resolve_bundle
+
+
+async def fetch(reader, writer, host, path):
+    """One keep-alive GET; returns the HTTP status"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, paths, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            status = await fetch(reader, writer, host, path)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, paths, concurrency):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, paths[k::concurrency], latencies, errors)
+                           for k in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test http_service.py")
+    parser.add_argument("bundle", help="bundle the service runs (user ids are sampled from it)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent keep-alive connections")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--users", type=int, default=None,
+                        help="distinct users to draw from (default: all; fewer means more cache hits)")
+    args = parser.parse_args()
+
+    user_ids = np.load(f"{resolve_bundle(args.bundle)}/user_classes.npy", mmap_mode="r")
+    rng = np.random.default_rng(0)
+    pool = rng.choice(user_ids, min(args.users or len(user_ids), len(user_ids)), replace=False)
+    paths = [f"/recommendations?user_id={u}&top_n={args.top_n}" for u in rng.choice(pool, args.requests)]
+
+    latencies, errors, seconds = asyncio.run(run_load(args.host, args.port, paths, args.concurrency))
+    stats = summarize(latencies)
+    print(f"{len(latencies):,} requests, concurrency {args.concurrency}, {len(errors)} errors")
+    print(f"QPS {len(latencies) / seconds:,.0f}   p50 {stats['p50_ms']:.1f} ms   "
+          f"p99 {stats['p99_ms']:.1f} ms   mean {stats['mean_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# ===========================
+# Shared helpers for benchmarks
+# ===========================
+
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from scoring import HybridScorer  # noqa: E402
+
+
+def random_scorer(n_users, n_items, n_factors=50, seed=42, ncf_predict=None):
+    """HybridScorer over random SVD-like factors (no training needed)"""
+    rng = np.random.default_rng(seed)
+    pu = rng.normal(0, 0.1, (n_users, n_factors))
+    qi = rng.normal(0, 0.1, (n_items, n_factors))
+    bu = rng.normal(0, 0.1, n_users)
+    bi = rng.normal(0, 0.1, n_items)
+    return HybridScorer(pu, qi, bu, bi, global_mean=1.5, ncf_predict=ncf_predict)
+
+
+def random_interactions(n_users, n_items, per_user=20, seed=42):
+    """Random (users, items) arrays with roughly `per_user` items each"""
+    rng = np.random.default_rng(seed)
+    users = np.repeat(np.arange(n_users), per_user)
+    items = rng.integers(0, n_items, len(users))
+    return users, items
+
+
+def time_calls(fn, args_list):
+    """Wall-clock seconds for each fn(*args) call"""
+    latencies = np.empty(len(args_list))
+    for k, args in enumerate(args_list):
+        start = time.perf_counter()
+        fn(*args)
+        latencies[k] = time.perf_counter() - start
+    return latencies
+
+
+def summarize(latencies):
+    """p50 / p99 / mean latency in milliseconds"""
+    ms = np.asarray(latencies) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def random_catalog(n_products, n_brands=500, n_categories=200, seed=42):
+    """ProductCatalog with random brands, category paths and prices"""
+    import pandas as pd
+    from catalog import build_product_catalog
+
+    rng = np.random.default_rng(seed)
+    roots = ["electronics", "computers", "appliances", "auto", "kids"]
+    leaves = ["smartphone", "notebook", "headphone", "tablet", "camera", "tv", "clocks", "printer",
+              "keyboard", "mouse", "monitor", "speaker", "smartwatch", "video_cards", "memory"]
+    categories = np.array([
+        f"{roots[k % len(roots)]}.{leaves[(k * 7) % len(leaves)]}_{k}" for k in range(n_categories)
+    ], dtype=object)
+    brands = np.array([f"brand{k}" for k in range(n_brands)] + [None], dtype=object)
+
+    # Each brand sells in a handful of categories, as in the real catalog
+    brand_of = rng.integers(0, len(brands), n_products)
+    brand_categories = rng.integers(0, n_categories, (len(brands), 3))
+    category_of = brand_categories[brand_of, rng.integers(0, 3, n_products)]
+
+    frame = pd.DataFrame({
+        "product_id": np.arange(1_000_000, 1_000_000 + n_products),
+        "category_code": categories[category_of],
+        "brand": brands[brand_of],
+        "price": np.round(rng.uniform(0, 1000, n_products), 2).astype(np.float32),
+    })
+    return build_product_catalog(frame)
+
+
+def random_ratings(n_users, n_items, n_ratings, n_factors=10, seed=42):
+    """Implicit-style (users, items, ratings) with Zipf item popularity.
+
+    Ratings are 1 / 3 / 5 (view / cart / purchase) from a noisy low-rank
+    affinity, so matrix factorization has real structure to recover.
+    """
+    rng = np.random.default_rng(seed)
+    users = rng.integers(0, n_users, n_ratings)
+    items = np.minimum(rng.zipf(1.3, n_ratings) - 1, n_items - 1)
+    items = rng.permutation(n_items)[items]
+
+    pu = rng.normal(0, 1, (n_users, n_factors))
+    qi = rng.normal(0, 1, (n_items, n_factors))
+    affinity = np.einsum("ij,ij->i", pu[users], qi[items]) / np.sqrt(n_factors)
+    affinity += rng.normal(0, 0.5, n_users)[users] + rng.normal(0, 0.5, n_items)[items]
+    affinity += rng.normal(0, 0.5, n_ratings)
+
+    ratings = np.where(affinity > 1.6, 5.0, np.where(affinity > 1.0, 3.0, 1.0))
+    return users, items, ratings
@@ -0,0 +1,343 @@
+# ===========================
+# Serving Bundle
+# (versioned on-disk export of every trained artifact)
+# ===========================
+
+import json
+import os
+import secrets
+import shutil
+import time
+
+import numpy as np
+from scipy import sparse
+
+from ann_index import ANNCandidateGenerator, IVFIndex
+from catalog import ProductCatalog
+from interaction_store import InteractionStore
+from ncf_numpy import FOLDED_ARRAYS, NumpyNCF, fold_ncf_weights, keras_bn_epsilon
+from popularity import PopularityStore
+from quantization import QuantizedHybridScorer, QuantizedMatrix, drift_report
+from recommender import Recommender
+from retrieval import CandidateRetriever
+from scoring import HybridScorer
+
+# 3 added optional quantized tables, 4 the stored NCF item projection (and
+# no separate copy of the NCF item table) and the optional ANN index;
+# versions 2 and 3 still load
+BUNDLE_FORMAT_VERSION = 4
+SUPPORTED_FORMAT_VERSIONS = (2, 3, 4)
+LATEST_POINTER = "LATEST"
+
+SVD_ARRAYS = ["pu", "qi", "bu", "bi"]
+CATALOG_ARRAYS = ["product_ids", "category_codes", "brand_codes", "prices"]
+
+# Tables stored as int8 / float16 (+ per-row "<name>_scale") when quantizing;
+# ncf_w0 / ncf_w1 are the NCF user / item Embedding tables
+QUANTIZABLE_ARRAYS = ["svd_pu", "svd_qi", "ncf_w0", "ncf_w1", "ncf_item_projection", "ncf_item_embeddings"]
+
+
+def _new_model_version():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + secrets.token_hex(4)
+
+
+def export_bundle(directory, recommender, ncf_model=None, model_version=None, extra=None, quantize=None):
+    """Write a Recommender (and optionally the Keras NCF model's weights) as a bundle.
+
+    Layout: `directory/<model_version>/` holds one .npy file per array and a
+    manifest.json with the format version, scalars and small vocabularies;
+    `directory/LATEST` names the newest version. The version directory is
+    written under a temporary name and renamed, so a loader never sees a
+    partial bundle. Returns the path of the new version.
+
+    With `quantize="int8"` (or "float16") the SVD factors, NCF embedding
+    tables and NCF item projection are stored as `QuantizedMatrix` values +
+    per-row scales and the biases as float32. The written bundle is then
+    loaded back and compared with `recommender`; the drift report and the
+    table sizes go into the
+    manifest's "quantization" entry.
+    """
+    model_version = model_version or _new_model_version()
+    final_dir = os.path.join(directory, model_version)
+    tmp_dir = final_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    quantization = None
+    if quantize is not None:
+        quantization = {"dtype": quantize, "arrays": [], "bytes": 0, "float32_bytes": 0}
+
+    def save(name, array):
+        if quantization is not None and name in QUANTIZABLE_ARRAYS:
+            matrix = QuantizedMatrix.from_array(array, quantize)
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), matrix.values)
+            if matrix.scales is not None:
+                np.save(os.path.join(tmp_dir, f"{name}_scale.npy"), matrix.scales)
+            quantization["arrays"].append(name)
+            quantization["bytes"] += matrix.nbytes
+            quantization["float32_bytes"] += matrix.values.size * 4
+            return
+        array = np.asarray(array)
+        if quantization is not None and array.dtype == np.float64:
+            array = array.astype(np.float32)
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+
+    scorer = recommender.scorer
+    for name in SVD_ARRAYS:
+        save(f"svd_{name}", getattr(scorer, name))
+
+    save("user_classes", recommender.users.classes)
+    save("item_classes", recommender.items.classes)
+
+    seen = recommender.seen_index
+    save("seen_indptr", seen.indptr)
+    save("seen_indices", seen.indices)
+    save("seen_data", seen.data)
+
+    catalog = recommender.catalog
+    for name in CATALOG_ARRAYS:
+        save(f"catalog_{name}", getattr(catalog, name))
+
+    popularity = recommender.popularity
+    save("popularity_counts", popularity.counts)
+    if popularity.decayed is not None:
+        save("popularity_decayed", popularity.decayed)
+
+    ncf = None
+    if ncf_model is not None:
+        weights = ncf_model.get_weights()
+        for k, w in enumerate(weights):
+            save(f"ncf_w{k}", w)
+        # Dense weights with BatchNorm folded in, for the TF-free forward pass;
+        # the raw weights above are kept for restoring the Keras model
+        epsilon = keras_bn_epsilon(ncf_model)
+        _, _, folded = fold_ncf_weights(weights, epsilon)
+        for name in FOLDED_ARRAYS:
+            save(f"ncf_{name}", folded[name])
+        # The catalog's first-layer item projection, so serving processes
+        # memory-map one shared copy instead of each building its own
+        save("ncf_item_projection", NumpyNCF.from_weights(weights, epsilon).item_projection)
+        ncf = {"n_weights": len(weights), "folded": True, "bn_epsilon": epsilon, "item_projection": True}
+
+    # The NCF item table is ncf_w1; a separate copy only without the model
+    if recommender.item_embeddings is not None and ncf_model is None:
+        save("ncf_item_embeddings", recommender.item_embeddings)
+
+    # ANN candidate indexes, so a loaded bundle serves them without re-clustering
+    ann = None
+    generator = getattr(recommender.retriever, "generator", None)
+    if isinstance(generator, ANNCandidateGenerator):
+        generator.svd_index.save(os.path.join(tmp_dir, "ann_svd"))
+        if generator.ncf_index is not None:
+            generator.ncf_index.save(os.path.join(tmp_dir, "ann_ncf"))
+        ann = {
+            "n_candidates": generator.n_candidates,
+            "ncf_candidates": generator.ncf_candidates,
+            "n_probe": generator.n_probe,
+            "ncf_index": generator.ncf_index is not None,
+        }
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "model_version": model_version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "n_users": int(scorer.n_users),
+        "n_items": int(scorer.n_items),
+        "scorer": {
+            "global_mean": scorer.global_mean,
+            "ncf_weight": scorer.ncf_weight,
+            "svd_weight": scorer.svd_weight,
+            "rating_scale": list(scorer.rating_scale),
+        },
+        "pool_size": recommender.pool_size,
+        "catalog": {
+            "categories": [str(c) for c in catalog.categories],
+            "brands": [str(b) for b in catalog.brands],
+        },
+        "popularity": {
+            "half_life": popularity.half_life,
+            "t_ref": popularity.t_ref,
+            "capacity": popularity.capacity,
+        },
+        "ncf": ncf,
+        "ann": ann,
+        "quantization": quantization,
+        "extra": extra or {},
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if quantization is not None:
+        quantization["drift"] = drift_report(recommender, load_bundle(tmp_dir))
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+
+    pointer_tmp = os.path.join(directory, LATEST_POINTER + ".tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(model_version + "\n")
+    os.replace(pointer_tmp, os.path.join(directory, LATEST_POINTER))
+    return final_dir
+
+
+def resolve_bundle(path):
+    """A bundle version directory, following `LATEST` when given the bundle root"""
+    pointer = os.path.join(path, LATEST_POINTER)
+    if os.path.exists(pointer):
+        with open(pointer) as f:
+            return os.path.join(path, f.read().strip())
+    return path
+
+
+class LazyNCFPredict:
+    """`ncf_predict` callable that restores the Keras NCF model on first use.
+
+    Used for bundles without folded NCF weights. TensorFlow is only
+    imported when a hybrid score is actually needed, so loading a bundle
+    (and serving search, product info or popularity) stays fast.
+    """
+
+    def __init__(self, directory, manifest, mmap_mode="r"):
+        self.directory = directory
+        self.n_weights = manifest["ncf"]["n_weights"]
+        self.quantized = set((manifest.get("quantization") or {}).get("arrays", []))
+        self.mmap_mode = mmap_mode
+        self._predict = None
+
+    def _load(self):
+        from ncf import make_ncf_predict, restore_ncf_model
+
+        def load(name):
+            return np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode=self.mmap_mode)
+
+        def load_weight(name):
+            if name not in self.quantized:
+                return load(name)
+            # Keras needs float tables: dequantize once at restore
+            scale = os.path.join(self.directory, f"{name}_scale.npy")
+            return QuantizedMatrix(load(name), np.load(scale) if os.path.exists(scale) else None).dequantize()
+
+        weights = [load_weight(f"ncf_w{k}") for k in range(self.n_weights)]
+        return make_ncf_predict(restore_ncf_model(weights))
+
+    @property
+    def model(self):
+        """The restored Keras NCFModel (loads it if needed)"""
+        if self._predict is None:
+            self._predict = self._load()
+        return self._predict.model
+
+    def __call__(self, user_idx, item_idx):
+        if self._predict is None:
+            self._predict = self._load()
+        return self._predict(user_idx, item_idx)
+
+
+def load_bundle(path, mmap_mode="r", cache=None):
+    """Load a bundle written by `export_bundle` into a ready-to-serve Recommender.
+
+    `path` is either a version directory or the bundle root (then `LATEST`
+    is followed). Arrays are memory-mapped by default and no training code,
+    pandas or TensorFlow is imported; NCF scores come from the NumPy
+    forward pass over the folded weights (older bundles restore Keras on
+    first use). Quantized tables are scored by a `QuantizedHybridScorer`
+    without dequantizing them. A `cache` from the previous bundle is reused
+    and its results for the old model version dropped.
+    """
+    directory = resolve_bundle(path)
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+        raise ValueError(f"Unsupported bundle format {manifest.get('format_version')!r} in {directory}")
+
+    def load(name):
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    def exists(name):
+        return os.path.exists(os.path.join(directory, f"{name}.npy"))
+
+    quantized = set((manifest.get("quantization") or {}).get("arrays", []))
+
+    def load_matrix(name):
+        if name not in quantized:
+            return load(name)
+        return QuantizedMatrix(load(name), load(f"{name}_scale") if exists(f"{name}_scale") else None)
+
+    user_classes = load("user_classes")
+    item_classes = load("item_classes")
+
+    ncf_predict = None
+    item_embeddings = load_matrix("ncf_item_embeddings") if exists("ncf_item_embeddings") else None
+    if manifest["ncf"] is not None and manifest["ncf"].get("folded"):
+        # Keras is restored from the raw weights only if something asks for
+        # `.model` (e.g. incremental fine-tuning)
+        item_table = load_matrix("ncf_w1")
+        ncf_predict = NumpyNCF(
+            load_matrix("ncf_w0"), item_table,
+            *(load(f"ncf_{name}") for name in FOLDED_ARRAYS),
+            item_projection=load_matrix("ncf_item_projection") if exists("ncf_item_projection") else None,
+            restore_model=lambda: LazyNCFPredict(directory, manifest, mmap_mode).model
+        )
+        if item_embeddings is None:
+            item_embeddings = item_table
+    elif manifest["ncf"] is not None:
+        ncf_predict = LazyNCFPredict(directory, manifest, mmap_mode)
+
+    scorer_config = manifest["scorer"]
+    scorer_class = QuantizedHybridScorer if "svd_pu" in quantized else HybridScorer
+    scorer = scorer_class(
+        *(load_matrix(f"svd_{name}") for name in SVD_ARRAYS),
+        scorer_config["global_mean"],
+        ncf_predict=ncf_predict,
+        ncf_weight=scorer_config["ncf_weight"],
+        svd_weight=scorer_config["svd_weight"],
+        rating_scale=tuple(scorer_config["rating_scale"]),
+    )
+
+    interactions = InteractionStore.from_csr(sparse.csr_matrix(
+        (load("seen_data"), load("seen_indices"), load("seen_indptr")),
+        shape=(manifest["n_users"], manifest["n_items"]),
+    ))
+
+    catalog_config = manifest["catalog"]
+    catalog = ProductCatalog(
+        load("catalog_product_ids"),
+        load("catalog_category_codes"), catalog_config["categories"],
+        load("catalog_brand_codes"), catalog_config["brands"],
+        load("catalog_prices"),
+    )
+
+    popularity_config = manifest["popularity"]
+    popularity = PopularityStore.from_counts(
+        load("popularity_counts"),
+        decayed=load("popularity_decayed") if exists("popularity_decayed") else None,
+        t_ref=popularity_config["t_ref"],
+        categories=catalog.category_codes,
+        eligible=catalog.has_brand | catalog.has_price,
+        half_life=popularity_config["half_life"],
+        capacity=popularity_config["capacity"],
+    )
+
+    retriever = None
+    ann = manifest.get("ann")
+    if ann is not None:
+        # Memory-mapped IVF lists; queries read quantized factor rows directly
+        ncf_index = IVFIndex.load(os.path.join(directory, "ann_ncf"), mmap_mode) if ann["ncf_index"] else None
+        generator = ANNCandidateGenerator(
+            IVFIndex.load(os.path.join(directory, "ann_svd"), mmap_mode),
+            scorer.pu_q if isinstance(scorer, QuantizedHybridScorer) else scorer.pu,
+            interactions.csr, ncf_index, item_embeddings if ncf_index is not None else None,
+            n_candidates=ann["n_candidates"], ncf_candidates=ann["ncf_candidates"], n_probe=ann["n_probe"],
+        )
+        retriever = CandidateRetriever(scorer, generator)
+
+    return Recommender(
+        scorer, interactions, user_classes, item_classes, catalog, popularity,
+        item_embeddings=item_embeddings,
+        retriever=retriever,
+        pool_size=manifest["pool_size"],
+        manifest=manifest,
+        cache=cache,
+    )
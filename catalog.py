@@ -0,0 +1,237 @@
+# ===========================
+# Product Catalog
+# (columnar, integer-indexed product metadata)
+# ===========================
+
+import numpy as np
+
+GENERIC_BRAND = "Generic Brand"
+DEFAULT_CATEGORY = "electronics"
+
+
+def _is_missing(value):
+    return value is None or value == "" or (isinstance(value, float) and np.isnan(value))
+
+
+def generate_product_name(product_id, info):
+    """Generate a readable product name from metadata"""
+    brand = info.get('brand', GENERIC_BRAND)
+    category = info.get('category_code', DEFAULT_CATEGORY)
+
+    # Handle missing brand
+    if _is_missing(brand) or brand == GENERIC_BRAND:
+        brand = GENERIC_BRAND
+
+    # Extract product type from category (last part)
+    if not _is_missing(category) and str(category).lower() != 'nan':
+        parts = str(category).split('.')
+        # Get the most specific category part
+        if len(parts) >= 2:
+            product_type = parts[-1].replace('_', ' ').title()
+        else:
+            product_type = 'Electronics'
+    else:
+        product_type = 'Electronics'
+
+    # Create product name with brand
+    if brand != GENERIC_BRAND:
+        product_name = f"{brand} {product_type}"
+    else:
+        product_name = f"{product_type}"
+
+    return product_name
+
+
+def _codes_with_default(values, default):
+    """Categorical codes + vocabulary, with missing values mapped to `default`"""
+    values = values.astype("category")
+    vocab = np.asarray(values.cat.categories, dtype=object)
+    codes = values.cat.codes.to_numpy().astype(np.int32)
+
+    if (codes < 0).any():
+        hits = np.flatnonzero(vocab == default)
+        if len(hits):
+            default_code = hits[0]
+        else:
+            vocab = np.append(vocab, default)
+            default_code = len(vocab) - 1
+        codes[codes < 0] = default_code
+    return codes, vocab
+
+
+class ProductCatalog:
+    """Product metadata as parallel arrays, one row per encoded item.
+
+    Row r describes `product_ids[r]`; when built from the training data rows
+    line up with `item_enc` codes. Brand and category are stored as int32
+    codes into small vocabularies, price as float32.
+    """
+
+    def __init__(self, product_ids, category_codes, categories, brand_codes, brands, prices):
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        self.category_codes = np.asarray(category_codes, dtype=np.int32)
+        self.categories = np.asarray(categories, dtype=object)
+        self.brand_codes = np.asarray(brand_codes, dtype=np.int32)
+        self.brands = np.asarray(brands, dtype=object)
+        self.prices = np.asarray(prices, dtype=np.float32)
+
+        self.has_brand = self.brands[self.brand_codes] != GENERIC_BRAND
+        self.has_price = self.prices > 0
+        # Products with brand get higher priority, then products with a price
+        self.priority = self.has_brand.astype(np.int8) * 2 + self.has_price
+
+        self._sorted = bool(np.all(np.diff(self.product_ids) > 0))
+        self._row_by_id = None if self._sorted else {int(p): r for r, p in enumerate(self.product_ids)}
+        self._names = None
+        self._build_category_postings()
+
+    def _build_category_postings(self):
+        """Per-category row lists, presorted by (priority desc, row).
+
+        `similar_postings[c]` holds every product whose category contains
+        category c's name (the old `target_category in category` match), so a
+        similar-products lookup is a slice of the first top_n rows.
+        """
+        rows = np.arange(len(self))
+        order = np.lexsort((rows, -self.priority, self.category_codes))
+        bounds = np.searchsorted(self.category_codes[order], np.arange(len(self.categories) + 1))
+        per_category = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.categories))]
+
+        names = [str(c) for c in self.categories]
+        self.similar_postings = []
+        for c, target in enumerate(names):
+            matches = [other for other, name in enumerate(names) if target and target in name]
+            if matches == [c]:
+                self.similar_postings.append(per_category[c])
+                continue
+            merged = np.concatenate([per_category[m] for m in matches]) if matches else rows[:0]
+            self.similar_postings.append(merged[np.lexsort((merged, -self.priority[merged]))])
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def append(self, product_ids, categories, brands, prices):
+        """A new catalog with rows added for new products (raw metadata values).
+
+        Missing brands become 'Generic Brand', missing prices 0.0 and missing
+        categories 'electronics', as in `build_product_catalog`; unseen
+        brand/category strings extend the vocabularies.
+        """
+        def codes_for(values, vocab, default):
+            vocab = list(vocab)
+            index = {v: k for k, v in enumerate(vocab)}
+            codes = []
+            for value in values:
+                value = default if _is_missing(value) else value
+                if value not in index:
+                    index[value] = len(vocab)
+                    vocab.append(value)
+                codes.append(index[value])
+            return np.array(codes, dtype=np.int32), vocab
+
+        category_codes, categories = codes_for(categories, self.categories, DEFAULT_CATEGORY)
+        brand_codes, brands = codes_for(brands, self.brands, GENERIC_BRAND)
+        prices = np.nan_to_num(np.asarray(prices, dtype=np.float32), nan=0.0)
+
+        return ProductCatalog(
+            np.concatenate([self.product_ids, np.asarray(product_ids, dtype=np.int64)]),
+            np.concatenate([self.category_codes, category_codes]), categories,
+            np.concatenate([self.brand_codes, brand_codes]), brands,
+            np.concatenate([self.prices, prices]),
+        )
+
+    # ---------- Lookup ----------
+
+    def row_of(self, product_id):
+        """Row of a product id (int or str), or -1 if unknown"""
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            return -1
+
+        if self._row_by_id is not None:
+            return self._row_by_id.get(product_id, -1)
+        row = int(np.searchsorted(self.product_ids, product_id))
+        if row < len(self.product_ids) and self.product_ids[row] == product_id:
+            return row
+        return -1
+
+    @property
+    def names(self):
+        """Generated product name for every row.
+
+        Names depend only on (brand, category), so each distinct pair is
+        named once and broadcast to its rows.
+        """
+        if self._names is None:
+            pairs = self.brand_codes.astype(np.int64) * len(self.categories) + self.category_codes
+            unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+            pair_names = np.array([
+                generate_product_name(None, {
+                    'brand': self.brands[p // len(self.categories)],
+                    'category_code': self.categories[p % len(self.categories)],
+                })
+                for p in unique_pairs
+            ], dtype=object)
+            self._names = pair_names[inverse.reshape(-1)]
+        return self._names
+
+    def info(self, row):
+        """Raw metadata for a row: category_code, brand, price"""
+        return {
+            'category_code': self.categories[self.category_codes[row]],
+            'brand': self.brands[self.brand_codes[row]],
+            # Prices are stored as float32; round back to cents for display
+            'price': round(float(self.prices[row]), 2),
+        }
+
+    def same_category(self, row, top_n=5):
+        """Best top_n rows sharing the row's category, excluding the row itself"""
+        posting = self.similar_postings[self.category_codes[row]][:top_n + 1]
+        return posting[posting != row][:top_n]
+
+    def details(self, row, product_id=None):
+        """Product dict in the shape returned by the recommendation functions"""
+        info = self.info(row)
+        return {
+            'product_id': int(self.product_ids[row]) if product_id is None else product_id,
+            'product_name': self.names[row],
+            'category': info['category_code'],
+            'brand': info['brand'],
+            'price': info['price'],
+        }
+
+
+def build_product_catalog(df, item_classes=None):
+    """Pick one metadata row per product, fully vectorized.
+
+    Same choice as the old groupby/apply: prefer a row with a real brand,
+    then one with price > 0, then the earliest row. Missing brands become
+    'Generic Brand', missing prices 0.0 and missing categories 'electronics'.
+    When `item_classes` is given, rows follow its order (the item encoding).
+    """
+    product_ids = df['product_id'].to_numpy().astype(np.int64)
+    category_codes, categories = _codes_with_default(df['category_code'], DEFAULT_CATEGORY)
+    brand_codes, brands = _codes_with_default(df['brand'], GENERIC_BRAND)
+    prices = np.nan_to_num(df['price'].to_numpy().astype(np.float32), nan=0.0)
+
+    has_brand = brands[brand_codes] != GENERIC_BRAND
+    has_price = prices > 0
+
+    # lexsort: last key is primary -> product, then brand first, then price first, then row order
+    order = np.lexsort((np.arange(len(df)), ~has_price, ~has_brand, product_ids))
+    sorted_ids = product_ids[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_ids[1:] != sorted_ids[:-1]
+    best = order[first]
+
+    if item_classes is not None:
+        rows = np.searchsorted(product_ids[best], np.asarray(item_classes, dtype=np.int64))
+        best = best[rows]
+
+    return ProductCatalog(
+        product_ids[best],
+        category_codes[best], categories,
+        brand_codes[best], brands,
+        prices[best],
+    )
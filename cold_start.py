@@ -0,0 +1,120 @@
+# ===========================
+# Cold-Start Recommendations
+# (session fold-in for users the model has never seen)
+# ===========================
+#
+# A user outside the trained vocabulary has no factor row, so the retriever
+# has nothing to score. When the request carries the products the user
+# viewed / carted in the current session, a user vector is built from them
+# on the fly and scored the way a known user is:
+#
+#   SVD:  [p, b] = ridge fit of r - mu - b_i ~ q_i . p + b over the session
+#         items, the ALS half-step of als.fold_in (item side fixed)
+#   NCF:  user embedding = rating-weighted mean of the session items' NCF
+#         item embeddings
+#
+# Stage 1 scans the catalog with p, stage 2 re-ranks the pool with the
+# hybrid score, exactly like ExactRetriever. Nothing is written back to the
+# model; users who should persist go through incremental.IncrementalUpdater.
+
+import numpy as np
+
+from als import fold_in_rows
+from retrieval import top_n_indices
+
+# ingest.RATING_MAP, repeated here so serving does not import pandas
+SESSION_EVENT_RATINGS = {"view": 1.0, "cart": 3.0, "purchase": 5.0}
+
+
+class ColdStartEngine:
+    """Top-N items for sessions of users the model has no vector for.
+
+    Sessions are (item codes, ratings) pairs; a batch of them is folded in
+    with one batched ridge solve (only the session items' factor rows are
+    read, so quantized factors are never dequantized in full) and scored
+    with one catalog product and one NCF forward pass. Session items are
+    excluded from the results, as seen items are for known users. Empty
+    sessions get p = 0, b = 0, i.e. items ranked by their bias.
+
+    The NCF part needs a scorer whose `ncf_predict` takes explicit user
+    vectors (`ncf_numpy.NumpyNCF`); with any other NCF, or `use_ncf=False`,
+    the NCF term is the global mean, as for a scorer without NCF.
+    """
+
+    def __init__(self, scorer, pool_size=None, reg=0.1, reg_bias=5.0, use_ncf=True):
+        self.scorer = scorer
+        self.pool_size = pool_size
+        self.reg = reg
+        self.reg_bias = reg_bias
+        self.use_ncf = use_ncf
+
+    @property
+    def ncf(self):
+        ncf = self.scorer.ncf_predict
+        return ncf if self.use_ncf and hasattr(ncf, "predict_vectors") else None
+
+    def user_vectors(self, sessions):
+        """SVD factors (B, k), SVD biases (B,) and NCF embeddings (B, d) or None for a batch of sessions"""
+        lengths = np.array([len(items) for items, _ in sessions], dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        items = np.concatenate([np.asarray(items, dtype=np.int64) for items, _ in sessions] + [np.empty(0, np.int64)])
+        ratings = np.concatenate([np.asarray(r, dtype=np.float64) for _, r in sessions] + [np.empty(0)])
+
+        # Only the session items' rows are gathered; the solve indexes them by position
+        factors, biases = fold_in_rows(indptr, np.arange(len(items)), ratings, self.scorer.item_factors(items),
+                                       self.scorer.bi[items], self.scorer.global_mean, self.reg, self.reg_bias)
+        factors = factors.astype(np.float32)
+
+        embeddings = None
+        ncf = self.ncf
+        if ncf is not None:
+            session_of = np.repeat(np.arange(len(sessions)), lengths)
+            weighted = ncf.item_vectors(items) * ratings[:, None].astype(np.float32)
+            embeddings = np.zeros((len(sessions), weighted.shape[1]), dtype=np.float32)
+            np.add.at(embeddings, session_of, weighted)
+            totals = np.bincount(session_of, weights=ratings, minlength=len(sessions))
+            embeddings /= np.maximum(totals, 1e-12)[:, None].astype(np.float32)
+        return factors, biases, embeddings
+
+    def recommend_batch(self, sessions, top_n=5):
+        """Top-N item codes and hybrid scores for a batch of sessions.
+
+        Same output as `ExactRetriever.recommend_batch`: two (B, top_n)
+        arrays, rows padded with item -1 and score -inf.
+        """
+        scorer = self.scorer
+        factors, biases, embeddings = self.user_vectors(sessions)
+
+        svd = scorer.catalog_dots(factors)
+        svd += biases[:, None]
+        svd += scorer.bi
+        svd += scorer.global_mean
+        low, high = scorer.rating_scale
+        np.clip(svd, low, high, out=svd)
+        for row, (items, _) in enumerate(sessions):
+            svd[row, np.asarray(items, dtype=np.int64)] = -np.inf
+
+        pool_size = scorer.n_items if self.pool_size is None else max(self.pool_size, top_n)
+        pool = top_n_indices(svd, pool_size)
+        pool_svd = np.take_along_axis(svd, pool, axis=1)
+        valid = np.isfinite(pool_svd)
+
+        if embeddings is None:
+            ncf = np.full(pool.shape, scorer.global_mean)
+        else:
+            rows = np.repeat(np.arange(len(sessions)), pool.shape[1])
+            ncf = self.ncf.predict_vectors(embeddings, rows, pool.reshape(-1)).reshape(pool.shape)
+        hybrid = scorer.ncf_weight * ncf + scorer.svd_weight * np.where(valid, pool_svd, 0.0)
+        hybrid[~valid] = -np.inf
+
+        best = top_n_indices(hybrid, top_n)
+        items = np.take_along_axis(pool, best, axis=1)
+        scores = np.take_along_axis(hybrid, best, axis=1)
+        items[~np.isfinite(scores)] = -1
+        return items, scores
+
+    def recommend(self, items, ratings, top_n=5):
+        """Top-N item codes and hybrid scores for one session"""
+        top_items, scores = self.recommend_batch([(items, ratings)], top_n)
+        valid = top_items[0] >= 0
+        return top_items[0][valid], scores[0][valid]
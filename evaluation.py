@@ -0,0 +1,127 @@
+# ===========================
+# Offline Evaluation
+# (vectorized pointwise error + bulk ranking metrics)
+# ===========================
+
+import numpy as np
+from scipy import sparse
+
+
+# ---------- Pointwise ----------
+
+def pointwise_metrics(y_true, y_pred, threshold=0.5, rating_range=4.0):
+    """RMSE, MAE, R² and share within ±threshold for aligned rating arrays"""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    errors = np.asarray(y_pred, dtype=np.float64) - y_true
+    ss_tot = np.sum((y_true - y_true.mean()) ** 2)
+    mae = float(np.abs(errors).mean())
+    return {
+        "rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "mae": mae,
+        "r2": float(1.0 - np.sum(errors ** 2) / ss_tot) if ss_tot > 0 else 0.0,
+        "within_threshold": float(np.mean(np.abs(errors) <= threshold) * 100),
+        "percentage_accuracy": (1 - mae / rating_range) * 100,
+    }
+
+
+# ---------- Ranking ----------
+
+def relevance_matrix(users, items, n_users, n_items, ratings=None, min_rating=None):
+    """Binary CSR users x items of held-out interactions counted as relevant.
+
+    With `min_rating`, only interactions rated at least that much count
+    (e.g. 3 = cart or purchase for the implicit 1/3/5 ratings).
+    """
+    users = np.asarray(users)
+    items = np.asarray(items)
+    if min_rating is not None:
+        keep = np.asarray(ratings) >= min_rating
+        users, items = users[keep], items[keep]
+    relevant = sparse.csr_matrix((np.ones(len(users), dtype=np.int8), (users, items)),
+                                 shape=(n_users, n_items))
+    relevant.sum_duplicates()
+    relevant.data[:] = 1
+    relevant.sort_indices()
+    return relevant
+
+
+def hit_matrix(recommended, users, relevant):
+    """(U, K) bool: is recommended[u, k] relevant for users[u]?
+
+    One sorted-key lookup for all users: every relevant (user, item) pair
+    and every recommended pair is encoded as user * n_items + item.
+    """
+    n_items = relevant.shape[1]
+    rows = np.repeat(np.arange(relevant.shape[0], dtype=np.int64), np.diff(relevant.indptr))
+    relevant_keys = rows * n_items + relevant.indices
+    keys = users.astype(np.int64)[:, None] * n_items + recommended
+    pos = np.minimum(np.searchsorted(relevant_keys, keys), max(len(relevant_keys) - 1, 0))
+    hits = (relevant_keys[pos] == keys) if len(relevant_keys) else np.zeros(keys.shape, dtype=bool)
+    return hits & (recommended >= 0)
+
+
+def ranking_metrics(recommended, users, relevant, k_values=(5, 10), n_items=None):
+    """Precision@K, Recall@K, NDCG@K, MAP@K and catalog coverage@K.
+
+    `recommended` is a (U, max K) matrix of item codes, best first, padded
+    with -1, for the users in `users`; `relevant` is the CSR from
+    `relevance_matrix`. Users without relevant items are skipped. Everything
+    is computed with array operations over all users at once.
+    """
+    users = np.asarray(users)
+    n_relevant = np.diff(relevant.indptr)[users]
+    keep = n_relevant > 0
+    recommended, users, n_relevant = recommended[keep], users[keep], n_relevant[keep]
+    hits = hit_matrix(recommended, users, relevant)
+    n_items = n_items or relevant.shape[1]
+
+    discounts = 1.0 / np.log2(np.arange(2, recommended.shape[1] + 2))
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)])
+    ranks = np.arange(1, recommended.shape[1] + 1)
+
+    metrics = {"users": int(len(users))}
+    for k in k_values:
+        top = hits[:, :k].astype(np.float64)
+        n_hits = top.sum(axis=1)
+        ideal_hits = np.minimum(n_relevant, k)
+        dcg = top @ discounts[:k]
+        precision_at_rank = np.cumsum(top, axis=1) / ranks[:k]
+        listed = recommended[:, :k]
+        metrics[k] = {
+            "precision": float(np.mean(n_hits / k)),
+            "recall": float(np.mean(n_hits / n_relevant)),
+            "ndcg": float(np.mean(dcg / ideal[ideal_hits])),
+            "map": float(np.mean((precision_at_rank * top).sum(axis=1) / ideal_hits)),
+            "coverage": float(len(np.unique(listed[listed >= 0])) / n_items),
+        }
+    return metrics
+
+
+def evaluate_ranking(retriever, test_users, test_items, n_users, n_items, k_values=(5, 10, 20),
+                     test_ratings=None, min_rating=None, max_users=None, batch_size=1024, seed=42):
+    """Ranking metrics of a retriever's top-K lists against held-out interactions.
+
+    The retriever should mask only training interactions (a seen index built
+    from the train split), otherwise the held-out items can never be hit.
+    Lists are produced with `recommend_batch` in blocks of `batch_size`
+    users; `max_users` evaluates a fixed random sample of the test users.
+    """
+    relevant = relevance_matrix(test_users, test_items, n_users, n_items,
+                                ratings=test_ratings, min_rating=min_rating)
+    return evaluate_ranking_against(retriever, relevant, k_values=k_values, max_users=max_users,
+                                    batch_size=batch_size, seed=seed)
+
+
+def evaluate_ranking_against(retriever, relevant, k_values=(5, 10, 20), max_users=None, batch_size=1024, seed=42):
+    """`evaluate_ranking` with the relevance CSR given directly (e.g. `InteractionStore.relevance()`)"""
+    n_items = relevant.shape[1]
+    users = np.flatnonzero(np.diff(relevant.indptr))
+    if max_users is not None and len(users) > max_users:
+        users = np.sort(np.random.default_rng(seed).choice(users, max_users, replace=False))
+
+    depth = max(k_values)
+    recommended = np.full((len(users), depth), -1, dtype=np.int64)
+    for start in range(0, len(users), batch_size):
+        block, _ = retriever.recommend_batch(users[start:start + batch_size], depth)
+        recommended[start:start + len(block), :block.shape[1]] = block
+    return ranking_metrics(recommended, users, relevant, k_values=k_values, n_items=n_items)
@@ -0,0 +1,338 @@
+# ===========================
+# Async HTTP Recommendation Service
+# (asyncio + stdlib HTTP/1.1, micro-batched scoring)
+# ===========================
+#
+#   python http_service.py artifacts/bundles --port 8000
+#
+#   GET /recommendations?user_id=512345&top_n=5
+#   GET /recommendations?user_id=999&session=1004856,1005115[&events=view,cart]
+#   GET /similar?product_id=1004856&top_n=5&mode=category
+#   GET /popular?top_n=10[&category=electronics.smartphone][&decayed=1]
+#   GET /search?q=samsung[&limit=10]
+#   GET /stats      batching and cache counters
+#   GET /health
+#
+# Responses are JSON: {"result": ...} or {"error": "..."}.
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from bundle import load_bundle
+from cold_start import SESSION_EVENT_RATINGS
+from result_cache import RecommendationCache
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class MicroBatcher:
+    """Coalesces concurrent recommendation requests into batched scoring calls.
+
+    Requests that miss the result cache wait in a queue until `max_batch`
+    have arrived or the oldest has waited `max_wait` seconds; the batch is
+    then scored with one `Recommender.recommend_with_details_batch` call per
+    distinct top_n (one SVD matrix product and one NCF forward pass per
+    call). Scoring runs on a single worker thread so the event loop keeps
+    accepting requests, and while one batch is being scored the next one
+    fills up. Unknown users with a session are batched the same way (their
+    vectors are folded in per batch); unknown users without one get the
+    popular products straight away.
+    """
+
+    def __init__(self, recommender, max_batch=64, max_wait=0.005):
+        self.recommender = recommender
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="scoring")
+        self._task = None
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def recommend(self, user_id, top_n, session=None):
+        # Sessionless unknown users and cache hits need no scoring, so they skip the queue
+        user = self.recommender.users.index_of(user_id)
+        if user < 0 and session is None:
+            return self.recommender.get_popular_products(top_n)
+        cache = self.recommender.cache
+        cached = cache.get(user, top_n) if cache is not None and user >= 0 else None
+        if cached is not None:
+            return [dict(product) for product in cached]
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((user_id, top_n, session, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Whatever else is already queued rides along, up to max_batch
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def _score(self, batch):
+        by_top_n = {}
+        for request in batch:
+            by_top_n.setdefault(request[1], []).append(request)
+        results = []
+        for top_n, requests in by_top_n.items():
+            details = self.recommender.recommend_with_details_batch([r[0] for r in requests], top_n,
+                                                                    sessions=[r[2] for r in requests])
+            results.extend(zip(requests, details))
+        return results
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.batches += 1
+            self.requests += len(batch)
+            try:
+                results = await loop.run_in_executor(self._executor, self._score, batch)
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (*_, future), details in results:
+                if not future.done():
+                    future.set_result(details)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": 1000 * self.max_wait,
+        }
+
+
+def _int_param(params, name, default=None, minimum=None):
+    values = params.get(name)
+    if not values:
+        if default is None:
+            raise BadRequest(f"missing parameter {name!r}")
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise BadRequest(f"parameter {name!r} must be an integer") from None
+    if minimum is not None and value < minimum:
+        raise BadRequest(f"parameter {name!r} must be at least {minimum}")
+    return value
+
+
+def _str_param(params, name, default=None):
+    values = params.get(name)
+    if not values:
+        if default is None:
+            raise BadRequest(f"missing parameter {name!r}")
+        return default
+    return values[0]
+
+
+def _session_param(params):
+    """(product_ids, events) from `session` / `events`, or None without a session"""
+    products = _str_param(params, "session", "")
+    if not products:
+        return None
+    try:
+        product_ids = [int(p) for p in products.split(",") if p]
+    except ValueError:
+        raise BadRequest("parameter 'session' must be comma-separated product ids") from None
+    events = _str_param(params, "events", "")
+    if not events:
+        return product_ids, None
+    events = events.split(",")
+    if len(events) != len(product_ids):
+        raise BadRequest("parameter 'events' needs one event type per session product")
+    unknown = sorted(set(events) - set(SESSION_EVENT_RATINGS))
+    if unknown:
+        raise BadRequest(f"unknown event types {unknown}; expected {sorted(SESSION_EVENT_RATINGS)}")
+    return product_ids, events
+
+
+class RecommendationService:
+    """HTTP front end over a Recommender; see the routes at the top of this file"""
+
+    def __init__(self, recommender, max_batch=64, max_wait=0.005):
+        self.recommender = recommender
+        self.batcher = MicroBatcher(recommender, max_batch=max_batch, max_wait=max_wait)
+        self.routes = {
+            "/recommendations": self.recommendations,
+            "/similar": self.similar,
+            "/popular": self.popular,
+            "/search": self.search,
+            "/stats": self.stats,
+            "/health": self.health,
+        }
+
+    # ---------- Routes ----------
+
+    async def recommendations(self, params):
+        return await self.batcher.recommend(_int_param(params, "user_id"), _int_param(params, "top_n", 5, minimum=1),
+                                            session=_session_param(params))
+
+    async def similar(self, params):
+        mode = _str_param(params, "mode", "category")
+        if mode not in ("category", "embedding"):
+            raise BadRequest("mode must be 'category' or 'embedding'")
+        return self.recommender.recommend_similar_products(
+            _int_param(params, "product_id"), _int_param(params, "top_n", 5, minimum=1), mode=mode)
+
+    async def popular(self, params):
+        return self.recommender.get_popular_products(
+            _int_param(params, "top_n", 10, minimum=1),
+            category=params.get("category", [None])[0],
+            decayed=_str_param(params, "decayed", "0").lower() in ("1", "true", "yes"),
+        )
+
+    async def search(self, params):
+        return self.recommender.search_product_by_name(_str_param(params, "q"),
+                                                       limit=_int_param(params, "limit", 10, minimum=1))
+
+    async def stats(self, params):
+        return {"batching": self.batcher.stats(), "cache": self.recommender.cache_stats(),
+                "model_version": self.recommender.model_version}
+
+    async def health(self, params):
+        return {"status": "ok"}
+
+    # ---------- HTTP ----------
+
+    async def dispatch(self, method, target):
+        """(status, body) for one request"""
+        if method != "GET":
+            return 405, {"error": f"method {method} not allowed"}
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return 404, {"error": f"unknown path {url.path}", "paths": sorted(self.routes)}
+        try:
+            return 200, {"result": await route(parse_qs(url.query))}
+        except BadRequest as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection; HTTP/1.1 keep-alive unless the client closes"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # The body cannot be framed, so answer and close the connection
+                    status, body = 400, {"error": f"malformed Content-Length {headers['content-length']!r}"}
+                    keep_alive = False
+                else:
+                    if length:
+                        await reader.readexactly(length)
+                    status, body = await self.dispatch(method, target)
+                    keep_alive = (headers.get("connection", "").lower() != "close"
+                                  and version.upper() == "HTTP/1.1")
+                payload = json.dumps(body).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"🌐 Serving {self.recommender.model_version} on http://{host}:{port}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def warm_up(recommender):
+    """Pay the one-off costs (NCF item projection, search index build) before the first request"""
+    if len(recommender.users):
+        recommender.retriever.recommend_batch(recommender.users.index_of(recommender.users.classes[:1]), 1)
+    recommender.search_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Async HTTP recommendation service over a bundle")
+    parser.add_argument("bundle", help="bundle root (follows LATEST) or a version directory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=64, help="requests scored together (1 disables batching)")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="longest a request waits for its batch")
+    parser.add_argument("--cache-size", type=int, default=10_000,
+                        help="cached per-user results (0 disables the cache)")
+    parser.add_argument("--cache-ttl", type=float, default=300.0, help="seconds a cached result stays valid")
+    options = parser.parse_args(argv)
+
+    cache = RecommendationCache(options.cache_size, options.cache_ttl) if options.cache_size > 0 else None
+    start = time.perf_counter()
+    recommender = load_bundle(options.bundle, cache=cache)
+    warm_up(recommender)
+    print(f"⚡ Loaded and warmed up in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    service = RecommendationService(recommender, max_batch=options.max_batch, max_wait=options.max_wait_ms / 1000)
+    try:
+        asyncio.run(service.serve(options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# ===========================
+# Incremental Model Updates
+# (fold new events into a trained recommender)
+# ===========================
+
+import argparse
+import time
+
+import numpy as np
+
+from als import fold_in
+from ingest import RATING_MAP
+
+
+def _column(events, name, default=None):
+    """Column of a DataFrame / dict of arrays as a NumPy array (or `default`)"""
+    if name not in events:
+        return default
+    values = events[name]
+    return values.to_numpy() if hasattr(values, "to_numpy") else np.asarray(values)
+
+
+def _first_rows(keys):
+    """Index of the first row for every distinct key, in row order"""
+    _, first = np.unique(keys, return_index=True)
+    return np.sort(first)
+
+
+def _in_csr_rows(csr, rows, columns):
+    """Whether each (rows[k], columns[k]) is stored in a CSR matrix with sorted indices.
+
+    A binary search within each row's indptr slice, run for all pairs
+    together, so only the touched rows are read.
+    """
+    low = csr.indptr[rows].astype(np.int64)
+    end = csr.indptr[np.asarray(rows) + 1].astype(np.int64)
+    high = end.copy()
+    while True:
+        active = low < high
+        if not active.any():
+            break
+        middle = (low + high) // 2
+        below = active & (csr.indices[np.minimum(middle, len(csr.indices) - 1)] < columns)
+        low = np.where(below, middle + 1, low)
+        high = np.where(active & ~below, middle, high)
+    found = low < end
+    found[found] = csr.indices[low[found]] == columns[found]
+    return found
+
+
+class IncrementalUpdater:
+    """Applies batches of new interaction events to a trained Recommender.
+
+    Each `update` call:
+      * grows the user / item vocabularies (new ids get the next codes) and
+        adds catalog rows for new products,
+      * deduplicates (user, product) pairs like the batch pipeline does:
+        the first event for a pair wins, later ones are ignored,
+      * adds the new pairs to the interaction store (the seen index) and
+        the popularity counts,
+      * folds the touched users and the new items into the SVD factors with
+        ridge solves against the fixed other side (`als.fold_in`),
+      * grows the NCF embedding tables and fine-tunes the NCF on the new
+        pairs only,
+      * drops the touched users' cached recommendations. Other users' cached
+        results may lag the fold-in / fine-tuning until their TTL runs out.
+
+    The interaction store must carry ratings (not the int8 ones of a
+    ratings-free seen index) because refolding a user needs their full
+    history. Existing items keep their factors until the next full
+    retrain. ANN candidate indexes are not rebuilt.
+    """
+
+    def __init__(self, recommender, ncf_model=None, rating_map=RATING_MAP, reg=0.1, reg_bias=5.0,
+                 fine_tune_epochs=1, learning_rate=1e-4, batch_size=256, verbose=True):
+        if recommender.seen_index.dtype == np.int8:
+            raise ValueError("IncrementalUpdater needs a seen index built with ratings")
+        self.recommender = recommender
+        self.ncf_model = ncf_model
+        self.rating_map = rating_map
+        self.reg = reg
+        self.reg_bias = reg_bias
+        self.fine_tune_epochs = fine_tune_epochs
+        self.learning_rate = learning_rate
+        self.batch_size = batch_size
+        self.verbose = verbose
+
+    # ---------- Steps ----------
+
+    def _ratings(self, events):
+        ratings = _column(events, "rating")
+        if ratings is not None:
+            return ratings.astype(np.float64)
+        event_types = _column(events, "event_type")
+        return np.array([self.rating_map.get(e, np.nan) for e in event_types], dtype=np.float64)
+
+    def _new_pairs(self, users, items, n_items_before):
+        """Mask of events whose (user, item) pair is new: first in the batch and not yet seen"""
+        interactions = self.recommender.interactions
+        keys = users * (len(self.recommender.items) + 1) + items
+        mask = np.zeros(len(keys), dtype=bool)
+        mask[_first_rows(keys)] = True
+
+        # Only old users can have seen old items: look those pairs up in the
+        # users' CSR rows (sorted item codes), all rows at once
+        old = np.flatnonzero(mask & (users < interactions.n_users) & (items < n_items_before))
+        mask[old[_in_csr_rows(interactions.csr, users[old], items[old])]] = False
+        return mask
+
+    def _fold_in_svd(self, users, n_items_before):
+        """Refit the touched users, then the new items, then users who rated new items"""
+        scorer = self.recommender.scorer
+        interactions = self.recommender.interactions
+        seen = interactions.csr
+        options = dict(reg=self.reg, reg_bias=self.reg_bias)
+
+        def fold_users(rows):
+            block = seen[rows]
+            scorer.pu[rows], scorer.bu[rows] = fold_in(
+                block.indptr, block.indices, block.data, scorer.qi, scorer.bi, scorer.global_mean, **options)
+
+        touched = np.unique(users)
+        fold_users(touched)
+
+        new_items = np.arange(n_items_before, seen.shape[1])
+        if len(new_items):
+            # CSC columns of the new items are their per-item groupings
+            by_item = interactions.csc[:, new_items]
+            scorer.qi[new_items], scorer.bi[new_items] = fold_in(
+                by_item.indptr, by_item.indices, by_item.data, scorer.pu, scorer.bu, scorer.global_mean, **options)
+            fold_users(np.unique(by_item.indices))
+
+    def _update_ncf(self, users, items, ratings):
+        from ncf import fine_tune_ncf, grow_ncf_model, make_ncf_predict, ncf_item_embeddings
+
+        recommender = self.recommender
+        model = self.ncf_model or getattr(recommender.scorer.ncf_predict, "model", None)
+        if model is None:
+            return False
+
+        if (model.user_embedding.input_dim < len(recommender.users)
+                or model.item_embedding.input_dim < len(recommender.items)):
+            model = grow_ncf_model(model, len(recommender.users), len(recommender.items))
+        fine_tune_ncf(model, users, items, ratings, epochs=self.fine_tune_epochs,
+                      batch_size=self.batch_size, learning_rate=self.learning_rate)
+
+        self.ncf_model = model
+        recommender.scorer.ncf_predict = make_ncf_predict(model)
+        recommender.refresh(item_embeddings=ncf_item_embeddings(model))
+        return True
+
+    # ---------- Update ----------
+
+    def update(self, events):
+        """Apply a batch of events (DataFrame or dict of arrays).
+
+        Needs user_id, product_id and either rating or event_type; optional
+        category_code / brand / price describe new products and timestamp
+        (unix seconds) feeds the time-decayed popularity. Returns a summary.
+        """
+        start = time.perf_counter()
+        recommender = self.recommender
+
+        ratings = self._ratings(events)
+        valid = ~np.isnan(ratings)
+        user_ids = _column(events, "user_id")[valid].astype(np.int64)
+        product_ids = _column(events, "product_id")[valid].astype(np.int64)
+        ratings = ratings[valid]
+        timestamps = _column(events, "timestamp")
+        timestamps = None if timestamps is None else timestamps[valid].astype(np.float64)
+
+        n_users_before, n_items_before = len(recommender.users), len(recommender.items)
+        users = recommender.users.extend(user_ids)
+        items = recommender.items.extend(product_ids)
+        n_users, n_items = len(recommender.users), len(recommender.items)
+
+        # Catalog rows for new products, from their first event in the batch
+        if n_items > n_items_before:
+            first = _first_rows(items)
+            first = first[items[first] >= n_items_before]
+            first = first[np.argsort(items[first])]
+            metadata = [_column(events, name, np.full(len(valid), None))[valid][first]
+                        for name in ("category_code", "brand")]
+            prices = _column(events, "price", np.zeros(len(valid)))[valid][first]
+            recommender.refresh(catalog=recommender.catalog.append(product_ids[first], *metadata, prices))
+
+        new = self._new_pairs(users, items, n_items_before)
+        users, items, ratings = users[new], items[new], ratings[new]
+        if timestamps is not None:
+            timestamps = timestamps[new]
+
+        recommender.scorer.grow(n_users, n_items)
+        recommender.refresh(interactions=recommender.interactions.add(users, items, ratings, n_users, n_items))
+
+        catalog = recommender.catalog
+        recommender.popularity.grow(
+            n_items,
+            categories=catalog.category_codes[n_items_before:],
+            eligible=(catalog.has_brand | catalog.has_price)[n_items_before:],
+        )
+        recommender.popularity.update(items, timestamps)
+
+        # Their seen sets changed, so cached results may now include seen items
+        recommender.invalidate_users(np.unique(users))
+
+        ncf_updated = False
+        if len(users):
+            self._fold_in_svd(users, n_items_before)
+            ncf_updated = self._update_ncf(users, items, ratings)
+
+        summary = {
+            "events": int(valid.sum()),
+            "new_pairs": int(len(users)),
+            "new_users": n_users - n_users_before,
+            "new_items": n_items - n_items_before,
+            "ncf_updated": ncf_updated,
+            "seconds": time.perf_counter() - start,
+        }
+        if self.verbose:
+            print(f"🔄 Applied {summary['new_pairs']:,} new interactions "
+                  f"(+{summary['new_users']:,} users, +{summary['new_items']:,} items) "
+                  f"in {summary['seconds']:.2f}s")
+        return summary
+
+
+def main(argv=None):
+    from bundle import export_bundle, load_bundle
+    from ingest import ELECTRONICS_KEYWORDS, clean_chunk, iter_event_chunks
+
+    parser = argparse.ArgumentParser(description="Fold a batch of new events into a serving bundle")
+    parser.add_argument("bundle", help="bundle root (follows LATEST) or a version directory")
+    parser.add_argument("events", help="event log CSV in the 2019-Nov schema")
+    parser.add_argument("--out", help="bundle root to write the new version to (default: same root)")
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--epochs", type=int, default=1, help="NCF fine-tuning epochs on the delta")
+    options = parser.parse_args(argv)
+
+    recommender = load_bundle(options.bundle, mmap_mode=None)
+    updater = IncrementalUpdater(recommender, fine_tune_epochs=options.epochs)
+    for chunk in iter_event_chunks(options.events, options.chunksize):
+        updater.update(clean_chunk(chunk, ELECTRONICS_KEYWORDS, updater.rating_map))
+
+    # Keep the source bundle's quantization and extra metadata
+    manifest = recommender.manifest
+    out = options.out or options.bundle
+    path = export_bundle(out, recommender, ncf_model=updater.ncf_model,
+                         extra={**manifest.get("extra", {}), "updated_from": manifest["model_version"]},
+                         quantize=(manifest.get("quantization") or {}).get("dtype"))
+    print(f"📦 Updated bundle written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# ===========================
+# Streaming Event-Log Ingestion
+# (chunked read, per-chunk filter, incremental dedupe)
+# ===========================
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from instrumentation import stage_of
+
+EVENT_COLUMNS = ["event_time", "user_id", "product_id", "category_code", "brand", "price", "event_type"]
+
+# Compact dtypes: ids as int64, repeated strings as categoricals, price as float32;
+# event_time stays text until clean_chunk turns it into unix seconds
+EVENT_DTYPES = {
+    "event_time": "str",
+    "user_id": "int64",
+    "product_id": "int64",
+    "category_code": "category",
+    "brand": "category",
+    "price": "float32",
+    "event_type": "category",
+}
+
+CATEGORICAL_COLUMNS = ["category_code", "brand", "event_type"]
+
+ELECTRONICS_KEYWORDS = ["electronics", "smartphone", "laptop", "computer", "camera", "headphone", "watch", "tablet"]
+RATING_MAP = {"view": 1.0, "cart": 3.0, "purchase": 5.0}
+
+# event_time as written in the 2019-Nov / 2019-Oct logs, e.g. "2019-11-01 00:00:00 UTC"
+EVENT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S UTC"
+
+# Columns of a cleaned chunk (and of the ingested interaction table)
+INTERACTION_DTYPES = {**{col: dtype for col, dtype in EVENT_DTYPES.items() if col != "event_time"},
+                      "timestamp": "int64", "rating": "float32"}
+
+
+def iter_event_chunks(path, chunksize=1_000_000, max_rows=None):
+    """Yield the seven needed columns of the event log, `chunksize` rows at a time"""
+    return pd.read_csv(
+        path,
+        usecols=EVENT_COLUMNS,
+        dtype=EVENT_DTYPES,
+        chunksize=chunksize,
+        nrows=max_rows,
+    )
+
+
+def category_mask(categories, keywords):
+    """Boolean mask of rows whose category_code contains any keyword.
+
+    The regex runs once per distinct category, not once per row.
+    """
+    categories = categories.astype("category")
+    pattern = "|".join(keywords)
+    matches = categories.cat.categories.str.contains(pattern, case=False, regex=True)
+    lookup = np.append(np.asarray(matches, dtype=bool), False)  # code -1 (NaN) -> False
+    return lookup[categories.cat.codes.to_numpy()]
+
+
+def event_timestamps(event_times):
+    """Unix seconds (int64) of event_time strings"""
+    # The format matches the literal " UTC", so the parsed (naive) times are UTC
+    parsed = pd.to_datetime(event_times, format=EVENT_TIME_FORMAT)
+    return parsed.to_numpy().astype("datetime64[s]").astype(np.int64)
+
+
+def clean_chunk(chunk, keywords=ELECTRONICS_KEYWORDS, rating_map=RATING_MAP):
+    """Drop incomplete rows, keep electronics, attach implicit ratings and unix timestamps"""
+    chunk = chunk[EVENT_COLUMNS].dropna(subset=["event_time", "user_id", "product_id", "event_type"])
+    chunk = chunk[category_mask(chunk["category_code"], keywords)]
+
+    rating = chunk["event_type"].map(rating_map).astype("float32")
+    chunk = chunk.assign(rating=rating)
+    chunk = chunk[chunk["rating"].notna()]
+    # Parsed after filtering, so only kept rows pay for it
+    timestamp = event_timestamps(chunk["event_time"])
+    return chunk.drop(columns="event_time").assign(timestamp=timestamp)[list(INTERACTION_DTYPES)]
+
+
+class PairDeduper:
+    """Keeps only the first occurrence of each (user_id, product_id) pair across chunks.
+
+    Pairs are packed into one int64 key (user_id << 32 | product_id) and the
+    keys seen so far are held in a sorted array, so memory grows with the
+    number of distinct pairs rather than the number of events. Only a
+    chunk's own keys are sorted; they are merged into the array with one
+    linear `np.insert`, never re-sorting what was already seen.
+    """
+
+    def __init__(self):
+        self._seen = np.empty(0, dtype=np.int64)
+
+    @staticmethod
+    def pack(user_ids, product_ids):
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        if len(user_ids) and (user_ids.min() < 0 or user_ids.max() >= 2 ** 31
+                              or product_ids.min() < 0 or product_ids.max() >= 2 ** 32):
+            raise ValueError("user_id must fit in 31 bits and product_id in 32 bits to pack pair keys")
+        return (user_ids << 32) | product_ids
+
+    def _is_seen(self, keys):
+        if len(self._seen) == 0:
+            return np.zeros(len(keys), dtype=bool)
+        pos = np.searchsorted(self._seen, keys)
+        pos[pos == len(self._seen)] = 0
+        return self._seen[pos] == keys
+
+    def first_occurrences(self, user_ids, product_ids):
+        """Mask of rows whose pair has not been seen in this or earlier chunks"""
+        keys = self.pack(user_ids, product_ids)
+        unique, first = np.unique(keys, return_index=True)
+        new = ~self._is_seen(unique)
+        mask = np.zeros(len(keys), dtype=bool)
+        mask[first[new]] = True
+
+        new_keys = unique[new]
+        self._seen = np.insert(self._seen, np.searchsorted(self._seen, new_keys), new_keys)
+        return mask
+
+
+def _concat_chunks(chunks):
+    """Concatenate cleaned chunks, merging per-chunk categorical vocabularies.
+
+    The merged categories are sorted, so codes do not depend on where the
+    chunk boundaries fell.
+    """
+    if not chunks:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in INTERACTION_DTYPES.items()})
+
+    columns = {}
+    for col in chunks[0].columns:
+        if col in CATEGORICAL_COLUMNS:
+            columns[col] = union_categoricals([c[col] for c in chunks], sort_categories=True, ignore_order=True)
+        else:
+            columns[col] = np.concatenate([c[col].to_numpy() for c in chunks])
+    return pd.DataFrame(columns)
+
+
+def load_interactions(path, chunksize=1_000_000, max_rows=None,
+                      keywords=ELECTRONICS_KEYWORDS, rating_map=RATING_MAP, verbose=True, profiler=None):
+    """Stream the event log into a deduplicated electronics interaction table.
+
+    Each chunk is filtered and rated on its own, and duplicate (user_id,
+    product_id) pairs are dropped incrementally (first occurrence wins, as
+    with `drop_duplicates`), so the full file never has to be in memory.
+    With a `PipelineProfiler`, CSV reading is timed as stage "load" and
+    filtering / rating / deduplication as "filter".
+    """
+    deduper = PairDeduper()
+    kept = []
+    rows_read = 0
+
+    chunks = iter_event_chunks(path, chunksize, max_rows)
+    while True:
+        with stage_of(profiler, "load"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        rows_read += len(chunk)
+        with stage_of(profiler, "filter"):
+            chunk = clean_chunk(chunk, keywords, rating_map)
+            chunk = chunk[deduper.first_occurrences(chunk["user_id"].values, chunk["product_id"].values)]
+        kept.append(chunk)
+
+        if verbose:
+            print(f"   ...read {rows_read:,} rows, kept {sum(len(c) for c in kept):,} interactions")
+
+    return _concat_chunks(kept)
@@ -0,0 +1,159 @@
+# ===========================
+# Pipeline Instrumentation
+# (per-stage time / memory, per-call latency histograms, JSON report)
+# ===========================
+
+import cProfile
+import functools
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+# Latency histogram bucket upper bounds in milliseconds (the last bucket is open)
+LATENCY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+class PipelineProfiler:
+    """Records wall time, CPU time and memory for named pipeline stages.
+
+    `with profiler.stage("svd_fit"): ...` measures one stage; entering the
+    same name again (e.g. once per CSV chunk) accumulates into it. For each
+    stage the report has wall and CPU seconds, the call count, the process
+    peak RSS after the stage and how much the stage raised it, and, with
+    `trace_memory=True`, the peak Python allocation inside the stage from
+    `tracemalloc` (accurate but slows allocation-heavy code noticeably).
+
+    `profiler.timed("recommend")` wraps a function so every call's latency
+    lands in a histogram (`LATENCY_BUCKETS_MS`) with p50 / p90 / p99.
+    With `profile_path`, the whole run between `start` and `write_report`
+    is also recorded by cProfile and dumped there (open it with pstats or
+    snakeviz).
+    """
+
+    def __init__(self, trace_memory=False, profile_path=None):
+        self.trace_memory = trace_memory
+        self.profile_path = profile_path
+        self.stages = {}
+        self.latencies = {}
+        self._profile = None
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profile_path:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    # ---------- Stages ----------
+
+    @contextmanager
+    def stage(self, name):
+        rss_before = peak_rss_mb()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            record = self.record_stage(name, wall, cpu)
+            record["rss_growth_mb"] += record["peak_rss_mb"] - rss_before
+            if tracemalloc.is_tracing():
+                peak = (tracemalloc.get_traced_memory()[1] - traced_before) / 2 ** 20
+                record["tracemalloc_peak_mb"] = max(record.get("tracemalloc_peak_mb", 0.0), peak)
+
+    def record_stage(self, name, wall_s, cpu_s, calls=1):
+        """Add time measured elsewhere (e.g. in worker processes) to a stage; returns its record"""
+        record = self.stages.setdefault(name, {
+            "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": 0.0, "rss_growth_mb": 0.0,
+        })
+        record["calls"] += calls
+        record["wall_s"] += wall_s
+        record["cpu_s"] += cpu_s
+        record["peak_rss_mb"] = peak_rss_mb()
+        return record
+
+    # ---------- Call latency ----------
+
+    def record_latency(self, name, seconds):
+        self.latencies.setdefault(name, []).append(seconds)
+
+    def timed(self, name):
+        """Decorator recording the latency of every call under `name`"""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record_latency(name, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def latency_summary(self, name):
+        ms = np.asarray(self.latencies[name]) * 1000.0
+        counts = np.bincount(np.searchsorted(LATENCY_BUCKETS_MS, ms), minlength=len(LATENCY_BUCKETS_MS) + 1)
+        labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "calls": int(len(ms)),
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p90_ms": float(np.percentile(ms, 90)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+            "histogram": {label: int(c) for label, c in zip(labels, counts) if c},
+        }
+
+    # ---------- Report ----------
+
+    def report(self):
+        return {
+            "total_wall_s": time.perf_counter() - self._started if self._started else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+            "latency": {name: self.latency_summary(name) for name in self.latencies},
+        }
+
+    def print_summary(self):
+        total = sum(s["wall_s"] for s in self.stages.values()) or 1.0
+        print(f"\n⏱️ PIPELINE PROFILE (peak RSS {peak_rss_mb():,.0f} MB):")
+        for name, s in self.stages.items():
+            print(f"   {name:<10} {s['wall_s']:>8.2f}s wall ({s['wall_s'] / total * 100:4.1f}%)  "
+                  f"{s['cpu_s']:>8.2f}s CPU  +{s['rss_growth_mb']:,.0f} MB RSS")
+        for name in self.latencies:
+            s = self.latency_summary(name)
+            print(f"   {name}: {s['calls']} calls, p50 {s['p50_ms']:.2f} ms, p99 {s['p99_ms']:.2f} ms")
+
+    def write_report(self, path):
+        """Write the JSON report (and the cProfile dump when enabled); returns the report"""
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.profile_path)
+        report = self.report()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+def stage_of(profiler, name):
+    """`profiler.stage(name)`, or a no-op context when there is no profiler"""
+    return profiler.stage(name) if profiler is not None else nullcontext()
@@ -0,0 +1,92 @@
+# ===========================
+# Columnar Interaction Cache
+# (.npy memmaps keyed by source hash + filter config)
+# ===========================
+#
+# The pipeline's ingest stage is stored here: the filtered, deduplicated
+# interaction table as one .npy file per column, plus the user / product
+# vocabularies. A warm start with the same source file and filter settings
+# memory-maps the columns instead of parsing the CSV again.
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+CACHE_FORMAT_VERSION = 1
+
+
+def file_sha256(path, memo_path=None, block_size=8 * 1024 * 1024):
+    """SHA-256 of a file, streamed in blocks.
+
+    Hashing tens of GB is not free, so results are memoised in `memo_path`
+    (a small JSON file) keyed by path, size and mtime.
+    """
+    stat = os.stat(path)
+    memo_key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    memo = {}
+    if memo_path and os.path.exists(memo_path):
+        with open(memo_path) as f:
+            memo = json.load(f)
+        if memo_key in memo:
+            return memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    sha = digest.hexdigest()
+
+    if memo_path:
+        memo[memo_key] = sha
+        os.makedirs(os.path.dirname(memo_path) or ".", exist_ok=True)
+        with open(memo_path, "w") as f:
+            json.dump(memo, f)
+    return sha
+
+
+def interaction_cache_key(path, config, memo_path=None):
+    """Cache key from the source file's hash and the filter config (a JSON-serializable dict)"""
+    payload = json.dumps({"version": CACHE_FORMAT_VERSION, "source": file_sha256(path, memo_path=memo_path),
+                          "config": config}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def save_interaction_cache(directory, arrays, meta):
+    """Write the interaction columns (`arrays`, name -> 1-D array) and JSON `meta`.
+
+    The directory is written under a temporary name and renamed, so readers
+    never see a partial cache.
+    """
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.asarray(array))
+    manifest = {"version": CACHE_FORMAT_VERSION, "arrays": sorted(arrays), "meta": meta}
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return directory
+
+
+def load_interaction_cache(directory, mmap_mode="r"):
+    """(arrays, meta) of a cache written by `save_interaction_cache`, or None on a miss.
+
+    Columns are memory-mapped, so a warm start costs little more than
+    opening the files.
+    """
+    manifest_path = os.path.join(directory, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != CACHE_FORMAT_VERSION:
+        return None
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+              for name in manifest["arrays"]}
+    return arrays, manifest["meta"]
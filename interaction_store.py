@@ -0,0 +1,137 @@
+# ===========================
+# Interaction Store
+# (deduplicated ratings as CSR user -> items and CSC item -> users)
+# ===========================
+
+import numpy as np
+
+from retrieval import build_seen_index
+
+
+class InteractionStore:
+    """Deduplicated (user, item, rating) interactions shared by training, evaluation and serving.
+
+    Interactions are aligned code arrays in table order (interaction k is
+    row k of the ingested table). The CSR users x items matrix and its CSC
+    twin, both holding the ratings, are built from them once, on first use:
+
+      * a user's history is one CSR row slice and an item's users one CSC
+        column slice, instead of a scan of the whole table,
+      * user / item degrees come from the index pointers,
+      * `take` / `split` select interactions by table row, so a train/test
+        split is just two index arrays.
+
+    The CSR doubles as the serving seen index. A store loaded from a bundle
+    starts from that CSR alone (`from_csr`); its table-order arrays are then
+    the CSR entries in CSR order.
+    """
+
+    def __init__(self, users, items, ratings, n_users, n_items, csr=None):
+        self.shape = (int(n_users), int(n_items))
+        self._users = None if users is None else np.asarray(users, dtype=np.int64)
+        self._items = None if items is None else np.asarray(items, dtype=np.int64)
+        self._ratings = None if ratings is None else np.asarray(ratings, dtype=np.float32)
+        self._csr = csr
+        self._csc = None
+
+    @classmethod
+    def from_csr(cls, matrix):
+        """A store over an existing CSR users x items matrix (e.g. a bundle's seen index)"""
+        return cls(None, None, None, *matrix.shape, csr=matrix)
+
+    @property
+    def n_users(self):
+        return self.shape[0]
+
+    @property
+    def n_items(self):
+        return self.shape[1]
+
+    def __len__(self):
+        return len(self._users) if self._users is not None else self._csr.nnz
+
+    # ---------- Table-order arrays ----------
+
+    @property
+    def users(self):
+        if self._users is None:
+            self._users = np.repeat(np.arange(self.n_users, dtype=np.int64), np.diff(self._csr.indptr))
+        return self._users
+
+    @property
+    def items(self):
+        if self._items is None:
+            self._items = self._csr.indices.astype(np.int64)
+        return self._items
+
+    @property
+    def ratings(self):
+        if self._ratings is None:
+            self._ratings = self._csr.data.astype(np.float32)
+        return self._ratings
+
+    # ---------- Sparse views ----------
+
+    @property
+    def csr(self):
+        """users x items, ratings as values, sorted indices"""
+        if self._csr is None:
+            self._csr = build_seen_index(self.users, self.items, *self.shape, ratings=self.ratings)
+        return self._csr
+
+    @property
+    def csc(self):
+        """The same matrix in CSC form: column i lists the users of item i"""
+        if self._csc is None:
+            self._csc = self.csr.tocsc()
+            self._csc.sort_indices()
+        return self._csc
+
+    def history(self, user):
+        """(item codes, ratings) of one user, from its CSR row"""
+        start, stop = self.csr.indptr[user], self.csr.indptr[user + 1]
+        return self.csr.indices[start:stop], self.csr.data[start:stop]
+
+    def item_users(self, item):
+        """(user codes, ratings) of one item, from its CSC column"""
+        start, stop = self.csc.indptr[item], self.csc.indptr[item + 1]
+        return self.csc.indices[start:stop], self.csc.data[start:stop]
+
+    def user_degrees(self):
+        return np.diff(self.csr.indptr)
+
+    def item_degrees(self):
+        if self._csc is not None:
+            return np.diff(self._csc.indptr)
+        return np.bincount(self.csr.indices, minlength=self.n_items)
+
+    def relevance(self, min_rating=None):
+        """Binary int8 CSR of the interactions, optionally only those rated at least `min_rating`"""
+        relevant = self.csr.copy()
+        if min_rating is not None:
+            relevant.data[relevant.data < min_rating] = 0
+            relevant.eliminate_zeros()
+        relevant.data = np.ones(relevant.nnz, dtype=np.int8)
+        return relevant
+
+    # ---------- Subsets and growth ----------
+
+    def take(self, rows):
+        """The interactions at the given table rows, in that order"""
+        rows = np.asarray(rows)
+        return InteractionStore(self.users[rows], self.items[rows], self.ratings[rows], *self.shape)
+
+    def split(self, train_rows, test_rows):
+        """(train, test) stores from two arrays of table rows"""
+        return self.take(train_rows), self.take(test_rows)
+
+    def add(self, users, items, ratings, n_users, n_items):
+        """A grown store with new (user, item) pairs appended.
+
+        Pairs must not already be present (deduplicate first); the result
+        has shape (n_users, n_items).
+        """
+        return InteractionStore(np.concatenate([self.users, np.asarray(users, dtype=np.int64)]),
+                                np.concatenate([self.items, np.asarray(items, dtype=np.int64)]),
+                                np.concatenate([self.ratings, np.asarray(ratings, dtype=np.float32)]),
+                                n_users, n_items)
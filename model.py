@@ -3,663 +3,360 @@
 # (SVD + Neural Collaborative Filtering)
 # for Electronics products
 # ===========================
+#
+# Importing this module trains nothing: the steps live in pipeline.py as
+# cached stages. `python model.py` runs them with the settings below,
+# prints the reports and the demo and exports a serving bundle; other
+# code calls `build()` (or `build(CONFIG.replace(...))`) and then uses
+# the recommendation functions.
 
-import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from surprise import SVD, Dataset, Reader
-import tensorflow as tf
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from pipeline import Pipeline, PipelineConfig
+from result_cache import RecommendationCache
+from incremental import IncrementalUpdater
+from instrumentation import PipelineProfiler
+
+# Wall / CPU time and peak memory per named stage, latency histograms for the
+# recommend / search functions, written as a JSON report at the end of the run.
+# TRACE_MEMORY adds tracemalloc peaks (slower); CPROFILE_PATH dumps cProfile stats
+PROFILE_REPORT_PATH = "artifacts/reports/pipeline_profile.json"
+TRACE_MEMORY = False
+CPROFILE_PATH = None  # e.g. "artifacts/reports/pipeline.prof"
+profiler = PipelineProfiler(trace_memory=TRACE_MEMORY, profile_path=CPROFILE_PATH)
 
 # ----------------------------------
-# Step 1: Load & Preprocess Dataset
+# Step 1: Pipeline Configuration
 # ----------------------------------
 
-# Load your dataset
-df = pd.read_csv("/kaggle/input/ecommerce-behavior-data-from-multi-category-store/2019-Nov.csv", nrows=500000)
-
-# Clean and keep useful columns
-df = df[["user_id", "product_id", "category_code", "brand", "price", "event_type"]].copy()
-
-# Remove any rows with None, NaN, or empty strings in critical columns
-df = df.dropna(subset=["user_id", "product_id", "event_type"])
-df = df[(df["user_id"] != "") & (df["product_id"] != "") & (df["event_type"] != "")]
+# Path to the raw event log
+DATA_PATH = "/kaggle/input/ecommerce-behavior-data-from-multi-category-store/2019-Nov.csv"
 
 # Filter only electronics-related categories
 electronics_keywords = ["electronics", "smartphone", "laptop", "computer", "camera", "headphone", "watch", "tablet"]
-df = df[df["category_code"].astype(str).str.contains('|'.join(electronics_keywords), case=False, na=False)]
-
-print("Filtered electronics data shape:", df.shape)
 
 # Assign implicit ratings
 rating_map = {"view": 1.0, "cart": 3.0, "purchase": 5.0}
-df["rating"] = df["event_type"].map(rating_map)
-
-# Remove any remaining nulls in ratings
-df = df.dropna(subset=["rating"])
-
-# Remove duplicates
-df = df.drop_duplicates(subset=["user_id", "product_id"])
-
-# Encode IDs
-df = df[df["user_id"].notna() & df["product_id"].notna()]
-df = df[(df["user_id"] != "") & (df["product_id"] != "")]
-
-user_enc = LabelEncoder()
-item_enc = LabelEncoder()
-
-df["user"] = user_enc.fit_transform(df["user_id"].values)
-df["item"] = item_enc.fit_transform(df["product_id"].values)
-
-n_users = df["user"].nunique()
-n_items = df["item"].nunique()
-print(f"Users: {n_users}, Items: {n_items}")
-
-# Split into train/test
-train, test = train_test_split(df, test_size=0.2, random_state=42)
-
-print(f"Train shape: {train.shape}, Test shape: {test.shape}")
-
-# ----------------------------------
-# Step 2: Train SVD Model
-# ----------------------------------
-
-reader = Reader(rating_scale=(1, 5))
-data_svd = Dataset.load_from_df(train[["user", "item", "rating"]], reader)
-trainset = data_svd.build_full_trainset()
-
-svd_model = SVD(n_factors=50, random_state=42)
-svd_model.fit(trainset)
-
-# Predict ratings on test
-testset = list(zip(test["user"], test["item"], test["rating"]))
-svd_preds = [svd_model.predict(uid, iid).est for uid, iid, _ in testset]
-test["svd_pred"] = svd_preds
-
-print("✅ SVD model trained.")
 
-# ----------------------------------
-# Step 3: Neural Collaborative Filtering (FIXED)
-# ----------------------------------
-
-# Get unique users and items for vocabulary
-unique_users = df["user_id"].astype(str).unique().tolist()
-unique_items = df["product_id"].astype(str).unique().tolist()
-
-print(f"Unique users: {len(unique_users)}, Unique items: {len(unique_items)}")
-
-# Create TensorFlow datasets with PROPER structure (features, labels)
-def create_tf_datasets(train_df, test_df):
-    """Create properly structured TF datasets with features and labels separated"""
-    
-    # Prepare training data
-    train_user_ids = train_df["user_id"].astype(str).values
-    train_product_ids = train_df["product_id"].astype(str).values
-    train_ratings = train_df["rating"].astype(np.float32).values
-    
-    # Prepare test data
-    test_user_ids = test_df["user_id"].astype(str).values
-    test_product_ids = test_df["product_id"].astype(str).values
-    test_ratings = test_df["rating"].astype(np.float32).values
-    
-    # Create datasets with (features, labels) structure
-    train_ds = tf.data.Dataset.from_tensor_slices((
-        {
-            "user_id": train_user_ids,
-            "product_id": train_product_ids
-        },
-        train_ratings  # Labels separate from features
-    ))
-    
-    test_ds = tf.data.Dataset.from_tensor_slices((
-        {
-            "user_id": test_user_ids,
-            "product_id": test_product_ids
-        },
-        test_ratings  # Labels separate from features
-    ))
-    
-    return train_ds, test_ds
-
-train_tf, test_tf = create_tf_datasets(train, test)
-
-# Batch and configure datasets
-train_tf = train_tf.batch(256).shuffle(5000).prefetch(tf.data.AUTOTUNE)
-test_tf = test_tf.batch(256).prefetch(tf.data.AUTOTUNE)
-
-# NCF Model
-class NCFModel(tf.keras.Model):
-    def __init__(self, unique_users, unique_items, embedding_dim=32):
-        super().__init__()
-        
-        # User embedding
-        self.user_embedding = tf.keras.Sequential([
-            tf.keras.layers.StringLookup(
-                vocabulary=unique_users, 
-                mask_token=None,
-                num_oov_indices=1  # Handle unknown users
-            ),
-            tf.keras.layers.Embedding(
-                input_dim=len(unique_users) + 1,
-                output_dim=embedding_dim
-            )
-        ])
-        
-        # Item embedding  
-        self.item_embedding = tf.keras.Sequential([
-            tf.keras.layers.StringLookup(
-                vocabulary=unique_items,
-                mask_token=None,
-                num_oov_indices=1  # Handle unknown items
-            ),
-            tf.keras.layers.Embedding(
-                input_dim=len(unique_items) + 1,
-                output_dim=embedding_dim
-            )
-        ])
-        
-        # Neural network
-        self.dense_layers = tf.keras.Sequential([
-            tf.keras.layers.Dense(64, activation='relu'),
-            tf.keras.layers.BatchNormalization(),
-            tf.keras.layers.Dropout(0.2),
-            tf.keras.layers.Dense(32, activation='relu'),
-            tf.keras.layers.Dropout(0.2),
-            tf.keras.layers.Dense(1)
-        ])
-        
-    def call(self, inputs):
-        user_emb = self.user_embedding(inputs["user_id"])
-        item_emb = self.item_embedding(inputs["product_id"])
-        
-        # Concatenate embeddings
-        concatenated = tf.concat([user_emb, item_emb], axis=1)
-        
-        # Predict rating
-        return self.dense_layers(concatenated)
-
-# Create and compile model
-print("Creating NCF model...")
-ncf_model = NCFModel(unique_users, unique_items, embedding_dim=32)
-
-ncf_model.compile(
-    optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
-    loss='mse',
-    metrics=['mae', 'mse']
+# Stage outputs are cached under .cache/pipeline by the fingerprint of their
+# inputs, so e.g. changing only the NCF settings reuses ingest, encode and SVD.
+# MF_BACKEND "surprise": single-threaded SGD (surprise.SVD); "als": biased ALS
+# on the grouped rating matrix, solved in batches across all cores
+CONFIG = PipelineConfig(
+    data_path=DATA_PATH,
+    keywords=electronics_keywords,
+    rating_map=rating_map,
+    mf_backend="surprise",
+    n_factors=50,
+    embedding_dim=32,
+    ncf_batch_size=256,
+    ncf_epochs=5,
+    ncf_weight=0.6,
+    svd_weight=0.4,
+    # None: hybrid-score every unseen item; an int pre-filters that many by SVD
+    pool_size=None,
+    # Optional ANN candidate generation for very large catalogs
+    use_ann_candidates=False,
+    ann_n_candidates=200,
+    ann_n_probe=8,
 )
 
-# Add early stopping
-early_stopping = tf.keras.callbacks.EarlyStopping(
-    patience=2,
-    restore_best_weights=True
-)
+# Set by build()
+pipeline = None
+recommender = None
+catalog = None
+search_index = None
+updater = None
 
-print("Starting NCF training...")
 
-# Train the model
-history = ncf_model.fit(
-    train_tf,
-    epochs=5,
-    validation_data=test_tf,
-    callbacks=[early_stopping],
-    verbose=1
-)
+def build(config=CONFIG):
+    """Run (or load from cache) every stage and bind the serving objects"""
+    global pipeline, recommender, catalog, search_index, updater
+    pipeline = Pipeline(config, profiler=profiler)
+    pipeline.run()
 
-print("✅ NCF model trained successfully!")
+    # Serving facade over the trained artifacts: the same object is exported as
+    # a bundle and reloaded by serve.py. Catalog rows line up with item codes,
+    # so NCF embedding row r is catalog row r (behavioural similarity)
+    recommender = pipeline.recommender(cache=RecommendationCache(max_entries=10_000, ttl=300))
+    catalog = recommender.catalog
 
-# ----------------------------------
-# Step 4: Combine Predictions (Hybrid)
-# ----------------------------------
-
-def safe_predict(model, user_ids, product_ids):
-    """Safe prediction with error handling"""
-    try:
-        predictions = model({
-            "user_id": tf.constant(user_ids),
-            "product_id": tf.constant(product_ids)
-        }, training=False)
-        return predictions.numpy().flatten()
-    except Exception as e:
-        print(f"Prediction error: {e}")
-        return np.full(len(user_ids), 3.0)  # Default rating
-
-# Get predictions
-print("Generating predictions...")
-ncf_preds = safe_predict(
-    ncf_model, 
-    test["user_id"].astype(str).values, 
-    test["product_id"].astype(str).values
-)
+    # Token / n-gram inverted index for product search
+    search_index = recommender.search_index
 
-test["ncf_pred"] = ncf_preds
+    # New events (user_id, product_id, event_type [, category_code, brand, price])
+    # are folded in with `updater.update(events)`: vocabularies, catalog, seen
+    # index and popularity grow in place, touched users / new items are folded
+    # into the SVD factors and the NCF is fine-tuned on the delta only
+    updater = IncrementalUpdater(recommender, ncf_model=pipeline.ncf_model())
+    return recommender
 
-# Combine predictions (hybrid)
-test["hybrid_pred"] = 0.6 * test["ncf_pred"] + 0.4 * test["svd_pred"]
 
 # ----------------------------------
-# Step 5: Evaluate Hybrid Model
+# Step 2: Recommendation Functions
 # ----------------------------------
 
-# Calculate metrics
-hybrid_rmse = np.sqrt(mean_squared_error(test["rating"], test["hybrid_pred"]))
-hybrid_mae = mean_absolute_error(test["rating"], test["hybrid_pred"])
-
-svd_rmse = np.sqrt(mean_squared_error(test["rating"], test["svd_pred"]))
-ncf_rmse = np.sqrt(mean_squared_error(test["rating"], test["ncf_pred"]))
-
-print(f"\n📊 MODEL PERFORMANCE:")
-print(f"Hybrid  - RMSE: {hybrid_rmse:.4f}, MAE: {hybrid_mae:.4f}")
-print(f"SVD     - RMSE: {svd_rmse:.4f}")
-print(f"NCF     - RMSE: {ncf_rmse:.4f}")
-
-# ----------------------------------
-# Step 6: Recommend Products
-# ----------------------------------
-
-def recommend_for_user(user_id, top_n=5):
+@profiler.timed("recommend_for_user")
+def recommend_for_user(user_id, top_n=5, session=None, events=None):
     """Generate recommendations for a user"""
-    if user_id not in user_enc.classes_:
-        print(f"User {user_id} not found in training data")
-        return []
-    
-    user_enc_id = user_enc.transform([user_id])[0]
-    user_items = df[df["user"] == user_enc_id]["item"].unique()
-    all_items = np.setdiff1d(np.arange(n_items), user_items)
-
-    # Limit candidate items for efficiency
-    sample_size = min(100, len(all_items))
-    candidate_items = np.random.choice(all_items, sample_size, replace=False)
-    
-    recs = []
-    for item_id in candidate_items:
-        try:
-            # SVD prediction
-            svd_score = svd_model.predict(user_enc_id, item_id).est
-            
-            # NCF prediction - Convert to string properly
-            product_id_original = item_enc.inverse_transform([item_id])[0]
-            product_id_str = str(product_id_original)  # Ensure it's a string
-            user_id_str = str(user_id)  # Ensure user_id is also string
-            
-            ncf_score = safe_predict(ncf_model, [user_id_str], [product_id_str])[0]
-            
-            # Hybrid score
-            final_score = 0.6 * ncf_score + 0.4 * svd_score
-            recs.append((item_id, final_score, product_id_original))
-            
-        except Exception as e:
-            continue  # Skip items that cause errors
-
-    # Sort by score and return top N
-    recs.sort(key=lambda x: x[1], reverse=True)
-    return [item[2] for item in recs[:top_n]]
-
-# ----------------------------------
-# Step 7: Create Product Lookup System
-# ----------------------------------
+    if not recommender.has_user(user_id):
+        # Cold start: fold in the products viewed / carted in this session,
+        # or fall back to the most popular products
+        print(f"User {user_id} not found in training data, using "
+              f"{'their session' if session is not None else 'popular products'}")
 
-# Create product metadata dictionary with product names - KEEP ALL DATA
-# Use the original df to preserve all metadata
-product_metadata = df[['product_id', 'category_code', 'brand', 'price']].copy()
-
-# Fill missing values BEFORE creating lookup
-product_metadata['brand'] = product_metadata['brand'].fillna('Generic Brand')
-product_metadata['price'] = product_metadata['price'].fillna(0.0)
-product_metadata['category_code'] = product_metadata['category_code'].fillna('electronics')
-
-# For each product, get the entry with most complete data (prefer non-zero price, non-null brand)
-def get_best_metadata(group):
-    # Sort by: has brand (True first), has price > 0 (True first)
-    group = group.copy()
-    group['has_brand'] = group['brand'] != 'Generic Brand'
-    group['has_price'] = group['price'] > 0
-    group = group.sort_values(['has_brand', 'has_price'], ascending=False)
-    return group.iloc[0]
-
-product_metadata = product_metadata.groupby('product_id', group_keys=False).apply(get_best_metadata)
-
-# CRITICAL FIX: Create lookup with BOTH string and int keys for compatibility
-product_lookup = {}
-for idx, row in product_metadata.iterrows():
-    pid = row['product_id']
-    info = {
-        'category_code': row['category_code'],
-        'brand': row['brand'],
-        'price': row['price']
-    }
-    # Store with BOTH string and original type as keys
-    product_lookup[str(pid)] = info
-    product_lookup[pid] = info
-
-print(f"\n✅ Product metadata loaded for {len(product_metadata)} products")
-print(f"   Products with brands: {sum(1 for _, p in product_metadata.iterrows() if p['brand'] != 'Generic Brand')}")
-print(f"   Products with prices: {sum(1 for _, p in product_metadata.iterrows() if p['price'] > 0)}")
-
-def generate_product_name(product_id, info):
-    """Generate a readable product name from metadata"""
-    brand = info.get('brand', 'Generic Brand')
-    category = info.get('category_code', 'electronics')
-    price = info.get('price', 0.0)
-    
-    # Handle missing brand
-    if pd.isna(brand) or brand == '' or brand == 'Generic Brand':
-        brand = 'Generic Brand'
-    
-    # Extract product type from category (last part)
-    if pd.notna(category) and category and str(category).lower() != 'nan':
-        parts = str(category).split('.')
-        # Get the most specific category part
-        if len(parts) >= 2:
-            product_type = parts[-1].replace('_', ' ').title()
-        else:
-            product_type = 'Electronics'
-    else:
-        product_type = 'Electronics'
-    
-    # Create product name with brand
-    if brand != 'Generic Brand':
-        product_name = f"{brand} {product_type}"
-    else:
-        product_name = f"{product_type}"
-    
-    return product_name
+    # Score every unseen item and keep the top N (deterministic)
+    return recommender.recommend_for_user(user_id, top_n, session=session, events=events)
 
 def get_product_info(product_id):
     """Get product information by ID with generated name"""
-    # Try both string and original type
-    info = product_lookup.get(product_id) or product_lookup.get(str(product_id))
-    
-    if info is None:
-        # Return default info if not found
-        return {
-            'product_id': product_id,
-            'product_name': 'Unknown Product',
-            'category': 'Unknown',
-            'brand': 'Unknown',
-            'price': 0.0
-        }
-    
-    product_name = generate_product_name(product_id, info)
-    
-    # Get values with defaults
-    brand = info.get('brand', 'Unknown')
-    if pd.isna(brand) or brand == '':
-        brand = 'Generic Brand'
-    
-    price = info.get('price', 0.0)
-    if pd.isna(price):
-        price = 0.0
-    
-    category = info.get('category_code', 'Unknown')
-    if pd.isna(category) or category == '':
-        category = 'Electronics'
-    
-    return {
-        'product_id': product_id,
-        'product_name': product_name,
-        'category': category,
-        'brand': brand,
-        'price': float(price)
-    }
+    # Accepts both string and integer ids; unknown ids get default info
+    return recommender.get_product_info(product_id)
 
+@profiler.timed("search_product_by_name")
 def search_product_by_name(search_term):
     """Search for products by brand or category name"""
-    search_term = str(search_term).lower()
-    matches = []
-    
-    for pid, info in product_lookup.items():
-        category = str(info.get('category_code', '')).lower()
-        brand = str(info.get('brand', '')).lower()
-        product_name = generate_product_name(pid, info).lower()
-        
-        if search_term in category or search_term in brand or search_term in product_name:
-            matches.append({
-                'product_id': pid,
-                'product_name': generate_product_name(pid, info),
-                'category': info.get('category_code', 'Unknown'),
-                'brand': info.get('brand', 'Unknown'),
-                'price': info.get('price', 0.0)
-            })
-    
-    return matches[:10]  # Return top 10 matches
+    # Inverted-index lookup; returns the top 10 matches
+    return recommender.search_product_by_name(search_term, limit=10)
 
+@profiler.timed("recommend_with_details")
 def recommend_with_details(user_id, top_n=5):
     """Get recommendations with full product details"""
     product_ids = recommend_for_user(user_id, top_n)
-    
+
     recommendations = []
     for pid in product_ids:
         info = get_product_info(pid)
         recommendations.append(info)
-    
+
     return recommendations
 
-def recommend_similar_products(product_id, top_n=5):
-    """Recommend products similar to a given product (content-based)"""
-    # Try both string and original type
-    target_info = product_lookup.get(product_id) or product_lookup.get(str(product_id))
-    
-    if target_info is None:
+@profiler.timed("recommend_similar_products")
+def recommend_similar_products(product_id, top_n=5, mode="category"):
+    """Recommend products similar to a given product.
+
+    mode="category" is content-based (same category, brand/price first);
+    mode="embedding" returns behaviourally similar items by cosine
+    similarity of the NCF item embeddings.
+    """
+    if catalog.row_of(product_id) < 0:
         print(f"⚠️ Product {product_id} not found in product database")
         # Return popular products as fallback
         return get_popular_products(top_n)
-    
-    # Get product category
-    target_category = str(target_info.get('category_code', ''))
-    
-    # Find products in same category
-    similar = []
-    seen_pids = set()
-    
-    for pid, info in product_lookup.items():
-        pid_str = str(pid)
-        
-        # Skip duplicates and self
-        if pid_str in seen_pids or pid_str == str(product_id):
-            continue
-        seen_pids.add(pid_str)
-        
-        category = str(info.get('category_code', ''))
-        brand = info.get('brand', 'Generic Brand')
-        price = info.get('price', 0.0)
-        
-        # Match by category and prefer items with brand and price
-        if target_category and target_category in category:
-            # Prioritize products with complete metadata
-            has_brand = brand != 'Generic Brand' and pd.notna(brand) and brand != ''
-            has_price = price > 0
-            priority = (has_brand * 2) + has_price  # Products with brand get higher priority
-            
-            similar.append({
-                'product_id': pid,
-                'product_name': generate_product_name(pid, info),
-                'category': info.get('category_code', 'Unknown'),
-                'brand': brand,
-                'price': float(price) if pd.notna(price) else 0.0,
-                'priority': priority
-            })
-    
-    # Sort by priority (products with brand/price first), then limit
-    similar.sort(key=lambda x: x['priority'], reverse=True)
-    return similar[:top_n]
-
-def get_popular_products(top_n=10):
-    """Get most popular products based on interaction count"""
-    # Count interactions per product
-    product_counts = df['product_id'].value_counts().head(top_n * 3)  # Get extra to filter
-    
-    popular = []
-    seen_pids = set()
-    
-    for pid in product_counts.index:
-        pid_str = str(pid)
-        
-        if pid_str in seen_pids:
-            continue
-        seen_pids.add(pid_str)
-        
-        info = product_lookup.get(pid) or product_lookup.get(pid_str)
-        
-        if info:
-            brand = info.get('brand', 'Generic Brand')
-            price = info.get('price', 0.0)
-            
-            # Prefer products with complete data
-            if brand != 'Generic Brand' or price > 0:
-                popular.append({
-                    'product_id': pid,
-                    'product_name': generate_product_name(pid, info),
-                    'category': info.get('category_code', 'Unknown'),
-                    'brand': brand,
-                    'price': float(price) if pd.notna(price) else 0.0
-                })
-            
-            if len(popular) >= top_n:
-                break
-    
-    return popular
+
+    return recommender.recommend_similar_products(product_id, top_n, mode=mode)
+
+@profiler.timed("get_popular_products")
+def get_popular_products(top_n=10, category=None, decayed=False):
+    """Get most popular products based on interaction count
+
+    Served from the precomputed popularity rankings; `category` restricts to
+    one category_code and `decayed=True` uses time-decayed counts.
+    """
+    return recommender.get_popular_products(top_n, category=category, decayed=decayed)
 
 # ----------------------------------
-# Step 8: Calculate Model Accuracy Metrics
+# Step 3: Model Accuracy Report
 # ----------------------------------
 
-def calculate_accuracy_metrics(test_data, hybrid_mae_val, svd_rmse_val, ncf_rmse_val):
+def calculate_accuracy_metrics(pointwise):
     """Calculate various accuracy metrics for the recommendation system"""
-    
+    # `pointwise` is the evaluate stage's RMSE / MAE / R² / within-±0.5 per model
+    models = ("hybrid", "svd", "ncf")
+
     # 1. Rating Prediction Accuracy (R²)
-    r2_hybrid = r2_score(test_data["rating"], test_data["hybrid_pred"])
-    r2_svd = r2_score(test_data["rating"], test_data["svd_pred"])
-    r2_ncf = r2_score(test_data["rating"], test_data["ncf_pred"])
-    
+    r2_scores = {name: pointwise[name]["r2"] for name in models}
+
     # 2. Percentage Accuracy (how close predictions are to actual)
-    # For rating scale 1-5 (range = 4)
+    # For rating scale 1-5 (range = 4); MAE for the hybrid, RMSE for SVD / NCF
     rating_range = 5.0 - 1.0
-    hybrid_accuracy = (1 - (hybrid_mae_val / rating_range)) * 100
-    svd_accuracy = (1 - (svd_rmse_val / rating_range)) * 100
-    ncf_accuracy = (1 - (ncf_rmse_val / rating_range)) * 100
-    
+    percentage_accuracy = {
+        "hybrid": (1 - (pointwise["hybrid"]["mae"] / rating_range)) * 100,
+        "svd": (1 - (pointwise["svd"]["rmse"] / rating_range)) * 100,
+        "ncf": (1 - (pointwise["ncf"]["rmse"] / rating_range)) * 100,
+    }
+
     # 3. Within-threshold accuracy (predictions within ±0.5 of actual)
-    threshold = 0.5
-    hybrid_within = np.mean(np.abs(test_data["rating"] - test_data["hybrid_pred"]) <= threshold) * 100
-    svd_within = np.mean(np.abs(test_data["rating"] - test_data["svd_pred"]) <= threshold) * 100
-    ncf_within = np.mean(np.abs(test_data["rating"] - test_data["ncf_pred"]) <= threshold) * 100
-    
+    within_threshold = {name: pointwise[name]["within_threshold"] for name in models}
+
     return {
-        'r2_scores': {'hybrid': r2_hybrid, 'svd': r2_svd, 'ncf': r2_ncf},
-        'percentage_accuracy': {'hybrid': hybrid_accuracy, 'svd': svd_accuracy, 'ncf': ncf_accuracy},
-        'within_threshold': {'hybrid': hybrid_within, 'svd': svd_within, 'ncf': ncf_within}
+        'r2_scores': r2_scores,
+        'percentage_accuracy': percentage_accuracy,
+        'within_threshold': within_threshold
     }
 
-# Calculate accuracy metrics
-accuracy_metrics = calculate_accuracy_metrics(test, hybrid_mae, svd_rmse, ncf_rmse)
-
-print("\n" + "="*70)
-print("📊 DETAILED MODEL ACCURACY REPORT")
-print("="*70)
-
-print("\n1️⃣ RMSE & MAE (Lower is Better):")
-print(f"   Hybrid Model  - RMSE: {hybrid_rmse:.4f}, MAE: {hybrid_mae:.4f}")
-print(f"   SVD Model     - RMSE: {svd_rmse:.4f}")
-print(f"   NCF Model     - RMSE: {ncf_rmse:.4f}")
-
-print("\n2️⃣ R² Score (Closer to 1.0 is Better):")
-print(f"   Hybrid Model  - R²: {accuracy_metrics['r2_scores']['hybrid']:.4f}")
-print(f"   SVD Model     - R²: {accuracy_metrics['r2_scores']['svd']:.4f}")
-print(f"   NCF Model     - R²: {accuracy_metrics['r2_scores']['ncf']:.4f}")
-
-# Explanation for negative R²
-if accuracy_metrics['r2_scores']['hybrid'] < 0:
-    print("\n   ⚠️ Note: Negative R² occurs when the test set has very little variance.")
-    print("   This is common with implicit ratings (1, 3, 5 only).")
-    print("   Your high prediction accuracy (99.78%) shows the model works well!")
-
-print("\n3️⃣ Prediction Accuracy (Higher is Better):")
-print(f"   Hybrid Model  - {accuracy_metrics['percentage_accuracy']['hybrid']:.2f}% accurate")
-print(f"   SVD Model     - {accuracy_metrics['percentage_accuracy']['svd']:.2f}% accurate")
-print(f"   NCF Model     - {accuracy_metrics['percentage_accuracy']['ncf']:.2f}% accurate")
-
-print("\n4️⃣ Within ±0.5 Rating Accuracy:")
-print(f"   Hybrid Model  - {accuracy_metrics['within_threshold']['hybrid']:.2f}% of predictions within ±0.5")
-print(f"   SVD Model     - {accuracy_metrics['within_threshold']['svd']:.2f}% of predictions within ±0.5")
-print(f"   NCF Model     - {accuracy_metrics['within_threshold']['ncf']:.2f}% of predictions within ±0.5")
-
-print("\n" + "="*70)
-print("🎯 OVERALL MODEL PERFORMANCE:")
-print("="*70)
-print(f"✅ Your Hybrid Model has an R² score of {accuracy_metrics['r2_scores']['hybrid']*100:.2f}%")
-print(f"✅ This means it explains {accuracy_metrics['r2_scores']['hybrid']*100:.2f}% of the variance in ratings")
-print(f"✅ Prediction accuracy: {accuracy_metrics['percentage_accuracy']['hybrid']:.2f}%")
-print(f"✅ {accuracy_metrics['within_threshold']['hybrid']:.2f}% of predictions are within ±0.5 stars of actual rating")
-print("="*70)
+def print_accuracy_report(metrics):
+    """Print the pointwise and ranking metrics of the evaluate stage"""
+    pointwise = metrics["pointwise"]
+    accuracy_metrics = calculate_accuracy_metrics(pointwise)
+    hybrid_rmse, hybrid_mae = pointwise["hybrid"]["rmse"], pointwise["hybrid"]["mae"]
+    svd_rmse, ncf_rmse = pointwise["svd"]["rmse"], pointwise["ncf"]["rmse"]
+
+    print("\n" + "="*70)
+    print("📊 DETAILED MODEL ACCURACY REPORT")
+    print("="*70)
+
+    print("\n1️⃣ RMSE & MAE (Lower is Better):")
+    print(f"   Hybrid Model  - RMSE: {hybrid_rmse:.4f}, MAE: {hybrid_mae:.4f}")
+    print(f"   SVD Model     - RMSE: {svd_rmse:.4f}")
+    print(f"   NCF Model     - RMSE: {ncf_rmse:.4f}")
+
+    print("\n2️⃣ R² Score (Closer to 1.0 is Better):")
+    print(f"   Hybrid Model  - R²: {accuracy_metrics['r2_scores']['hybrid']:.4f}")
+    print(f"   SVD Model     - R²: {accuracy_metrics['r2_scores']['svd']:.4f}")
+    print(f"   NCF Model     - R²: {accuracy_metrics['r2_scores']['ncf']:.4f}")
+
+    # Explanation for negative R²
+    if accuracy_metrics['r2_scores']['hybrid'] < 0:
+        print("\n   ⚠️ Note: Negative R² occurs when the test set has very little variance.")
+        print("   This is common with implicit ratings (1, 3, 5 only).")
+        print("   Your high prediction accuracy (99.78%) shows the model works well!")
+
+    print("\n3️⃣ Prediction Accuracy (Higher is Better):")
+    print(f"   Hybrid Model  - {accuracy_metrics['percentage_accuracy']['hybrid']:.2f}% accurate")
+    print(f"   SVD Model     - {accuracy_metrics['percentage_accuracy']['svd']:.2f}% accurate")
+    print(f"   NCF Model     - {accuracy_metrics['percentage_accuracy']['ncf']:.2f}% accurate")
+
+    print("\n4️⃣ Within ±0.5 Rating Accuracy:")
+    print(f"   Hybrid Model  - {accuracy_metrics['within_threshold']['hybrid']:.2f}% of predictions within ±0.5")
+    print(f"   SVD Model     - {accuracy_metrics['within_threshold']['svd']:.2f}% of predictions within ±0.5")
+    print(f"   NCF Model     - {accuracy_metrics['within_threshold']['ncf']:.2f}% of predictions within ±0.5")
+
+    print("\n" + "="*70)
+    print("🎯 OVERALL MODEL PERFORMANCE:")
+    print("="*70)
+    print(f"✅ Your Hybrid Model has an R² score of {accuracy_metrics['r2_scores']['hybrid']*100:.2f}%")
+    print(f"✅ This means it explains {accuracy_metrics['r2_scores']['hybrid']*100:.2f}% of the variance in ratings")
+    print(f"✅ Prediction accuracy: {accuracy_metrics['percentage_accuracy']['hybrid']:.2f}%")
+    print(f"✅ {accuracy_metrics['within_threshold']['hybrid']:.2f}% of predictions are within ±0.5 stars of actual rating")
+    print("="*70)
+
+    # Ranking quality of what is actually served: top-K lists from the same
+    # retrieval path, masking only training interactions
+    print(f"\n📈 RANKING METRICS ({metrics['ranking_users']:,} test users):")
+    for k, m in metrics["ranking"].items():
+        print(f"   {k:<4} Precision: {m['precision']:.4f}  Recall: {m['recall']:.4f}  "
+              f"NDCG: {m['ndcg']:.4f}  MAP: {m['map']:.4f}  Coverage: {m['coverage'] * 100:.1f}%")
+    print("="*70)
 
 # ----------------------------------
-# Step 9: Test All Recommendation Functions
+# Step 4: Test All Recommendation Functions
 # ----------------------------------
 
-print("\n" + "="*70)
-print("🔍 PRODUCT SEARCH & RECOMMENDATION DEMO")
-print("="*70)
-
-# Test 1: Search by product name/brand
-print("\n1️⃣ Searching for 'samsung' products:")
-samsung_products = search_product_by_name('samsung')
-for i, prod in enumerate(samsung_products[:3], 1):
-    print(f"   {i}. {prod['product_name']}")
-    print(f"      Product ID: {prod['product_id']}")
-    print(f"      Brand: {prod['brand']}, Price: ${prod['price']:.2f}")
-    print()
-
-# Test 2: Personalized recommendations with details
-if len(df) > 0:
-    sample_user = df["user_id"].iloc[0]
-    print(f"2️⃣ Personalized recommendations for user {sample_user}:")
-    recommendations = recommend_with_details(sample_user, top_n=5)
-    
-    for i, rec in enumerate(recommendations, 1):
-        print(f"   {i}. {rec['product_name']}")
-        print(f"      Product ID: {rec['product_id']}")
-        print(f"      Brand: {rec['brand']}, Price: ${rec['price']:.2f}")
+def run_demo():
+    """Exercise every recommendation function on sample users and products"""
+    print("\n" + "="*70)
+    print("🔍 PRODUCT SEARCH & RECOMMENDATION DEMO")
+    print("="*70)
+
+    # Test 1: Search by product name/brand
+    print("\n1️⃣ Searching for 'samsung' products:")
+    samsung_products = search_product_by_name('samsung')
+    for i, prod in enumerate(samsung_products[:3], 1):
+        print(f"   {i}. {prod['product_name']}")
+        print(f"      Product ID: {prod['product_id']}")
+        print(f"      Brand: {prod['brand']}, Price: ${prod['price']:.2f}")
         print()
 
-# Test 3: Similar products
-if len(product_lookup) > 0:
-    # Find a product with good metadata for demo
-    sample_product = None
-    for pid, info in product_lookup.items():
-        pid_str = str(pid)
-        # Skip if we've already seen this product ID
-        if sample_product and str(sample_product) == pid_str:
-            continue
-        if info.get('brand', 'Generic Brand') != 'Generic Brand' and info.get('price', 0) > 0:
-            sample_product = pid
-            break
-    
-    if sample_product is None:
-        # Get first product from dataframe
-        sample_product = df['product_id'].iloc[0]
-    
-    sample_info = get_product_info(sample_product)
-    print(f"3️⃣ Products similar to '{sample_info['product_name']}' (ID: {sample_product}):")
-    similar = recommend_similar_products(sample_product, top_n=3)
-    
-    if similar:
-        for i, prod in enumerate(similar, 1):
-            print(f"   {i}. {prod['product_name']}")
-            print(f"      Brand: {prod['brand']}, Price: ${prod['price']:.2f}")
+    # Test 2: Personalized recommendations with details
+    interactions = pipeline.interaction_store()
+    if len(interactions) > 0:
+        sample_user = recommender.users.classes[interactions.users[0]]
+        print(f"2️⃣ Personalized recommendations for user {sample_user}:")
+        recommendations = recommend_with_details(sample_user, top_n=5)
+
+        for i, rec in enumerate(recommendations, 1):
+            print(f"   {i}. {rec['product_name']}")
+            print(f"      Product ID: {rec['product_id']}")
+            print(f"      Brand: {rec['brand']}, Price: ${rec['price']:.2f}")
             print()
-    else:
-        print("   No similar products found")
+
+    # Test 3: Similar products
+    if len(catalog) > 0:
+        # Find a product with good metadata for demo
+        complete = np.flatnonzero(catalog.has_brand & catalog.has_price)
+
+        if len(complete) > 0:
+            sample_product = int(catalog.product_ids[complete[0]])
+        else:
+            # Get first product from dataframe
+            sample_product = int(recommender.items.classes[interactions.items[0]])
+
+        sample_info = get_product_info(sample_product)
+        print(f"3️⃣ Products similar to '{sample_info['product_name']}' (ID: {sample_product}):")
+        similar = recommend_similar_products(sample_product, top_n=3)
+
+        if similar:
+            for i, prod in enumerate(similar, 1):
+                print(f"   {i}. {prod['product_name']}")
+                print(f"      Brand: {prod['brand']}, Price: ${prod['price']:.2f}")
+                print()
+        else:
+            print("   No similar products found")
+            print()
+
+    # Test 4: Popular products
+    print("4️⃣ Trending/Popular Products:")
+    popular = get_popular_products(top_n=5)
+    for i, prod in enumerate(popular, 1):
+        print(f"   {i}. {prod['product_name']}")
+        print(f"      Brand: {prod['brand']}, Price: ${prod['price']:.2f}")
         print()
 
-# Test 4: Popular products
-print("4️⃣ Trending/Popular Products:")
-popular = get_popular_products(top_n=5)
-for i, prod in enumerate(popular, 1):
-    print(f"   {i}. {prod['product_name']}")
-    print(f"      Brand: {prod['brand']}, Price: ${prod['price']:.2f}")
-    print()
-
-print("="*70)
-print("✅ Hybrid recommender system with product names completed!")
-print("="*70)
\ No newline at end of file
+# Latency sample for the serving functions: a spread of users, products and
+# search terms, recorded in the per-call histograms of the profile report
+SERVE_SAMPLE_SIZE = 200
+
+def sample_serving_latency(sample_size=SERVE_SAMPLE_SIZE):
+    """Call each serving function on a random sample (timed by the profiler)"""
+    rng = np.random.default_rng(0)
+    user_classes = recommender.users.classes
+    for user_id in rng.choice(user_classes, min(sample_size, len(user_classes)), replace=False):
+        recommend_with_details(user_id, top_n=5)
+    for product_id in rng.choice(catalog.product_ids, min(sample_size, len(catalog)), replace=False):
+        recommend_similar_products(product_id, top_n=5)
+    for term in catalog.brands[:sample_size]:
+        search_product_by_name(term)
+    for category in catalog.categories[:sample_size]:
+        get_popular_products(top_n=10, category=category)
+
+
+def main(config=CONFIG):
+    profiler.start()
+    build(config)
+
+    print(f"\n✅ Product metadata loaded for {len(catalog)} products")
+    print(f"   Products with brands: {int(catalog.has_brand.sum())}")
+    print(f"   Products with prices: {int(catalog.has_price.sum())}")
+
+    print_accuracy_report(pipeline.artifacts("evaluate").meta)
+
+    run_demo()
+    with profiler.stage("serve"):
+        sample_serving_latency()
+
+    print("="*70)
+    print("✅ Hybrid recommender system with product names completed!")
+    print("="*70)
+
+    # ----------------------------------
+    # Step 5: Export Serving Bundle
+    # ----------------------------------
+
+    # SVD factors, NCF weights + vocabularies, encoder classes, catalog, seen
+    # index and popularity counts as one versioned directory of .npy files;
+    # serve.py memory-maps it without pandas or any training
+    bundle_path = pipeline.export(recommender, ncf_model=updater.ncf_model)
+    print(f"\n📦 Serving bundle exported to {bundle_path}")
+
+    # ----------------------------------
+    # Step 6: Pipeline Profile Report
+    # ----------------------------------
+
+    profiler.print_summary()
+    profiler.write_report(PROFILE_REPORT_PATH)
+    print(f"\n⏱️ Profile report written to {PROFILE_REPORT_PATH}"
+          + (f" (cProfile stats: {CPROFILE_PATH})" if CPROFILE_PATH else ""))
+
+
+if __name__ == "__main__":
+    main()
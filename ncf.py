@@ -0,0 +1,156 @@
+# ===========================
+# Neural Collaborative Filtering
+# (Keras model on integer codes, tf.data input, weight restore)
+# ===========================
+
+import numpy as np
+import tensorflow as tf
+
+
+# NCF Model
+class NCFModel(tf.keras.Model):
+    """NCF over the LabelEncoder codes from Step 1.
+
+    Inputs are {"user": int32, "item": int32} code tensors that index the
+    Embedding tables directly, so embedding row k belongs to code k (no
+    in-graph string hashing, and the tables line up with the SVD factors
+    and catalog rows).
+    """
+
+    def __init__(self, n_users, n_items, embedding_dim=32):
+        super().__init__()
+
+        # User / item embeddings, indexed by encoded id
+        self.user_embedding = tf.keras.layers.Embedding(
+            input_dim=n_users,
+            output_dim=embedding_dim
+        )
+        self.item_embedding = tf.keras.layers.Embedding(
+            input_dim=n_items,
+            output_dim=embedding_dim
+        )
+
+        # Neural network
+        self.dense_layers = tf.keras.Sequential([
+            tf.keras.layers.Dense(64, activation='relu'),
+            tf.keras.layers.BatchNormalization(),
+            tf.keras.layers.Dropout(0.2),
+            tf.keras.layers.Dense(32, activation='relu'),
+            tf.keras.layers.Dropout(0.2),
+            tf.keras.layers.Dense(1)
+        ])
+
+    def call(self, inputs):
+        user_emb = self.user_embedding(inputs["user"])
+        item_emb = self.item_embedding(inputs["item"])
+
+        # Concatenate embeddings
+        concatenated = tf.concat([user_emb, item_emb], axis=1)
+
+        # Predict rating
+        return self.dense_layers(concatenated)
+
+
+def make_ncf_dataset(users, items, ratings, batch_size=256, shuffle=False, seed=42):
+    """(features, labels) dataset over contiguous int32 / float32 arrays.
+
+    When `shuffle` is set, a fresh permutation of all row indices is drawn
+    every epoch (a full shuffle, before batching; reproducible from `seed`).
+    Batches are slices of that permutation, gathered from the column tensors
+    in one vectorized op instead of element by element.
+    """
+    users = tf.constant(np.ascontiguousarray(users, dtype=np.int32))
+    items = tf.constant(np.ascontiguousarray(items, dtype=np.int32))
+    ratings = tf.constant(np.ascontiguousarray(ratings, dtype=np.float32))
+    n = int(users.shape[0])
+
+    if shuffle:
+        epoch_seeds = tf.data.Dataset.random(seed=seed, rerandomize_each_iteration=True).take(1)
+        orders = epoch_seeds.map(lambda s: tf.random.experimental.stateless_shuffle(
+            tf.range(n, dtype=tf.int64), seed=tf.stack([s, 0])))
+    else:
+        orders = tf.data.Dataset.from_tensors(tf.range(n, dtype=tf.int64))
+
+    def batches(order):
+        return tf.data.Dataset.range(0, n, batch_size).map(lambda start: order[start:start + batch_size])
+
+    def gather(idx):
+        return {"user": tf.gather(users, idx), "item": tf.gather(items, idx)}, tf.gather(ratings, idx)
+
+    # flat_map hides the length; declaring it keeps Keras' epoch bookkeeping exact
+    n_batches = -(-n // batch_size)
+    return (orders.flat_map(batches)
+            .apply(tf.data.experimental.assert_cardinality(n_batches))
+            .map(gather, num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE))
+
+
+def safe_predict(model, user_idx, item_idx):
+    """Safe prediction with error handling"""
+    try:
+        predictions = model({
+            "user": tf.constant(np.asarray(user_idx, dtype=np.int32)),
+            "item": tf.constant(np.asarray(item_idx, dtype=np.int32))
+        }, training=False)
+        return predictions.numpy().flatten()
+    except Exception as e:
+        print(f"Prediction error: {e}")
+        return np.full(len(user_idx), 3.0)  # Default rating
+
+
+def make_ncf_predict(model):
+    """Batched NCF scores for encoded user/item index arrays.
+
+    Runs the folded NumPy forward pass (ncf_numpy.NumpyNCF), which matches
+    `safe_predict` to float32 round-off without an eager TF call per
+    batch; `.model` is the Keras model.
+    """
+    from ncf_numpy import NumpyNCF
+    return NumpyNCF.from_model(model)
+
+
+def ncf_item_embeddings(model):
+    """NCF item embedding table; row k is item code k"""
+    return model.item_embedding.get_weights()[0]
+
+
+def grow_ncf_model(model, n_users, n_items, seed=42):
+    """Copy of a trained NCFModel with room for n_users / n_items.
+
+    Keras Embedding tables have a fixed size, so a new model is built and
+    every weight copied over; rows for new users / items start from small
+    random values, like a fresh Embedding layer.
+    """
+    weights = model.get_weights()
+    rng = np.random.default_rng(seed)
+    for k, n in ((0, n_users), (1, n_items)):
+        table = weights[k]
+        if n > len(table):
+            extra = rng.uniform(-0.05, 0.05, (n - len(table), table.shape[1])).astype(table.dtype)
+            weights[k] = np.vstack([table, extra])
+    return restore_ncf_model(weights)
+
+
+def fine_tune_ncf(model, users, items, ratings, epochs=1, batch_size=256, learning_rate=1e-4):
+    """Train an NCFModel further on a batch of new (user, item, rating) codes"""
+    # A small delta should not move the BatchNorm statistics learned on the full data
+    for layer in model.dense_layers.layers:
+        if isinstance(layer, tf.keras.layers.BatchNormalization):
+            layer.trainable = False
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        loss='mse',
+        metrics=['mae']
+    )
+    dataset = make_ncf_dataset(users, items, ratings, batch_size=batch_size, shuffle=True)
+    return model.fit(dataset, epochs=epochs, verbose=0)
+
+
+def restore_ncf_model(weights):
+    """Rebuild a trained NCFModel from its `get_weights()` arrays"""
+    (n_users, embedding_dim), (n_items, _) = weights[0].shape, weights[1].shape
+    model = NCFModel(n_users, n_items, embedding_dim=embedding_dim)
+    # One call creates the variables so the weights can be assigned
+    model({"user": tf.constant([0]), "item": tf.constant([0])}, training=False)
+    model.set_weights([np.asarray(w) for w in weights])
+    return model
@@ -0,0 +1,147 @@
+# ===========================
+# NumPy NCF Inference
+# (folded Dense / BatchNorm weights, batched forward pass without TensorFlow)
+# ===========================
+#
+# Inference-time NCFModel:
+#   x = [user_emb[u], item_emb[i]]
+#   h1 = BN(relu(x @ W1 + b1))        (Dropout is the identity at inference)
+#   h2 = relu(h1 @ W2 + b2)
+#   y = h2 @ W3 + b3
+#
+# BatchNorm at inference is an affine map h -> h * s + t with
+# s = gamma / sqrt(var + eps) and t = beta - mean * s. It sits *after*
+# the ReLU of the first Dense, so it cannot be folded into that layer
+# (relu(z) * s != relu(z * s) when s < 0); it folds exactly into the next
+# one instead: (h * s + t) @ W2 + b2 = h @ (s[:, None] * W2) + (t @ W2 + b2).
+
+import numpy as np
+
+from quantization import QuantizedMatrix
+
+# Default epsilon of tf.keras.layers.BatchNormalization
+KERAS_BN_EPSILON = 1e-3
+
+# Names of the folded arrays, in NumpyNCF constructor order
+FOLDED_ARRAYS = ["dense1_kernel", "dense1_bias", "dense2_kernel", "dense2_bias", "out_kernel", "out_bias"]
+
+
+def fold_ncf_weights(weights, epsilon=KERAS_BN_EPSILON):
+    """Folded float32 Dense weights from an NCFModel's `get_weights()` list.
+
+    Returns (user_embedding, item_embedding, {name: array for FOLDED_ARRAYS});
+    Dropout has no weights and is simply dropped.
+    """
+    (user_embedding, item_embedding, w1, b1, gamma, beta, mean, var, w2, b2, w3, b3) = weights
+    scale = np.asarray(gamma, dtype=np.float64) / np.sqrt(np.asarray(var, dtype=np.float64) + epsilon)
+    shift = np.asarray(beta, dtype=np.float64) - np.asarray(mean, dtype=np.float64) * scale
+    w2 = np.asarray(w2, dtype=np.float64)
+    folded = {
+        "dense1_kernel": w1,
+        "dense1_bias": b1,
+        "dense2_kernel": scale[:, None] * w2,
+        "dense2_bias": shift @ w2 + np.asarray(b2, dtype=np.float64),
+        "out_kernel": w3,
+        "out_bias": b3,
+    }
+    folded = {name: np.asarray(array, dtype=np.float32) for name, array in folded.items()}
+    return user_embedding, item_embedding, folded
+
+
+def keras_bn_epsilon(model):
+    """Epsilon of the NCFModel's BatchNormalization layer"""
+    for layer in model.dense_layers.layers:
+        if hasattr(layer, "moving_variance"):
+            return layer.epsilon
+    return KERAS_BN_EPSILON
+
+
+def _gather(table, index):
+    if isinstance(table, QuantizedMatrix):
+        return table.rows(index)
+    return np.asarray(table[index], dtype=np.float32)
+
+
+class NumpyNCF:
+    """Batched NCF forward pass in NumPy, usable as a `HybridScorer.ncf_predict`.
+
+    The first Dense layer is split into its user and item halves: the item
+    half is projected for the whole catalog once (`n_items x 64`), the user
+    half once per distinct user in a call, so a pair costs an add, one
+    64x32 and one 32x1 product. A bundle stores that projection
+    (`item_projection`, memory-mapped and shared by serving processes);
+    otherwise it is built as float32 on first use. Embedding and projection
+    tables may be plain or memory-mapped arrays or `QuantizedMatrix` tables.
+
+    `model` is the Keras NCFModel the weights came from (for fine-tuning);
+    when built from a bundle it is restored by `restore_model` on first
+    access, which is the only time TensorFlow gets imported.
+    """
+
+    def __init__(self, user_embedding, item_embedding, dense1_kernel, dense1_bias, dense2_kernel, dense2_bias,
+                 out_kernel, out_bias, item_projection=None, model=None, restore_model=None):
+        self.user_embedding = user_embedding
+        self.item_embedding = item_embedding
+        dim = user_embedding.shape[1]
+        dense1_kernel = np.asarray(dense1_kernel, dtype=np.float32)
+        self.user_kernel = dense1_kernel[:dim]
+        self.item_kernel = dense1_kernel[dim:]
+        self.dense1_bias = np.asarray(dense1_bias, dtype=np.float32)
+        self.dense2_kernel = np.asarray(dense2_kernel, dtype=np.float32)
+        self.dense2_bias = np.asarray(dense2_bias, dtype=np.float32)
+        self.out_kernel = np.asarray(out_kernel, dtype=np.float32)[:, 0]
+        self.out_bias = float(np.asarray(out_bias)[0])
+        self._item_projection = item_projection
+        self._model = model
+        self._restore_model = restore_model
+
+    @classmethod
+    def from_weights(cls, weights, epsilon=KERAS_BN_EPSILON, **kwargs):
+        user_embedding, item_embedding, folded = fold_ncf_weights(weights, epsilon)
+        return cls(user_embedding, item_embedding, *(folded[name] for name in FOLDED_ARRAYS), **kwargs)
+
+    @classmethod
+    def from_model(cls, model):
+        """Fold a trained Keras NCFModel (the model is kept for fine-tuning)"""
+        return cls.from_weights(model.get_weights(), keras_bn_epsilon(model), model=model)
+
+    @property
+    def model(self):
+        if self._model is None and self._restore_model is not None:
+            self._model = self._restore_model()
+        return self._model
+
+    @property
+    def item_projection(self):
+        """item_embedding @ item half of the first Dense kernel, for every item (stored or built)"""
+        if self._item_projection is None:
+            projection = np.empty((len(self.item_embedding), len(self.dense1_bias)), dtype=np.float32)
+            for start in range(0, len(projection), 65536):
+                stop = min(start + 65536, len(projection))
+                projection[start:stop] = _gather(self.item_embedding, slice(start, stop)) @ self.item_kernel
+            self._item_projection = projection
+        return self._item_projection
+
+    def item_vectors(self, item_idx):
+        """float32 item embedding rows"""
+        return _gather(self.item_embedding, np.asarray(item_idx))
+
+    def predict(self, user_idx, item_idx):
+        """NCF scores for aligned user / item code arrays, shape (N,)"""
+        users, inverse = np.unique(np.asarray(user_idx), return_inverse=True)
+        return self.predict_vectors(_gather(self.user_embedding, users), inverse.reshape(-1), item_idx)
+
+    def predict_vectors(self, user_vectors, rows, item_idx):
+        """NCF scores with explicit user embedding vectors: pair k uses user_vectors[rows[k]]"""
+        hidden = np.asarray(user_vectors, dtype=np.float32) @ self.user_kernel
+        hidden = hidden[np.asarray(rows)]
+        hidden += _gather(self.item_projection, np.asarray(item_idx))
+        hidden += self.dense1_bias
+        np.maximum(hidden, 0.0, out=hidden)
+
+        hidden = hidden @ self.dense2_kernel
+        hidden += self.dense2_bias
+        np.maximum(hidden, 0.0, out=hidden)
+        return hidden @ self.out_kernel + self.out_bias
+
+    __call__ = predict
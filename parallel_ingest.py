@@ -0,0 +1,146 @@
+# ===========================
+# Parallel Event-Log Preprocessing
+# (process pool over byte ranges, dedupe partitioned by user_id, merged vocabularies)
+# ===========================
+#
+# Builds the same interaction table as ingest.load_interactions (same rows,
+# same order) with every core:
+#
+#   1. parse   the file is cut into byte ranges at line boundaries; each
+#              worker parses its range and runs clean_chunk on it (keyword
+#              lookup once per distinct category_code, ratings)
+#   2. dedupe  (user_id, product_id) keys and their row positions are
+#              hash-partitioned by user_id, so a pair only ever lands in one
+#              partition and each partition keeps its first occurrences on
+#              its own; every partition also returns its partial user /
+#              product vocabularies
+#   3. merge   kept rows are gathered in file order, categorical
+#              vocabularies are unioned and the partial id vocabularies
+#              merged into the sorted (LabelEncoder) global encoding
+#
+# Unlike the streaming path, all filtered rows (before dedupe) are held in
+# memory at once, so the pipeline only uses it when asked to
+# (PipelineConfig.ingest_workers > 1, or None for all cores). Lines are
+# split on b"\n", so fields must not contain quoted newlines (the event
+# logs have none).
+
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from ingest import (ELECTRONICS_KEYWORDS, EVENT_COLUMNS, EVENT_DTYPES, RATING_MAP, PairDeduper, _concat_chunks,
+                    clean_chunk)
+from instrumentation import stage_of
+
+# Bytes of CSV one worker parses at a time (bounds per-worker memory)
+RANGE_BYTES = 64 * 2 ** 20
+
+
+def _data_end(path, max_rows, block_size=64 * 2 ** 20):
+    """Byte offset just past the first `max_rows` data lines (the whole file when None)"""
+    size = os.path.getsize(path)
+    if max_rows is None:
+        return size
+    remaining = max_rows + 1  # header line
+    with open(path, "rb") as f:
+        offset = 0
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return size
+            count = block.count(b"\n")
+            if count >= remaining:
+                cut = -1
+                for _ in range(remaining):
+                    cut = block.index(b"\n", cut + 1)
+                return offset + cut + 1
+            remaining -= count
+            offset += len(block)
+
+
+def byte_ranges(path, range_bytes=RANGE_BYTES, max_rows=None):
+    """(header, [(start, stop), ...]): data byte ranges cut at line boundaries"""
+    end = _data_end(path, max_rows)
+    with open(path, "rb") as f:
+        header = f.readline().decode().strip().split(",")
+        bounds = [f.tell()]
+        while bounds[-1] < end:
+            f.seek(min(bounds[-1] + range_bytes, end))
+            if f.tell() < end:
+                f.readline()
+            bounds.append(min(f.tell(), end))
+    return header, list(zip(bounds[:-1], bounds[1:]))
+
+
+def _parse_range(path, start, stop, header, keywords, rating_map):
+    """Worker: filtered, rated rows of one byte range, plus the (wall, CPU) seconds spent filtering"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    chunk = pd.read_csv(io.BytesIO(data), header=None, names=header, usecols=EVENT_COLUMNS, dtype=EVENT_DTYPES)
+    wall, cpu = time.perf_counter(), time.process_time()
+    chunk = clean_chunk(chunk, keywords, rating_map)
+    return chunk, time.perf_counter() - wall, time.process_time() - cpu
+
+
+def _dedupe_partition(keys, positions):
+    """Worker: positions of first occurrences, plus the partition's user / product vocabularies"""
+    unique_keys, first = np.unique(keys, return_index=True)
+    return positions[first], np.unique(unique_keys >> 32), np.unique(unique_keys & 0xFFFFFFFF)
+
+
+def load_interactions_parallel(path, n_workers=None, max_rows=None, keywords=ELECTRONICS_KEYWORDS,
+                               rating_map=RATING_MAP, range_bytes=RANGE_BYTES, verbose=True, profiler=None):
+    """`load_interactions` on a process pool; returns (interactions, vocabularies).
+
+    `vocabularies` maps "user_id" / "product_id" to their sorted distinct
+    ids, i.e. the classes a LabelEncoder fitted on the table would have,
+    merged from the per-partition vocabularies. Categorical columns get
+    sorted categories, so codes do not depend on how the file was split.
+    With a `PipelineProfiler`, the parallel parse + filter is timed as
+    stage "load" and deduplication and merging as "dedupe"; the workers'
+    own filtering time is added to "filter", summed over workers.
+    """
+    n_workers = n_workers or os.cpu_count()
+    header, ranges = byte_ranges(path, range_bytes, max_rows)
+
+    with ProcessPoolExecutor(n_workers) as pool:
+        with stage_of(profiler, "load"):
+            starts, stops = [r[0] for r in ranges], [r[1] for r in ranges]
+            parsed = list(pool.map(_parse_range, repeat(path), starts, stops, repeat(header),
+                                   repeat(keywords), repeat(rating_map)))
+            chunks = [chunk for chunk, _, _ in parsed]
+            if verbose:
+                print(f"   ...parsed {len(ranges)} ranges on {n_workers} processes, "
+                      f"{sum(len(c) for c in chunks):,} electronics events")
+        if profiler is not None:
+            profiler.record_stage("filter", sum(p[1] for p in parsed), sum(p[2] for p in parsed), len(parsed))
+
+        with stage_of(profiler, "dedupe"):
+            user_ids = np.concatenate([c["user_id"].to_numpy() for c in chunks] + [np.empty(0, np.int64)])
+            product_ids = np.concatenate([c["product_id"].to_numpy() for c in chunks] + [np.empty(0, np.int64)])
+            keys = PairDeduper.pack(user_ids, product_ids)
+            # Positions ascend within a partition, so np.unique's first index is the first occurrence
+            partition = user_ids % n_workers
+            order = np.argsort(partition, kind="stable")
+            bounds = np.searchsorted(partition[order], np.arange(n_workers + 1))
+            parts = [order[bounds[p]:bounds[p + 1]] for p in range(n_workers)]
+            results = list(pool.map(_dedupe_partition, [keys[part] for part in parts], parts))
+
+            keep = np.zeros(len(keys), dtype=bool)
+            keep[np.concatenate([r[0] for r in results])] = True
+            offsets = np.cumsum([0] + [len(c) for c in chunks])
+            interactions = _concat_chunks([c[keep[offsets[k]:offsets[k + 1]]] for k, c in enumerate(chunks)])
+            vocabularies = {
+                # Users never span partitions; products can, hence the second unique
+                "user_id": np.sort(np.concatenate([r[1] for r in results])),
+                "product_id": np.unique(np.concatenate([r[2] for r in results])),
+            }
+    if verbose:
+        print(f"   ...kept {len(interactions):,} interactions")
+    return interactions, vocabularies
@@ -0,0 +1,735 @@
+# ===========================
+# Training Pipeline
+# (config-driven stages, each cached by the fingerprint of its inputs)
+# ===========================
+#
+#   python pipeline.py                                  # every stage, reusing what is cached
+#   python pipeline.py train_ncf --set ncf_epochs=3     # retrain only the NCF
+#   python pipeline.py --config run.json --export       # all stages, then a serving bundle
+#   python pipeline.py --status                         # fingerprints and cache state
+#
+# Stages and the stages they read:
+#
+#   ingest -> encode -> train_svd ----> evaluate
+#                    -> train_ncf ----/
+#          \--------/-> build_metadata
+#
+# A stage's fingerprint hashes its slice of the config and the fingerprints
+# of its inputs, and its outputs are stored under <cache_dir>/<stage>/<fingerprint>/.
+# Changing only NCF settings therefore reruns train_ncf and evaluate and
+# loads the rest. The ingest stage is the interaction cache (interaction_cache):
+# keyed by the source file's hash and the filter config, memory-mapped on a
+# warm start.
+
+import argparse
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from ingest import ELECTRONICS_KEYWORDS, RATING_MAP, load_interactions
+from instrumentation import stage_of
+from interaction_cache import interaction_cache_key, load_interaction_cache, save_interaction_cache
+from parallel_ingest import load_interactions_parallel
+
+PIPELINE_FORMAT_VERSION = 3
+
+DATA_PATH = "/kaggle/input/ecommerce-behavior-data-from-multi-category-store/2019-Nov.csv"
+
+# Stage -> stages whose outputs it reads (in run order)
+STAGE_INPUTS = {
+    "ingest": [],
+    "encode": ["ingest"],
+    "train_svd": ["encode"],
+    "train_ncf": ["encode"],
+    "evaluate": ["encode", "train_svd", "train_ncf"],
+    "build_metadata": ["ingest", "encode"],
+}
+STAGES = list(STAGE_INPUTS)
+
+# Stage -> config fields that change its output (and so its fingerprint)
+STAGE_CONFIG = {
+    "ingest": ["data_path", "keywords", "rating_map", "max_rows"],
+    "encode": ["test_size", "split_seed"],
+    "train_svd": ["mf_backend", "n_factors", "svd_seed", "als_reg", "als_iters"],
+    "train_ncf": ["embedding_dim", "ncf_batch_size", "ncf_epochs", "ncf_learning_rate", "ncf_patience"],
+    "evaluate": ["ncf_weight", "svd_weight", "pool_size", "ranking_k", "ranking_eval_max_users"],
+    "build_metadata": ["popularity_half_life"],
+}
+
+INTERACTION_COLUMNS = ["user_id", "product_id", "price", "timestamp", "rating"]
+CATEGORICAL_COLUMNS = ["category_code", "brand", "event_type"]
+CATALOG_ARRAYS = ["product_ids", "category_codes", "brand_codes", "prices"]
+
+
+@dataclass
+class PipelineConfig:
+    """Every setting of a training run.
+
+    Fields are grouped by the stage they feed (see `STAGE_CONFIG`); the
+    rest (chunk size, worker count, paths, ANN options) affect speed or
+    where things go, not what a stage produces, so they are not
+    fingerprinted.
+    """
+
+    # ingest
+    data_path: str = DATA_PATH
+    keywords: list = field(default_factory=lambda: list(ELECTRONICS_KEYWORDS))
+    rating_map: dict = field(default_factory=lambda: dict(RATING_MAP))
+    max_rows: int = None
+    chunksize: int = 1_000_000
+    # 1: single-process streaming (bounded memory); >1 or None (all cores): the process-pool
+    # path of parallel_ingest, which holds every filtered event in memory before dedupe
+    ingest_workers: int = 1
+    # encode (LabelEncoder codes + train/test split)
+    test_size: float = 0.2
+    split_seed: int = 42
+    # train_svd: "surprise" (single-threaded SGD) or "als" (batched ALS, all cores)
+    mf_backend: str = "surprise"
+    n_factors: int = 50
+    svd_seed: int = 42
+    als_reg: float = 0.1
+    als_iters: int = 5
+    # train_ncf (ncf_epochs=0 trains no NCF: SVD-only scores)
+    embedding_dim: int = 32
+    ncf_batch_size: int = 256
+    ncf_epochs: int = 5
+    ncf_learning_rate: float = 0.001
+    ncf_patience: int = 2
+    # evaluate / serving
+    ncf_weight: float = 0.6
+    svd_weight: float = 0.4
+    # None: every unseen item is hybrid-scored; N: only the N best by SVD (serving shortcut)
+    pool_size: int = None
+    ranking_k: tuple = (5, 10, 20)
+    ranking_eval_max_users: int = 100_000
+    use_ann_candidates: bool = False
+    ann_n_candidates: int = 200
+    ann_n_probe: int = 8
+    # build_metadata
+    popularity_half_life: float = 7 * 24 * 3600  # seconds
+    # export: None, or "int8" / "float16" quantized factor and embedding tables
+    quantize: str = None
+    # locations; cache_dir=None disables the stage cache
+    cache_dir: str = ".cache/pipeline"
+    bundle_dir: str = "artifacts/bundles"
+
+    @classmethod
+    def from_dict(cls, values):
+        unknown = set(values) - {f.name for f in dataclasses.fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown pipeline config field(s): {', '.join(sorted(unknown))}")
+        return cls(**values)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def replace(self, **changes):
+        """A copy with some fields changed"""
+        return self.from_dict({**dataclasses.asdict(self), **changes})
+
+
+class StageArtifacts:
+    """Outputs of one stage: named arrays plus JSON-serializable metadata"""
+
+    def __init__(self, stage, fingerprint, arrays, meta, cached=False):
+        self.stage = stage
+        self.fingerprint = fingerprint
+        self.arrays = arrays
+        self.meta = meta
+        self.cached = cached
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+
+def _frame_arrays(df):
+    """Columns of the ingested table as arrays; categoricals as codes + vocabularies"""
+    arrays = {col: df[col].to_numpy() for col in INTERACTION_COLUMNS}
+    categories = {}
+    for col in CATEGORICAL_COLUMNS:
+        values = df[col].astype("category")
+        arrays[f"{col}_codes"] = values.cat.codes.to_numpy()
+        categories[col] = values.cat.categories.tolist()
+    return arrays, categories
+
+
+class Pipeline:
+    """Lazily evaluated training pipeline over a `PipelineConfig`.
+
+    `artifacts(stage)` returns a stage's outputs, computing them (and any
+    missing inputs) only when nothing is cached under the stage's
+    fingerprint. Nothing runs on construction. On top of the stages,
+    `interactions`, `split`, `interaction_store`, `interaction_split`,
+    `scorer`, `ncf_model`, `catalog`, `popularity` and `seen_index`
+    rebuild the usual objects, `recommender` assembles a serving
+    `Recommender` and `export` writes a bundle. Training and evaluation
+    read the interactions through the `InteractionStore` (CSR / CSC).
+
+    Cached arrays are memory-mapped read-only. `force` names stages to
+    recompute even when cached; with a `PipelineProfiler`, stages are
+    timed under the same names model.py has always used (load, filter,
+    encode, split, svd_fit, predict, ncf_fit, evaluate, metadata, export).
+    """
+
+    def __init__(self, config=None, profiler=None, force=(), verbose=True):
+        self.config = config or PipelineConfig()
+        self.profiler = profiler
+        self.force = set(force)
+        self.verbose = verbose
+        unknown = self.force - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+        self._fingerprints = {}
+        self._artifacts = {}
+        self._memo = {}
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    # ---------- Fingerprints & cache ----------
+
+    def config_slice(self, stage):
+        return {name: getattr(self.config, name) for name in STAGE_CONFIG[stage]}
+
+    def fingerprint(self, stage):
+        """Hash of the stage's config slice and its inputs' fingerprints"""
+        if stage not in self._fingerprints:
+            if stage == "ingest" and self.config.cache_dir is not None:
+                # The interaction cache key: source file hash + filter config
+                memo_path = os.path.join(self.config.cache_dir, "source_hashes.json")
+                self._fingerprints[stage] = interaction_cache_key(self.config.data_path, self.config_slice(stage),
+                                                                  memo_path=memo_path)
+                return self._fingerprints[stage]
+            payload = {
+                "version": PIPELINE_FORMAT_VERSION,
+                "stage": stage,
+                "config": self.config_slice(stage),
+                "inputs": {name: self.fingerprint(name) for name in STAGE_INPUTS[stage]},
+            }
+            if stage == "ingest":
+                # Nothing is cached, so size + mtime identify the file well enough
+                stat = os.stat(self.config.data_path)
+                payload["source"] = f"{os.path.abspath(self.config.data_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+            encoded = json.dumps(payload, sort_keys=True).encode()
+            self._fingerprints[stage] = hashlib.sha256(encoded).hexdigest()[:16]
+        return self._fingerprints[stage]
+
+    def stage_dir(self, stage):
+        return os.path.join(self.config.cache_dir, stage, self.fingerprint(stage))
+
+    def is_cached(self, stage):
+        return (self.config.cache_dir is not None
+                and os.path.exists(os.path.join(self.stage_dir(stage), "manifest.json")))
+
+    def _save(self, artifacts):
+        """Write a stage's outputs under a temporary name, then rename"""
+        if artifacts.stage == "ingest":
+            save_interaction_cache(self.stage_dir("ingest"), artifacts.arrays, artifacts.meta)
+            return
+        final_dir = self.stage_dir(artifacts.stage)
+        tmp_dir = final_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, array in artifacts.arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.asarray(array))
+        manifest = {
+            "version": PIPELINE_FORMAT_VERSION,
+            "stage": artifacts.stage,
+            "fingerprint": artifacts.fingerprint,
+            "config": self.config_slice(artifacts.stage),
+            "inputs": {name: self.fingerprint(name) for name in STAGE_INPUTS[artifacts.stage]},
+            "arrays": sorted(artifacts.arrays),
+            "meta": artifacts.meta,
+        }
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+
+    def _load(self, stage):
+        if stage == "ingest":
+            arrays, meta = load_interaction_cache(self.stage_dir(stage))
+            return StageArtifacts(stage, self.fingerprint(stage), arrays, meta, cached=True)
+        directory = self.stage_dir(stage)
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                  for name in manifest["arrays"]}
+        return StageArtifacts(stage, manifest["fingerprint"], arrays, manifest["meta"], cached=True)
+
+    def artifacts(self, stage):
+        """A stage's outputs: from memory, from the cache, or computed now"""
+        if stage not in self._artifacts:
+            if stage not in STAGE_INPUTS:
+                raise ValueError(f"Unknown stage {stage!r}; expected one of {', '.join(STAGES)}")
+            if stage not in self.force and self.is_cached(stage):
+                artifacts = self._load(stage)
+                self._log(f"⚡ {stage}: cached ({artifacts.fingerprint})")
+            else:
+                for name in STAGE_INPUTS[stage]:
+                    self.artifacts(name)
+                self._log(f"▶️ {stage} ({self.fingerprint(stage)})")
+                arrays, meta = getattr(self, f"_{stage}")()
+                # JSON round trip so fresh and cached metadata look the same
+                meta = json.loads(json.dumps(meta))
+                artifacts = StageArtifacts(stage, self.fingerprint(stage), arrays, meta)
+                if self.config.cache_dir is not None:
+                    self._save(artifacts)
+            self._artifacts[stage] = artifacts
+        return self._artifacts[stage]
+
+    def run(self, stages=None):
+        """Make sure the given stages (default: all) are available; returns their artifacts"""
+        return {stage: self.artifacts(stage) for stage in (stages or STAGES)}
+
+    def status(self):
+        """(stage, fingerprint, cached) for every stage, without running anything"""
+        return [(stage, self.fingerprint(stage), self.is_cached(stage)) for stage in STAGES]
+
+    # ---------- Stages ----------
+
+    def _ingest(self):
+        c = self.config
+        n_workers = c.ingest_workers or os.cpu_count()
+        if n_workers > 1:
+            # Byte ranges parsed and filtered on a process pool, dedupe
+            # partitioned by user_id, partial vocabularies merged
+            df, vocabularies = load_interactions_parallel(
+                c.data_path, n_workers=n_workers, max_rows=c.max_rows, keywords=c.keywords,
+                rating_map=c.rating_map, verbose=self.verbose, profiler=self.profiler)
+        else:
+            # Stream the log in chunks: seven needed columns with compact dtypes,
+            # keyword filter + ratings per chunk, (user_id, product_id) pairs
+            # deduplicated incrementally so memory stays bounded
+            df = load_interactions(c.data_path, chunksize=c.chunksize, max_rows=c.max_rows,
+                                   keywords=c.keywords, rating_map=c.rating_map,
+                                   verbose=self.verbose, profiler=self.profiler)
+            vocabularies = {col: np.unique(df[col].to_numpy()) for col in ("user_id", "product_id")}
+        self._log(f"Filtered data shape: {df.shape}")
+        arrays, categories = _frame_arrays(df)
+        arrays["user_classes"] = vocabularies["user_id"]
+        arrays["item_classes"] = vocabularies["product_id"]
+        return arrays, {"rows": len(df), "categories": categories}
+
+    def _encode(self):
+        from sklearn.model_selection import train_test_split
+
+        ingest = self.artifacts("ingest")
+        with stage_of(self.profiler, "encode"):
+            # LabelEncoder codes: position in the sorted vocabularies built at ingest
+            user_classes, item_classes = ingest["user_classes"], ingest["item_classes"]
+            users = np.searchsorted(user_classes, ingest["user_id"])
+            items = np.searchsorted(item_classes, ingest["product_id"])
+        with stage_of(self.profiler, "split"):
+            # Same rows as train_test_split(df, ...) with this random_state
+            train_rows, test_rows = train_test_split(
+                np.arange(len(users)), test_size=self.config.test_size, random_state=self.config.split_seed)
+        self._log(f"Users: {len(user_classes)}, Items: {len(item_classes)}, "
+                  f"Train: {len(train_rows):,}, Test: {len(test_rows):,}")
+        arrays = {
+            "user_classes": user_classes, "item_classes": item_classes,
+            "user": users.astype(np.int64), "item": items.astype(np.int64),
+            "train_rows": train_rows, "test_rows": test_rows,
+        }
+        return arrays, {"n_users": len(user_classes), "n_items": len(item_classes)}
+
+    def _train_svd(self):
+        c = self.config
+        n_users, n_items = self.n_users, self.n_items
+        with stage_of(self.profiler, "svd_fit"):
+            if c.mf_backend == "als":
+                from als import ALSFactorizer
+                from scoring import HybridScorer
+
+                train, _ = self.interaction_split()
+                model = ALSFactorizer(n_factors=c.n_factors, reg=c.als_reg, n_iters=c.als_iters,
+                                      rating_scale=(1, 5), seed=c.svd_seed)
+                # The train store's CSR / CSC are ALS's per-user / per-item groupings
+                model.fit_interactions(train)
+                scorer = HybridScorer.from_factors(model)
+            elif c.mf_backend == "surprise":
+                from surprise import SVD, Dataset, Reader
+                from scoring import HybridScorer
+
+                train, _ = self.split()
+                trainset = Dataset.load_from_df(train[["user", "item", "rating"]],
+                                                Reader(rating_scale=(1, 5))).build_full_trainset()
+                model = SVD(n_factors=c.n_factors, random_state=c.svd_seed)
+                model.fit(trainset)
+                # Factors re-indexed by encoded ids (zeros for ids missing from train)
+                scorer = HybridScorer.from_surprise(model, n_users, n_items)
+            else:
+                raise ValueError(f"Unknown mf_backend {c.mf_backend!r}; expected 'surprise' or 'als'")
+        self._log("✅ SVD model trained.")
+        arrays = {"pu": scorer.pu, "qi": scorer.qi, "bu": scorer.bu, "bi": scorer.bi}
+        return arrays, {"global_mean": scorer.global_mean, "rating_scale": list(scorer.rating_scale)}
+
+    def _train_ncf(self):
+        c = self.config
+        if c.ncf_epochs == 0:
+            self._log("NCF disabled (ncf_epochs=0)")
+            return {}, {"n_weights": 0, "history": {}}
+
+        import tensorflow as tf
+        from ncf import NCFModel, make_ncf_dataset
+
+        train, test = self.interaction_split()
+        # Full reshuffle of the training rows every epoch, before batching
+        train_tf = make_ncf_dataset(train.users, train.items, train.ratings,
+                                    batch_size=c.ncf_batch_size, shuffle=True)
+        test_tf = make_ncf_dataset(test.users, test.items, test.ratings, batch_size=c.ncf_batch_size)
+
+        model = NCFModel(self.n_users, self.n_items, embedding_dim=c.embedding_dim)
+        model.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=c.ncf_learning_rate),
+            loss='mse',
+            metrics=['mae', 'mse']
+        )
+        early_stopping = tf.keras.callbacks.EarlyStopping(patience=c.ncf_patience, restore_best_weights=True)
+
+        self._log("Starting NCF training...")
+        with stage_of(self.profiler, "ncf_fit"):
+            history = model.fit(train_tf, epochs=c.ncf_epochs, validation_data=test_tf,
+                                callbacks=[early_stopping], verbose=1 if self.verbose else 0)
+        self._log("✅ NCF model trained successfully!")
+
+        self._memo["ncf_model"] = model
+        weights = model.get_weights()
+        history = {name: [float(v) for v in values] for name, values in history.history.items()}
+        return {f"w{k}": w for k, w in enumerate(weights)}, {"n_weights": len(weights), "history": history}
+
+    def _evaluate(self):
+        from evaluation import evaluate_ranking_against, pointwise_metrics
+        from retrieval import ExactRetriever
+
+        c = self.config
+        train, test = self.interaction_split()
+        users, items = test.users, test.items
+        scorer = self.scorer()
+        with stage_of(self.profiler, "predict"):
+            svd_pred = scorer.svd_scores_pairs(users, items)
+            ncf_pred = scorer.ncf_scores(users, items[:, None])[:, 0]
+            hybrid_pred = c.ncf_weight * ncf_pred + c.svd_weight * svd_pred
+
+        ratings = test.ratings
+        pointwise = {name: pointwise_metrics(ratings, pred)
+                     for name, pred in (("hybrid", hybrid_pred), ("svd", svd_pred), ("ncf", ncf_pred))}
+
+        # Top-K lists from the serving retrieval path, masking only training
+        # interactions, scored against each test user's held-out items
+        with stage_of(self.profiler, "evaluate"):
+            eval_retriever = ExactRetriever(scorer, train.csr, pool_size=c.pool_size)
+            ranking = evaluate_ranking_against(eval_retriever, test.relevance(),
+                                               k_values=c.ranking_k, max_users=c.ranking_eval_max_users)
+
+        arrays = {"svd_pred": svd_pred, "ncf_pred": ncf_pred, "hybrid_pred": hybrid_pred}
+        meta = {
+            "pointwise": pointwise,
+            "ranking_users": ranking["users"],
+            "ranking": {f"@{k}": ranking[k] for k in c.ranking_k},
+        }
+        return arrays, meta
+
+    def _build_metadata(self):
+        from catalog import build_product_catalog
+        from popularity import PopularityStore
+
+        df, interactions = self.interactions(), self.interaction_store()
+        with stage_of(self.profiler, "metadata"):
+            # One catalog row per item code, preferring rows with a brand, then a price
+            catalog = build_product_catalog(df, item_classes=self.artifacts("encode")["item_classes"])
+            # Only products with a brand or a price are eligible for popularity lists
+            # Event times (unix seconds) feed the time-decayed variant
+            popularity = PopularityStore.from_interactions(
+                interactions.items, self.n_items, timestamps=self.artifacts("ingest")["timestamp"],
+                categories=catalog.category_codes,
+                eligible=catalog.has_brand | catalog.has_price,
+                half_life=self.config.popularity_half_life
+            )
+            # User -> items CSR used to mask already-seen products (ratings kept for fold-in)
+            seen = interactions.csr
+
+        arrays = {f"catalog_{name}": getattr(catalog, name) for name in CATALOG_ARRAYS}
+        arrays.update(popularity_counts=popularity.counts,
+                      seen_indptr=seen.indptr, seen_indices=seen.indices, seen_data=seen.data)
+        if popularity.decayed is not None:
+            arrays["popularity_decayed"] = popularity.decayed
+        meta = {
+            "categories": [str(c) for c in catalog.categories],
+            "brands": [str(b) for b in catalog.brands],
+            "popularity": {"half_life": popularity.half_life, "t_ref": popularity.t_ref,
+                           "capacity": popularity.capacity},
+        }
+        return arrays, meta
+
+    # ---------- Objects rebuilt from artifacts ----------
+
+    def _memoized(self, name, build):
+        if name not in self._memo:
+            self._memo[name] = build()
+        return self._memo[name]
+
+    @property
+    def n_users(self):
+        return len(self.artifacts("encode")["user_classes"])
+
+    @property
+    def n_items(self):
+        return len(self.artifacts("encode")["item_classes"])
+
+    def interactions(self):
+        """The deduplicated interaction table with encoded `user` / `item` columns"""
+        def build():
+            import pandas as pd
+
+            ingest, encode = self.artifacts("ingest"), self.artifacts("encode")
+            columns = {col: ingest[col] for col in INTERACTION_COLUMNS}
+            for col in CATEGORICAL_COLUMNS:
+                columns[col] = pd.Categorical.from_codes(ingest[f"{col}_codes"],
+                                                         ingest.meta["categories"][col])
+            columns["user"] = encode["user"]
+            columns["item"] = encode["item"]
+            order = ["user_id", "product_id", "category_code", "brand", "price", "event_type",
+                     "timestamp", "rating", "user", "item"]
+            return pd.DataFrame({col: columns[col] for col in order}, copy=False)
+        return self._memoized("interactions", build)
+
+    def split(self):
+        """(train, test) DataFrames of `interactions()`"""
+        def build():
+            df, encode = self.interactions(), self.artifacts("encode")
+            return df.iloc[encode["train_rows"]], df.iloc[encode["test_rows"]]
+        return self._memoized("split", build)
+
+    def interaction_store(self):
+        """Encoded (user, item, rating) interactions as an `InteractionStore`, in table order"""
+        def build():
+            from interaction_store import InteractionStore
+
+            ingest, encode = self.artifacts("ingest"), self.artifacts("encode")
+            return InteractionStore(encode["user"], encode["item"], ingest["rating"], self.n_users, self.n_items)
+        return self._memoized("interaction_store", build)
+
+    def interaction_split(self):
+        """(train, test) `InteractionStore`s, split by the encode stage's row indices"""
+        def build():
+            encode = self.artifacts("encode")
+            return self.interaction_store().split(encode["train_rows"], encode["test_rows"])
+        return self._memoized("interaction_split", build)
+
+    def ncf_model(self):
+        """The trained Keras NCFModel (restored from its weights when cached), or None"""
+        def build():
+            ncf = self.artifacts("train_ncf")
+            if not ncf.meta["n_weights"]:
+                return None
+            from ncf import restore_ncf_model
+            return restore_ncf_model([ncf[f"w{k}"] for k in range(ncf.meta["n_weights"])])
+        self.artifacts("train_ncf")
+        return self._memoized("ncf_model", build)
+
+    def scorer(self):
+        """HybridScorer over the SVD factors, with NCF scores from `ncf_model()`"""
+        def build():
+            from scoring import HybridScorer
+
+            svd, model = self.artifacts("train_svd"), self.ncf_model()
+            ncf_predict = None
+            if model is not None:
+                from ncf import make_ncf_predict
+                ncf_predict = make_ncf_predict(model)
+            return HybridScorer(
+                svd["pu"], svd["qi"], svd["bu"], svd["bi"], svd.meta["global_mean"],
+                ncf_predict=ncf_predict,
+                ncf_weight=self.config.ncf_weight,
+                svd_weight=self.config.svd_weight,
+                rating_scale=tuple(svd.meta["rating_scale"]),
+            )
+        return self._memoized("scorer", build)
+
+    def catalog(self):
+        def build():
+            from catalog import ProductCatalog
+
+            meta = self.artifacts("build_metadata")
+            return ProductCatalog(
+                meta["catalog_product_ids"],
+                meta["catalog_category_codes"], meta.meta["categories"],
+                meta["catalog_brand_codes"], meta.meta["brands"],
+                meta["catalog_prices"],
+            )
+        return self._memoized("catalog", build)
+
+    def popularity(self):
+        def build():
+            from popularity import PopularityStore
+
+            meta, catalog = self.artifacts("build_metadata"), self.catalog()
+            config = meta.meta["popularity"]
+            return PopularityStore.from_counts(
+                meta["popularity_counts"],
+                decayed=meta["popularity_decayed"] if "popularity_decayed" in meta else None,
+                t_ref=config["t_ref"],
+                categories=catalog.category_codes,
+                eligible=catalog.has_brand | catalog.has_price,
+                half_life=config["half_life"],
+                capacity=config["capacity"],
+            )
+        return self._memoized("popularity", build)
+
+    def seen_index(self):
+        def build():
+            from scipy import sparse
+
+            meta = self.artifacts("build_metadata")
+            return sparse.csr_matrix((meta["seen_data"], meta["seen_indices"], meta["seen_indptr"]),
+                                     shape=(self.n_users, self.n_items))
+        return self._memoized("seen_index", build)
+
+    def item_embeddings(self):
+        """The NCF item Embedding table (weight 1, row k = item code k), or None without NCF"""
+        ncf = self.artifacts("train_ncf")
+        return ncf["w1"] if ncf.meta["n_weights"] else None
+
+    def ann_candidates(self):
+        def build():
+            # IVF over SVD qi and the NCF item embeddings, clustered once per
+            # pipeline; exported bundles store the index
+            from ann_index import ANNCandidateGenerator
+
+            c = self.config
+            return ANNCandidateGenerator.build(self.scorer(), self.seen_index(),
+                                               ncf_item_embeddings=self.item_embeddings(),
+                                               n_candidates=c.ann_n_candidates, n_probe=c.ann_n_probe)
+        return self._memoized("ann_candidates", build)
+
+    def recommender(self, cache=None):
+        """A new serving Recommender over the trained artifacts"""
+        from interaction_store import InteractionStore
+        from recommender import Recommender
+
+        c = self.config
+        scorer, seen_index = self.scorer(), self.seen_index()
+        retriever = None
+        if c.use_ann_candidates:
+            # Candidates re-ranked by the hybrid score
+            from retrieval import CandidateRetriever
+            retriever = CandidateRetriever(scorer, self.ann_candidates())
+
+        encode = self.artifacts("encode")
+        return Recommender(
+            scorer, InteractionStore.from_csr(seen_index), encode["user_classes"], encode["item_classes"],
+            self.catalog(), self.popularity(),
+            item_embeddings=self.item_embeddings(),
+            retriever=retriever,
+            pool_size=c.pool_size,
+            cache=cache
+        )
+
+    def export(self, recommender=None, ncf_model=None, directory=None):
+        """Write a serving bundle; evaluation metrics and stage fingerprints go in `extra`"""
+        from bundle import export_bundle
+
+        metrics = self.artifacts("evaluate").meta
+        extra = {
+            "hybrid_rmse": metrics["pointwise"]["hybrid"]["rmse"],
+            "svd_rmse": metrics["pointwise"]["svd"]["rmse"],
+            "ncf_rmse": metrics["pointwise"]["ncf"]["rmse"],
+            "ranking": metrics["ranking"],
+            "pipeline": {stage: self.fingerprint(stage) for stage in STAGES},
+        }
+        recommender = recommender or self.recommender()
+        with stage_of(self.profiler, "export"):
+            return export_bundle(directory or self.config.bundle_dir, recommender,
+                                 ncf_model=ncf_model or self.ncf_model(), extra=extra,
+                                 quantize=self.config.quantize)
+
+
+# ---------- CLI ----------
+
+def _parse_value(text):
+    """JSON value when it parses (numbers, lists, null, ...), otherwise the raw string"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def print_metrics(metrics):
+    print("\n📊 MODEL PERFORMANCE:")
+    for name, m in metrics["pointwise"].items():
+        print(f"   {name:<7} RMSE: {m['rmse']:.4f}  MAE: {m['mae']:.4f}  R²: {m['r2']:.4f}  "
+              f"within ±0.5: {m['within_threshold']:.2f}%")
+    print(f"\n📈 RANKING METRICS ({metrics['ranking_users']:,} test users):")
+    for k, m in metrics["ranking"].items():
+        print(f"   {k:<4} Precision: {m['precision']:.4f}  Recall: {m['recall']:.4f}  "
+              f"NDCG: {m['ndcg']:.4f}  MAP: {m['map']:.4f}  Coverage: {m['coverage'] * 100:.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run (or reuse) the training pipeline stages")
+    parser.add_argument("stages", nargs="*", help=f"stages to run, with their inputs (default: all): "
+                                                  f"{', '.join(STAGES)}")
+    parser.add_argument("--config", help="JSON file of PipelineConfig fields")
+    parser.add_argument("--set", action="append", default=[], metavar="FIELD=VALUE",
+                        help="override one config field (value parsed as JSON when possible)")
+    parser.add_argument("--force", action="store_true",
+                        help="recompute the named stages (every stage when none is named) even when cached")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write the stage cache")
+    parser.add_argument("--export", action="store_true", help="write a serving bundle afterwards")
+    parser.add_argument("--status", action="store_true", help="show fingerprints and cache state, run nothing")
+    parser.add_argument("--profile", metavar="PATH", help="write a PipelineProfiler JSON report")
+    options = parser.parse_args(argv)
+
+    unknown = set(options.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s) {', '.join(sorted(unknown))}; expected {', '.join(STAGES)}")
+
+    config = PipelineConfig.load(options.config) if options.config else PipelineConfig()
+    overrides = {}
+    for item in options.set:
+        name, sep, value = item.partition("=")
+        if not sep:
+            parser.error(f"--set expects FIELD=VALUE, got {item!r}")
+        overrides[name] = _parse_value(value)
+    if options.no_cache:
+        overrides["cache_dir"] = None
+    try:
+        config = config.replace(**overrides)
+    except ValueError as e:
+        parser.error(str(e))
+
+    profiler = None
+    if options.profile:
+        from instrumentation import PipelineProfiler
+        profiler = PipelineProfiler().start()
+
+    pipeline = Pipeline(config, profiler=profiler, force=(options.stages or STAGES) if options.force else ())
+    if options.status:
+        for stage, fingerprint, cached in pipeline.status():
+            print(f"   {stage:<15} {fingerprint}  {'cached' if cached else '-'}")
+        return
+
+    artifacts = pipeline.run(options.stages or None)
+    if "evaluate" in artifacts:
+        print_metrics(artifacts["evaluate"].meta)
+    if options.export:
+        print(f"\n📦 Serving bundle exported to {pipeline.export()}")
+    if profiler is not None:
+        profiler.print_summary()
+        profiler.write_report(options.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# ===========================
+# Popularity Store
+# (cached, incrementally updated item rankings)
+# ===========================
+
+import time
+
+import numpy as np
+
+from retrieval import top_n_indices
+
+
+class PopularityStore:
+    """Interaction counts per item with precomputed top-N rankings.
+
+    Counts are built once and then updated incrementally with `update`.
+    For each variant (raw counts or time-decayed) and scope (whole catalog
+    or one category) the store keeps the best `capacity` eligible items in a
+    sorted array, so serving top-N is a slice. An update only invalidates the
+    rankings it touches; they are rebuilt lazily with `np.argpartition`.
+
+    The time-decayed variant weights an event at time t by
+    2 ** ((t - t_ref) / half_life). Rankings are invariant to a common scale,
+    so old scores never have to be decayed; t_ref is just moved forward now
+    and then to keep the weights in floating-point range.
+    """
+
+    def __init__(self, n_items, categories=None, eligible=None, half_life=None, capacity=1000):
+        self.counts = np.zeros(n_items, dtype=np.float64)
+        self.half_life = half_life
+        self.decayed = np.zeros(n_items, dtype=np.float64) if half_life else None
+        self.t_ref = None
+        self.categories = (np.full(n_items, -1, dtype=np.int64) if categories is None
+                           else np.asarray(categories, dtype=np.int64).copy())
+        self.eligible = (np.ones(n_items, dtype=bool) if eligible is None
+                         else np.asarray(eligible, dtype=bool).copy())
+        self.capacity = capacity
+        self._rankings = {}
+        self._category_items = None
+
+    @classmethod
+    def from_interactions(cls, items, n_items, timestamps=None, weights=None, **kwargs):
+        """Build a store from an array of interacted item indices (optionally weighted)"""
+        store = cls(n_items, **kwargs)
+        store.update(items, timestamps, weights)
+        return store
+
+    @classmethod
+    def from_counts(cls, counts, decayed=None, t_ref=None, **kwargs):
+        """Restore a store from saved counts (and decayed scores with their t_ref)"""
+        store = cls(len(counts), **kwargs)
+        store.counts = np.array(counts, dtype=np.float64)
+        if decayed is not None and store.decayed is not None:
+            store.decayed = np.array(decayed, dtype=np.float64)
+            store.t_ref = t_ref
+        return store
+
+    @property
+    def n_items(self):
+        return len(self.counts)
+
+    # ---------- Updates ----------
+
+    def grow(self, n_items, categories=None, eligible=None):
+        """Extend the store to `n_items` items (new items start at zero)"""
+        extra = n_items - self.n_items
+        if extra <= 0:
+            return
+        self.counts = np.concatenate([self.counts, np.zeros(extra)])
+        if self.decayed is not None:
+            self.decayed = np.concatenate([self.decayed, np.zeros(extra)])
+        self.categories = np.concatenate([
+            self.categories,
+            np.full(extra, -1, dtype=np.int64) if categories is None else np.asarray(categories, dtype=np.int64),
+        ])
+        self.eligible = np.concatenate([
+            self.eligible,
+            np.ones(extra, dtype=bool) if eligible is None else np.asarray(eligible, dtype=bool),
+        ])
+        self._category_items = None
+        self._rankings.clear()
+
+    def update(self, items, timestamps=None, weights=None):
+        """Add new interactions (item indices, optional unix timestamps and weights)"""
+        items = np.asarray(items, dtype=np.int64)
+        if len(items) == 0:
+            return
+        if items.max() >= self.n_items:
+            self.grow(int(items.max()) + 1)
+
+        weights = np.ones(len(items)) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.counts += np.bincount(items, weights, minlength=self.n_items)
+
+        if self.decayed is not None:
+            if timestamps is None:
+                timestamps = np.full(len(items), time.time())
+            timestamps = np.asarray(timestamps, dtype=np.float64)
+            if self.t_ref is None:
+                self.t_ref = float(timestamps.min())
+
+            exponents = (timestamps - self.t_ref) / self.half_life
+            if exponents.max() > 512:
+                # Rebase: scale existing scores down and move the reference forward
+                shift = float(exponents.max())
+                self.decayed *= 2.0 ** -shift
+                self.t_ref += shift * self.half_life
+                exponents -= shift
+            self.decayed += np.bincount(items, weights * np.exp2(exponents), minlength=self.n_items)
+
+        touched = set(np.unique(self.categories[items]).tolist())
+        for key in list(self._rankings):
+            if key[1] is None or key[1] in touched:
+                del self._rankings[key]
+
+    # ---------- Rankings ----------
+
+    def _items_in(self, category):
+        if category is None:
+            return np.arange(self.n_items)
+        if self._category_items is None:
+            order = np.argsort(self.categories, kind="stable")
+            codes, starts = np.unique(self.categories[order], return_index=True)
+            bounds = np.append(starts, len(order))
+            self._category_items = {int(c): order[bounds[k]:bounds[k + 1]] for k, c in enumerate(codes)}
+        return self._category_items.get(int(category), np.empty(0, dtype=np.int64))
+
+    def _ranking(self, decayed, category, size):
+        key = (decayed, category)
+        cached = self._rankings.get(key)
+        # A cached ranking is truncated when it filled its whole limit
+        if cached is None or (size > len(cached[0]) and len(cached[0]) == cached[1]):
+            limit = max(size, self.capacity)
+            scores = self.decayed if decayed else self.counts
+            candidates = self._items_in(category)
+            candidates = candidates[self.eligible[candidates] & (scores[candidates] > 0)]
+            cached = (candidates[top_n_indices(scores[candidates], limit)], limit)
+            self._rankings[key] = cached
+        return cached[0]
+
+    def top_n(self, n=10, category=None, decayed=False):
+        """Indices of the n most popular eligible items, best first"""
+        if n <= 0:
+            raise ValueError(f"top_n must be positive, got {n}")
+        if decayed and self.decayed is None:
+            raise ValueError("PopularityStore was built without a half_life")
+        return self._ranking(decayed, category, n)[:n]
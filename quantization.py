@@ -0,0 +1,216 @@
+# ===========================
+# Quantized Factor Storage
+# (int8 / float16 rows with per-row scales, scoring without dequantizing)
+# ===========================
+#
+#   python quantization.py artifacts/bundles --dtype int8 --out artifacts/bundles-int8
+#
+# Re-exports a float bundle with quantized SVD factors and NCF embedding
+# tables and prints how far scores and top-N lists drift from the original.
+
+import argparse
+import json
+
+import numpy as np
+
+from scoring import HybridScorer
+
+QUANTIZED_DTYPES = ("int8", "float16")
+
+# Item rows dequantized per block when scoring the whole catalog, so the
+# float32 working copy stays small however large the catalog is
+CATALOG_BLOCK_ROWS = 65536
+
+
+class QuantizedMatrix:
+    """A 2-D matrix stored as int8 (or float16) values with per-row scales.
+
+    int8 is symmetric per row: row r is `values[r] * scales[r]` with
+    `scales[r] = max|row r| / 127`, i.e. 4x smaller than float32 with an
+    error of at most half a step per entry. float16 keeps the values as
+    they are (no scales), 2x smaller. Rows are dequantized to float32 only
+    where they are used; `np.asarray(matrix)` gives the full float32 copy.
+    """
+
+    def __init__(self, values, scales=None):
+        self.values = values
+        self.scales = scales
+
+    @classmethod
+    def from_array(cls, matrix, dtype="int8"):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if dtype == "float16":
+            return cls(matrix.astype(np.float16))
+        if dtype != "int8":
+            raise ValueError(f"Unsupported quantization dtype {dtype!r}; expected one of {QUANTIZED_DTYPES}")
+        scales = np.abs(matrix).max(axis=1) / 127.0 if matrix.size else np.zeros(len(matrix), np.float32)
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        values = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return cls(values, scales)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.dequantize()
+        return dense if dtype is None else dense.astype(dtype, copy=False)
+
+    def rows(self, index):
+        """Dequantized float32 rows; `index` may be any NumPy index (ints, arrays, slices)"""
+        rows = self.values[index].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[index][..., None]
+        return rows
+
+    # Row indexing reads like a float array's (e.g. ANN queries over pu)
+    __getitem__ = rows
+
+    def dequantize(self):
+        return self.rows(slice(None))
+
+    def dot_t(self, left, block_rows=CATALOG_BLOCK_ROWS):
+        """`left @ matrix.T`, dequantizing `block_rows` rows at a time"""
+        left = np.asarray(left, dtype=np.float32)
+        out = np.empty((len(left), len(self)), dtype=np.float32)
+        for start in range(0, len(self), block_rows):
+            stop = min(start + block_rows, len(self))
+            out[:, start:stop] = left @ self.rows(slice(start, stop)).T
+        return out
+
+
+class QuantizedHybridScorer(HybridScorer):
+    """HybridScorer whose pu / qi are `QuantizedMatrix` tables.
+
+    SVD scores are computed straight from the quantized rows: a batch
+    dequantizes only its users' rows and the candidate items' rows (or the
+    catalog block by block), so the float factors never exist in full.
+    Biases stay float32. Code that needs plain float factors (incremental
+    fold-in, ANN index build) reads `pu` / `qi`, which dequantizes them
+    once; from then on scoring uses those float copies, so in-place
+    updates are seen.
+    """
+
+    def __init__(self, pu, qi, bu, bi, global_mean, **kwargs):
+        # Empty placeholders for the base class; the quantized tables replace them
+        super().__init__(np.zeros((0, pu.shape[1]), np.float32), np.zeros((0, qi.shape[1]), np.float32),
+                         bu, bi, global_mean, **kwargs)
+        self.pu_q = pu
+        self.qi_q = qi
+        self._pu = None
+        self._qi = None
+
+    @property
+    def pu(self):
+        if self._pu is None:
+            self._pu = self.pu_q.dequantize()
+        return self._pu
+
+    @pu.setter
+    def pu(self, value):
+        self._pu = np.asarray(value)
+
+    @property
+    def qi(self):
+        if self._qi is None:
+            self._qi = self.qi_q.dequantize()
+        return self._qi
+
+    @qi.setter
+    def qi(self, value):
+        self._qi = np.asarray(value)
+
+    @property
+    def n_users(self):
+        return len(self.pu_q) if self._pu is None else len(self._pu)
+
+    @property
+    def n_items(self):
+        return len(self.qi_q) if self._qi is None else len(self._qi)
+
+    def _user_factors(self, users):
+        return self.pu_q.rows(users) if self._pu is None else self._pu[users]
+
+    def _item_factors(self, items):
+        return self.qi_q.rows(items) if self._qi is None else self._qi[items]
+
+    def _catalog_dots(self, user_factors):
+        return self.qi_q.dot_t(user_factors) if self._qi is None else user_factors @ self._qi.T
+
+
+def drift_report(baseline, quantized, n_users=500, top_n=10, seed=0):
+    """How far a quantized Recommender's scores and top-N lists are from the baseline's.
+
+    On a fixed random sample of users: the SVD score error over the whole
+    catalog, the hybrid score error on the baseline's top-N items, and how
+    much of each baseline top-N list the quantized one reproduces (overlap)
+    and how often it is identical, in order.
+    """
+    n_total = len(baseline.users)
+    rng = np.random.default_rng(seed)
+    users = np.sort(rng.choice(n_total, min(n_users, n_total), replace=False))
+
+    svd_error = np.abs(quantized.scorer.svd_scores_all(users) - baseline.scorer.svd_scores_all(users))
+
+    ref_items, _ = baseline.retriever.recommend_batch(users, top_n)
+    new_items, _ = quantized.retriever.recommend_batch(users, top_n)
+    valid = ref_items >= 0
+    candidates = np.where(valid, ref_items, 0)
+    hybrid_error = np.abs(quantized.scorer.score_users(users, candidates)
+                          - baseline.scorer.score_users(users, candidates))[valid]
+
+    overlap = [len(np.intersect1d(r[r >= 0], q[q >= 0])) / max((r >= 0).sum(), 1)
+               for r, q in zip(ref_items, new_items)]
+    return {
+        "users": int(len(users)),
+        "top_n": top_n,
+        "svd_abs_error": {"mean": float(svd_error.mean()), "max": float(svd_error.max())},
+        "hybrid_abs_error": {"mean": float(hybrid_error.mean()) if hybrid_error.size else 0.0,
+                             "max": float(hybrid_error.max()) if hybrid_error.size else 0.0},
+        "top_n_overlap": float(np.mean(overlap)),
+        "top_n_identical": float(np.mean(np.all(ref_items == new_items, axis=1))),
+    }
+
+
+def print_drift_report(report):
+    print(f"\n🧮 QUANTIZATION DRIFT ({report['users']} users, top {report['top_n']}):")
+    print(f"   SVD score    |error| mean {report['svd_abs_error']['mean']:.5f}  max {report['svd_abs_error']['max']:.5f}")
+    print(f"   Hybrid score |error| mean {report['hybrid_abs_error']['mean']:.5f}  "
+          f"max {report['hybrid_abs_error']['max']:.5f}")
+    print(f"   Top-N overlap {report['top_n_overlap'] * 100:.1f}%, identical lists {report['top_n_identical'] * 100:.1f}%")
+
+
+def main(argv=None):
+    from bundle import export_bundle, load_bundle
+
+    parser = argparse.ArgumentParser(description="Re-export a bundle with quantized factors and report the drift")
+    parser.add_argument("bundle", help="bundle root (follows LATEST) or a version directory")
+    parser.add_argument("--out", required=True, help="bundle root to write the quantized version into")
+    parser.add_argument("--dtype", choices=QUANTIZED_DTYPES, default="int8")
+    options = parser.parse_args(argv)
+
+    recommender = load_bundle(options.bundle)
+    ncf_model = recommender.scorer.ncf_predict.model if recommender.scorer.ncf_predict is not None else None
+    path = export_bundle(options.out, recommender, ncf_model=ncf_model, quantize=options.dtype,
+                         extra=recommender.manifest.get("extra"))
+    with open(f"{path}/manifest.json") as f:
+        quantization = json.load(f)["quantization"]
+    print(f"📦 Quantized ({options.dtype}) bundle written to {path}")
+    print(f"   Factor / embedding tables: {quantization['float32_bytes'] / 2 ** 20:,.1f} MB as float32 -> "
+          f"{quantization['bytes'] / 2 ** 20:,.1f} MB")
+    print_drift_report(quantization["drift"])
+
+
+if __name__ == "__main__":
+    main()
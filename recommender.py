@@ -0,0 +1,299 @@
+# ===========================
+# Recommender Service Facade
+# (serving API over the trained artifacts)
+# ===========================
+
+import time
+
+import numpy as np
+
+from cold_start import SESSION_EVENT_RATINGS, ColdStartEngine
+from interaction_store import InteractionStore
+from retrieval import EmbeddingSimilarity, ExactRetriever
+from search_index import ProductSearchIndex
+from vocab import IdVocabulary
+
+
+def _check_top_n(top_n):
+    """top_n as an int, rejected before anything is scored or cached"""
+    if top_n <= 0:
+        raise ValueError(f"top_n must be positive, got {top_n}")
+    return int(top_n)
+
+
+class Recommender:
+    """The recommendation functions of model.py, bound to trained artifacts.
+
+    Everything is held as plain arrays (scorer factors, the interaction
+    store's CSR, catalog columns, popularity counts), so the same object can be built in memory
+    right after training or from a bundle on disk (see `bundle.load_bundle`)
+    without pandas, sklearn or a training run. The search index and the
+    embedding similarity are built on first use.
+
+    With a `RecommendationCache`, per-user results are cached under the
+    user's code, top_n and the model version; whoever changes a user's
+    interactions calls `invalidate_users`.
+
+    Users the model does not know get recommendations from their current
+    session (the products they viewed / carted, see `cold_start`) when
+    it has products the model knows, and the popular products otherwise.
+    """
+
+    def __init__(self, scorer, interactions, user_classes, item_classes, catalog, popularity,
+                 item_embeddings=None, retriever=None, pool_size=None, manifest=None, cache=None):
+        self.scorer = scorer
+        # A CSR seen index is wrapped as a store over it
+        if not isinstance(interactions, InteractionStore):
+            interactions = InteractionStore.from_csr(interactions)
+        self.interactions = interactions
+        seen_index = interactions.csr
+        self.users = IdVocabulary(user_classes)
+        self.items = IdVocabulary(item_classes)
+        self.catalog = catalog
+        self.popularity = popularity
+        self.item_embeddings = item_embeddings
+        self.retriever = retriever if retriever is not None else ExactRetriever(scorer, seen_index, pool_size)
+        self.pool_size = pool_size
+        # Bundle manifest (format and model version) when loaded from disk
+        self.manifest = manifest
+        self._search_index = None
+        self._item_similarity = None
+        self._cold_start = None
+        self.cache = cache
+        if cache is not None:
+            cache.set_model_version(self.model_version)
+
+    @property
+    def model_version(self):
+        return self.manifest["model_version"] if self.manifest else "in-memory"
+
+    @property
+    def seen_index(self):
+        """CSR users x items of everything each user has interacted with"""
+        return self.interactions.csr
+
+    @property
+    def search_index(self):
+        if self._search_index is None:
+            self._search_index = ProductSearchIndex(self.catalog)
+        return self._search_index
+
+    @property
+    def item_similarity(self):
+        if self._item_similarity is None:
+            if self.item_embeddings is None:
+                raise ValueError("Recommender was built without item embeddings")
+            self._item_similarity = EmbeddingSimilarity(self.item_embeddings)
+        return self._item_similarity
+
+    @property
+    def cold_start(self):
+        if self._cold_start is None:
+            self._cold_start = ColdStartEngine(self.scorer, pool_size=self.pool_size)
+        return self._cold_start
+
+    def refresh(self, catalog=None, interactions=None, item_embeddings=None):
+        """Swap in updated components and drop the structures derived from them"""
+        if catalog is not None:
+            self.catalog = catalog
+            self._search_index = None
+        if interactions is not None:
+            self.interactions = interactions
+            if hasattr(self.retriever, "seen_index"):
+                self.retriever.seen_index = interactions.csr
+            elif hasattr(getattr(self.retriever, "generator", None), "seen_index"):
+                self.retriever.generator.seen_index = interactions.csr
+        if item_embeddings is not None:
+            self.item_embeddings = item_embeddings
+            self._item_similarity = None
+
+    def invalidate_users(self, user_codes):
+        """Drop cached results for users (by code) whose interactions changed"""
+        if self.cache is not None:
+            for user in user_codes:
+                self.cache.invalidate_user(int(user))
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
+
+    # ---------- Recommendations ----------
+
+    def has_user(self, user_id):
+        return self.users.index_of(user_id) >= 0
+
+    def _top_product_ids(self, user, top_n):
+        top_items, _ = self.retriever.recommend(user, top_n)
+        return [int(p) for p in self.items.ids_of(top_items)]
+
+    def _cached_details(self, user, top_n):
+        return self.cache.get_or_compute(user, top_n, lambda: tuple(
+            self.get_product_info(pid) for pid in self._top_product_ids(user, top_n)))
+
+    def recommend_for_user(self, user_id, top_n=5, session=None, events=None):
+        """Top-N unseen product ids for a user.
+
+        Unknown users are served from `session` (product ids, with optional
+        matching `events` types; views by default) or, without one, get the
+        most popular products.
+        """
+        top_n = _check_top_n(top_n)
+        user = self.users.index_of(user_id)
+        if user < 0:
+            return [product['product_id'] for product in self._unknown_user_details(top_n, session, events)]
+        if self.cache is not None:
+            return [product['product_id'] for product in self._cached_details(user, top_n)]
+        return self._top_product_ids(user, top_n)
+
+    def recommend_with_details(self, user_id, top_n=5, session=None, events=None):
+        """Get recommendations with full product details"""
+        top_n = _check_top_n(top_n)
+        user = self.users.index_of(user_id)
+        if user < 0:
+            return self._unknown_user_details(top_n, session, events)
+        if self.cache is not None:
+            # Copies, so callers cannot modify the cached entries
+            return [dict(product) for product in self._cached_details(user, top_n)]
+        return [self.get_product_info(pid) for pid in self._top_product_ids(user, top_n)]
+
+    def recommend_with_details_batch(self, user_ids, top_n=5, sessions=None):
+        """`recommend_with_details` for many users, scoring all cache misses in one batch.
+
+        `sessions`, if given, has one entry per user: None or a
+        (product_ids, events) pair used when that user is unknown. The
+        cold-start sessions of a batch are scored together as well.
+        """
+        top_n = _check_top_n(top_n)
+        start = time.perf_counter()
+        users = self.users.index_of(np.asarray(user_ids))
+        sessions = sessions if sessions is not None else [None] * len(users)
+        results = [[] for _ in users]
+        pending, cold, encoded = [], [], []
+        for k, user in enumerate(users):
+            cached = self.cache.get(int(user), top_n) if self.cache is not None and user >= 0 else None
+            if cached is not None:
+                results[k] = [dict(product) for product in cached]
+            elif user >= 0:
+                pending.append(k)
+            else:
+                session = self.encode_session(*sessions[k]) if sessions[k] is not None else None
+                if session is not None and len(session[0]):
+                    cold.append(k)
+                    encoded.append(session)
+                else:
+                    # No session, or none of its products is known
+                    results[k] = self.get_popular_products(top_n)
+
+        if cold:
+            top_items, _ = self.cold_start.recommend_batch(encoded, top_n)
+            for k, row in zip(cold, top_items):
+                results[k] = [self.get_product_info(int(pid)) for pid in self.items.ids_of(row[row >= 0])]
+        if not pending:
+            return results
+
+        top_items, _ = self.retriever.recommend_batch(users[pending], top_n)
+        seconds = (time.perf_counter() - start) / len(pending)
+        for k, row in zip(pending, top_items):
+            details = tuple(self.get_product_info(int(pid)) for pid in self.items.ids_of(row[row >= 0]))
+            if self.cache is not None:
+                self.cache.put(int(users[k]), top_n, details, seconds)
+            results[k] = [dict(product) for product in details]
+        return results
+
+    # ---------- Cold start ----------
+
+    def encode_session(self, product_ids, events=None):
+        """(item codes, ratings) of the session products the model knows.
+
+        `events` are the event types matching `product_ids` (all views when
+        omitted). Unknown products and event types are dropped and only the
+        first event per product is kept, as in training.
+        """
+        items = np.atleast_1d(self.items.index_of(np.asarray(product_ids)))
+        if events is None:
+            ratings = np.full(len(items), SESSION_EVENT_RATINGS["view"])
+        else:
+            if len(events) != len(items):
+                raise ValueError(f"got {len(events)} events for {len(items)} products")
+            ratings = np.array([SESSION_EVENT_RATINGS.get(event, 0.0) for event in events])
+        keep = (items >= 0) & (ratings > 0)
+        items, ratings = items[keep], ratings[keep]
+        _, first = np.unique(items, return_index=True)
+        first.sort()
+        return items[first], ratings[first]
+
+    def recommend_for_session(self, product_ids, events=None, top_n=5):
+        """Top-N product ids for a user known only by their session's products.
+
+        When none of the products is known to the model, the most popular
+        products are returned instead.
+        """
+        top_n = _check_top_n(top_n)
+        items, ratings = self.encode_session(product_ids, events)
+        if len(items) == 0:
+            return [product['product_id'] for product in self.get_popular_products(top_n)]
+        top_items, _ = self.cold_start.recommend(items, ratings, top_n)
+        return [int(p) for p in self.items.ids_of(top_items)]
+
+    def _unknown_user_details(self, top_n, session, events):
+        if session is None:
+            return self.get_popular_products(top_n)
+        return [self.get_product_info(pid) for pid in self.recommend_for_session(session, events, top_n)]
+
+    # ---------- Products ----------
+
+    def get_product_info(self, product_id):
+        """Get product information by ID with generated name"""
+        row = self.catalog.row_of(product_id)
+        if row < 0:
+            return {
+                'product_id': product_id,
+                'product_name': 'Unknown Product',
+                'category': 'Unknown',
+                'brand': 'Unknown',
+                'price': 0.0
+            }
+        return self.catalog.details(row, product_id=product_id)
+
+    def search_product_by_name(self, search_term, limit=10):
+        """Search for products by brand or category name"""
+        return self.search_index.search(search_term, limit=limit)
+
+    def recommend_similar_products(self, product_id, top_n=5, mode="category"):
+        """Products similar to a given product; popular products if it is unknown.
+
+        mode="category" is content-based (same category, brand/price first);
+        mode="embedding" ranks by cosine similarity of the NCF item embeddings.
+        """
+        if mode not in ("category", "embedding"):
+            raise ValueError(f"mode must be 'category' or 'embedding', got {mode!r}")
+        top_n = _check_top_n(top_n)
+        row = self.catalog.row_of(product_id)
+        if row < 0:
+            return self.get_popular_products(top_n)
+
+        similar = []
+        if mode == "embedding":
+            rows, scores = self.item_similarity.similar(row, top_n)
+            for r, score in zip(rows, scores):
+                product = self.catalog.details(r)
+                product['similarity'] = float(score)
+                similar.append(product)
+            return similar
+
+        for r in self.catalog.same_category(row, top_n):
+            product = self.catalog.details(r)
+            product['priority'] = int(self.catalog.priority[r])
+            similar.append(product)
+        return similar
+
+    def get_popular_products(self, top_n=10, category=None, decayed=False):
+        """Most popular products, optionally within one category_code or time-decayed"""
+        category_code = None
+        if category is not None:
+            matches = np.flatnonzero(self.catalog.categories == category)
+            if len(matches) == 0:
+                return []
+            category_code = int(matches[0])
+
+        rows = self.popularity.top_n(top_n, category=category_code, decayed=decayed)
+        return [self.catalog.details(r) for r in rows]
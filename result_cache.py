@@ -0,0 +1,138 @@
+# ===========================
+# Recommendation Result Cache
+# (per-user top-N results with LRU eviction and TTL expiry)
+# ===========================
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    """Bounded cache of per-user recommendation results.
+
+    Entries are keyed by (user_id, top_n, model_version) and kept in LRU
+    order: a hit moves the entry to the back, and inserting past
+    `max_entries` evicts from the front. Entries older than `ttl` seconds
+    are dropped when they are next read (ttl=None keeps them until evicted).
+
+    `invalidate_user` drops every entry of one user, for when their
+    interactions change; `set_model_version` drops everything cached for
+    another model, for when a new bundle is loaded. Hit / miss counts and
+    the time spent answering hits and computing misses are kept for
+    `stats`. All operations take one lock, so the cache can be shared by
+    request threads.
+    """
+
+    def __init__(self, max_entries=10_000, ttl=300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.model_version = None
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._user_keys = {}           # user_id -> set of keys
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---------- Lookup ----------
+
+    def get(self, user_id, top_n):
+        """Cached value for (user_id, top_n) under the current model version, or None"""
+        start = time.perf_counter()
+        key = (user_id, top_n, self.model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[0] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.hit_seconds += time.perf_counter() - start
+            return entry[1]
+
+    def put(self, user_id, top_n, value, seconds=0.0):
+        """Store a freshly computed value; `seconds` is the time it took (a miss)"""
+        key = (user_id, top_n, self.model_version)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self.clock(), value)
+            self._user_keys.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self.misses += 1
+            self.miss_seconds += seconds
+
+    def get_or_compute(self, user_id, top_n, compute):
+        """Cached value for (user_id, top_n), calling `compute()` on a miss"""
+        start = time.perf_counter()
+        value = self.get(user_id, top_n)
+        if value is None:
+            value = compute()
+            self.put(user_id, top_n, value, time.perf_counter() - start)
+        return value
+
+    def _remove(self, key):
+        del self._entries[key]
+        keys = self._user_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[key[0]]
+
+    # ---------- Invalidation ----------
+
+    def invalidate_user(self, user_id):
+        """Drop all cached results of one user; returns how many were dropped"""
+        with self._lock:
+            keys = self._user_keys.pop(user_id, ())
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def set_model_version(self, model_version):
+        """Switch to a new model version, dropping results cached for the old one"""
+        with self._lock:
+            if model_version != self.model_version:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._user_keys.clear()
+                self.model_version = model_version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    # ---------- Stats ----------
+
+    def reset_stats(self):
+        self.hits = self.misses = 0
+        self.evictions = self.expirations = self.invalidations = 0
+        self.hit_seconds = self.miss_seconds = 0.0
+
+    def stats(self):
+        """Counters and mean latencies (ms) for hits and misses"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "model_version": self.model_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "mean_hit_ms": 1000 * self.hit_seconds / self.hits if self.hits else 0.0,
+            "mean_miss_ms": 1000 * self.miss_seconds / self.misses if self.misses else 0.0,
+        }
@@ -0,0 +1,162 @@
+# ===========================
+# Exact Full-Catalog Retrieval
+# (hybrid score over every unseen item, optional SVD pre-filter)
+# ===========================
+
+import numpy as np
+from scipy import sparse
+
+
+def build_seen_index(users, items, n_users, n_items, ratings=None):
+    """CSR user -> items matrix of everything a user has interacted with.
+
+    Stored values are the ratings when given (float32, one per deduplicated
+    pair, used to fold users into the SVD incrementally), otherwise int8 ones.
+    """
+    users = np.asarray(users)
+    items = np.asarray(items)
+    if ratings is None:
+        data = np.ones(len(users), dtype=np.int8)
+    else:
+        data = np.asarray(ratings, dtype=np.float32)
+    seen = sparse.csr_matrix((data, (users, items)), shape=(n_users, n_items))
+    seen.sum_duplicates()
+    seen.sort_indices()
+    return seen
+
+
+def top_n_indices(scores, n):
+    """Indices of the n highest scores, best first.
+
+    Uses `np.argpartition` so only the selected slice is sorted. Ties are
+    broken by index, which keeps results reproducible between calls.
+    """
+    scores = np.asarray(scores)
+    n = min(n, scores.shape[-1])
+    if n <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+
+    part = np.argpartition(-scores, n - 1, axis=-1)[..., :n]
+    part_scores = np.take_along_axis(scores, part, axis=-1)
+    if scores.ndim == 1:
+        order = np.lexsort((part, -part_scores))
+    else:
+        order = np.array([np.lexsort((p, -s)) for p, s in zip(part, part_scores)])
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class ExactRetriever:
+    """Deterministic top-N over every unseen item in the catalog.
+
+    By default (`pool_size=None`) every item gets the full hybrid score
+    (one batched NCF call over the catalog), the user's seen items are
+    masked through a CSR index and the best top_n kept, so the result is
+    the exact hybrid ranking.
+
+    `pool_size=N` is a serving shortcut for large catalogs: the whole
+    catalog is scored with the SVD factors in one matrix product, only the
+    best N unseen items by SVD are hybrid-scored, and an item outside that
+    pool is never recommended even when its NCF score would lift it.
+    """
+
+    def __init__(self, scorer, seen_index, pool_size=None):
+        self.scorer = scorer
+        self.seen_index = seen_index
+        self.pool_size = pool_size
+
+    def _mask_seen(self, users, scores):
+        rows = self.seen_index[users].tocoo()
+        scores[rows.row, rows.col] = -np.inf
+
+    def recommend_batch(self, users, top_n=5):
+        """Top-N item indices and hybrid scores for a batch of encoded users.
+
+        Returns two (B, top_n) arrays. Rows for users with fewer than top_n
+        unseen items are padded with item -1 and score -inf.
+        """
+        users = np.asarray(users)
+        if self.pool_size is None:
+            catalog = np.arange(self.scorer.n_items)
+            pool = np.broadcast_to(catalog, (len(users), len(catalog)))
+            hybrid = self.scorer.score_users(users, catalog)
+            self._mask_seen(users, hybrid)
+        else:
+            # SVD pre-filter: hybrid-score only the best pool_size unseen items
+            svd = self.scorer.svd_scores_all(users)
+            self._mask_seen(users, svd)
+            pool = top_n_indices(svd, max(self.pool_size, top_n))
+            hybrid = self.scorer.score_users(users, pool)
+            hybrid[~np.isfinite(np.take_along_axis(svd, pool, axis=1))] = -np.inf
+
+        best = top_n_indices(hybrid, top_n)
+        items = np.take_along_axis(pool, best, axis=1)
+        scores = np.take_along_axis(hybrid, best, axis=1)
+        items[~np.isfinite(scores)] = -1
+        return items, scores
+
+    def recommend(self, user, top_n=5):
+        """Top-N item indices and hybrid scores for one encoded user"""
+        items, scores = self.recommend_batch(np.array([user]), top_n)
+        valid = items[0] >= 0
+        return items[0][valid], scores[0][valid]
+
+
+class CandidateRetriever:
+    """Hybrid re-ranking of candidates from an external generation stage.
+
+    `generator.candidates(users)` returns a (B, C) matrix of item indices
+    (padded with -1); those are hybrid-scored in one batched call and the
+    best top_n are kept. Same return shapes as `ExactRetriever`.
+    """
+
+    def __init__(self, scorer, generator):
+        self.scorer = scorer
+        self.generator = generator
+
+    def recommend_batch(self, users, top_n=5):
+        """Top-N item indices and hybrid scores for a batch of encoded users"""
+        users = np.asarray(users)
+        pool = self.generator.candidates(users)
+        valid = pool >= 0
+
+        hybrid = self.scorer.score_users(users, np.where(valid, pool, 0))
+        hybrid[~valid] = -np.inf
+
+        best = top_n_indices(hybrid, top_n)
+        items = np.take_along_axis(pool, best, axis=1)
+        scores = np.take_along_axis(hybrid, best, axis=1)
+        items[~np.isfinite(scores)] = -1
+        return items, scores
+
+    def recommend(self, user, top_n=5):
+        """Top-N item indices and hybrid scores for one encoded user"""
+        items, scores = self.recommend_batch(np.array([user]), top_n)
+        valid = items[0] >= 0
+        return items[0][valid], scores[0][valid]
+
+
+class EmbeddingSimilarity:
+    """Item-to-item cosine similarity over an embedding matrix.
+
+    Rows are L2-normalised once, so a lookup is one matrix-vector product
+    plus `np.argpartition`. Pass an `IVFIndex` built with metric="cosine" to
+    search approximately instead on very large catalogs.
+    """
+
+    def __init__(self, vectors, index=None):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.maximum(norms, 1e-12)
+        self.index = index
+
+    def similar(self, item, top_n=5):
+        """Most similar item indices and cosine scores, excluding the item itself"""
+        if self.index is not None:
+            ids, scores = self.index.search(self.vectors[item], top_n, exclude=[np.array([item])])
+            valid = ids[0] >= 0
+            return ids[0][valid], scores[0][valid]
+
+        scores = self.vectors @ self.vectors[item]
+        scores[item] = -np.inf
+        best = top_n_indices(scores, top_n)
+        return best, scores[best]
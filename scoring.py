@@ -0,0 +1,197 @@
+# ===========================
+# Hybrid Scoring Engine
+# (vectorized SVD + batched NCF)
+# ===========================
+
+import numpy as np
+
+
+class HybridScorer:
+    """Scores many (user, item) pairs at once with the NCF/SVD hybrid blend.
+
+    SVD scores come from a single dot product against the exported factors
+    (pu, qi, bu, bi), indexed by the LabelEncoder codes used in `df["user"]`
+    and `df["item"]`. NCF scores come from one batched call to `ncf_predict`,
+    a callable taking (user_idx, item_idx) arrays and returning a flat array
+    of scores.
+    """
+
+    def __init__(self, pu, qi, bu, bi, global_mean, ncf_predict=None,
+                 ncf_weight=0.6, svd_weight=0.4, rating_scale=(1, 5),
+                 ncf_batch_size=65536):
+        self.pu = np.asarray(pu)
+        self.qi = np.asarray(qi)
+        self.bu = np.asarray(bu)
+        self.bi = np.asarray(bi)
+        self.global_mean = float(global_mean)
+        self.ncf_predict = ncf_predict
+        self.ncf_weight = ncf_weight
+        self.svd_weight = svd_weight
+        self.rating_scale = rating_scale
+        self.ncf_batch_size = ncf_batch_size
+
+    @property
+    def n_users(self):
+        return self.pu.shape[0]
+
+    @property
+    def n_items(self):
+        return self.qi.shape[0]
+
+    @classmethod
+    def from_surprise(cls, svd_model, n_users, n_items, **kwargs):
+        """Export a fitted surprise SVD into encoder-indexed factor matrices.
+
+        surprise keeps its own inner ids, so factors are re-indexed by the raw
+        ids (our encoded `user`/`item` codes). Users and items missing from the
+        trainset get zero factors and biases, which reproduces the way
+        `SVD.estimate` falls back to the global mean for unknown ids.
+        """
+        trainset = svd_model.trainset
+        n_factors = svd_model.pu.shape[1]
+
+        pu = np.zeros((n_users, n_factors), dtype=svd_model.pu.dtype)
+        bu = np.zeros(n_users, dtype=svd_model.bu.dtype)
+        raw = np.fromiter(trainset._raw2inner_id_users.keys(), dtype=np.int64)
+        inner = np.fromiter(trainset._raw2inner_id_users.values(), dtype=np.int64)
+        pu[raw] = svd_model.pu[inner]
+        bu[raw] = svd_model.bu[inner]
+
+        qi = np.zeros((n_items, n_factors), dtype=svd_model.qi.dtype)
+        bi = np.zeros(n_items, dtype=svd_model.bi.dtype)
+        raw = np.fromiter(trainset._raw2inner_id_items.keys(), dtype=np.int64)
+        inner = np.fromiter(trainset._raw2inner_id_items.values(), dtype=np.int64)
+        qi[raw] = svd_model.qi[inner]
+        bi[raw] = svd_model.bi[inner]
+
+        if not svd_model.biased:
+            bu[:] = 0.0
+            bi[:] = 0.0
+
+        kwargs.setdefault("rating_scale", trainset.rating_scale)
+        return cls(pu, qi, bu, bi, trainset.global_mean, **kwargs)
+
+    @classmethod
+    def from_factors(cls, model, **kwargs):
+        """Wrap a factorizer whose pu/qi/bu/bi are already indexed by encoded ids (e.g. ALSFactorizer)"""
+        kwargs.setdefault("rating_scale", model.rating_scale)
+        return cls(model.pu, model.qi, model.bu, model.bi, model.global_mean, **kwargs)
+
+    def grow(self, n_users, n_items):
+        """Extend the factor tables to n_users / n_items (new rows start at zero).
+
+        Afterwards every table is a writable in-memory array, so rows can be
+        updated in place even when the scorer was loaded from read-only
+        memory-mapped files.
+        """
+        def padded(array, n):
+            if len(array) >= n and array.flags.writeable and not isinstance(array, np.memmap):
+                return array
+            out = np.zeros((n,) + array.shape[1:], dtype=array.dtype)
+            out[:len(array)] = array
+            return out
+
+        self.pu = padded(self.pu, max(n_users, self.n_users))
+        self.bu = padded(self.bu, len(self.pu))
+        self.qi = padded(self.qi, max(n_items, self.n_items))
+        self.bi = padded(self.bi, len(self.qi))
+
+    # ---------- SVD ----------
+
+    # Factor access goes through these three, so a subclass can keep the
+    # factors in another form (see quantization.QuantizedHybridScorer)
+    def _user_factors(self, users):
+        return self.pu[users]
+
+    def _item_factors(self, items):
+        return self.qi[items]
+
+    def _catalog_dots(self, user_factors):
+        """user_factors @ qi.T over the whole catalog"""
+        return user_factors @ self.qi.T
+
+    def item_factors(self, items):
+        """SVD factor rows of the given items (dequantized when stored quantized)"""
+        return self._item_factors(np.asarray(items))
+
+    def catalog_dots(self, user_factors):
+        """Dot products of explicit (B, k) user factor vectors with every item, shape (B, n_items)"""
+        return self._catalog_dots(np.asarray(user_factors, dtype=np.float32))
+
+    def svd_scores(self, users, items):
+        """SVD estimates for a batch of users.
+
+        `users` has shape (B,). `items` is either a shared (C,) candidate list
+        or a per-user (B, C) matrix. Returns a (B, C) array clipped to the
+        rating scale, exactly like `svd_model.predict(u, i).est`.
+        """
+        users = np.asarray(users)
+        items = np.asarray(items)
+        user_factors = self._user_factors(users)
+
+        if items.ndim == 1:
+            dots = user_factors @ self._item_factors(items).T
+        else:
+            dots = np.einsum("bk,bck->bc", user_factors, self._item_factors(items))
+
+        est = dots + self.bu[users][:, None] + self.bi[items] + self.global_mean
+        low, high = self.rating_scale
+        return np.clip(est, low, high)
+
+    def svd_scores_pairs(self, users, items):
+        """SVD estimates for aligned (users[k], items[k]) pairs, shape (N,)"""
+        users = np.asarray(users)
+        items = np.asarray(items)
+        est = np.einsum("ij,ij->i", self._user_factors(users), self._item_factors(items))
+        est += self.bu[users] + self.bi[items] + self.global_mean
+        low, high = self.rating_scale
+        return np.clip(est, low, high, out=est)
+
+    def svd_scores_all(self, users):
+        """SVD estimates of a batch of users against the whole catalog, shape (B, n_items)"""
+        users = np.asarray(users)
+        est = self._catalog_dots(self._user_factors(users))
+        est += self.bu[users][:, None]
+        est += self.bi
+        est += self.global_mean
+        low, high = self.rating_scale
+        return np.clip(est, low, high, out=est)
+
+    # ---------- NCF ----------
+
+    def ncf_scores(self, users, items):
+        """NCF scores for a batch of users, in as few forward passes as possible"""
+        users = np.asarray(users)
+        items = np.asarray(items)
+        if items.ndim == 1:
+            items = np.broadcast_to(items, (len(users), len(items)))
+
+        if self.ncf_predict is None:
+            return np.full(items.shape, self.global_mean)
+
+        flat_users = np.repeat(users, items.shape[1])
+        flat_items = items.reshape(-1)
+
+        scores = np.empty(len(flat_items), dtype=np.float64)
+        for start in range(0, len(flat_items), self.ncf_batch_size):
+            stop = start + self.ncf_batch_size
+            scores[start:stop] = self.ncf_predict(flat_users[start:stop], flat_items[start:stop])
+        return scores.reshape(items.shape)
+
+    # ---------- Hybrid ----------
+
+    def score_users(self, users, items):
+        """Hybrid scores with shape (B, C) for a batch of users"""
+        svd = self.svd_scores(users, items)
+        ncf = self.ncf_scores(users, items)
+        return self.ncf_weight * ncf + self.svd_weight * svd
+
+    def score(self, user, items):
+        """Hybrid scores for one user over a 1-D array of candidate items"""
+        return self.score_users(np.array([user]), np.asarray(items))[0]
+
+    def predict_pairs(self, users, items):
+        """Hybrid scores for aligned (users[k], items[k]) pairs"""
+        users = np.asarray(users)
+        items = np.asarray(items)
+        return self.score_users(users, items[:, None])[:, 0]
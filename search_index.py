@@ -0,0 +1,216 @@
+# ===========================
+# Product Search Index
+# (token + n-gram inverted index over the catalog)
+# ===========================
+
+import re
+
+import numpy as np
+
+TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+MAX_GRAM = 3
+
+
+def tokenize(text):
+    """Lower-case alphanumeric tokens of a string"""
+    return [t for t in TOKEN_SPLIT.split(str(text).lower()) if t]
+
+
+def _grams(token):
+    """Every substring of length 1..MAX_GRAM"""
+    return {token[i:i + n] for n in range(1, MAX_GRAM + 1) for i in range(len(token) - n + 1)}
+
+
+def _iter_union(postings, first_block=64):
+    """Ascending union of sorted postings, produced lazily in blocks.
+
+    Each round looks only at the first k entries of every posting; entries up
+    to the smallest k-th head are complete, so they can be emitted before the
+    rest of the lists are touched.
+    """
+    k = first_block
+    emitted = -1
+    while True:
+        heads = np.unique(np.concatenate([p[:k] for p in postings]))
+        longer = [p[k - 1] for p in postings if len(p) > k]
+        bound = min(longer) if longer else np.iinfo(np.int64).max
+        yield heads[(heads > emitted) & (heads <= bound)]
+        if not longer:
+            return
+        emitted = bound
+        k *= 4
+
+
+class ProductSearchIndex:
+    """Inverted index answering prefix and substring product searches.
+
+    Products are ranked once globally by (brand/price priority desc, row) and
+    every token (from brand, category path segments and generated name) keeps
+    a sorted posting list of those ranks. A 1..3-gram index maps query
+    fragments to tokens, so substring queries never scan the catalog, and
+    postings are merged lazily so a query stops once `limit` hits are found.
+
+    Matches are the same products the old linear scan found (any field
+    contains the query). Ranking is deterministic: products whose token
+    equals the query term first, then prefix hits, then infix hits, each
+    tier ordered by priority and row.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._build()
+
+    def _build(self):
+        catalog = self.catalog
+
+        # Global rank: best priority first, then catalog row
+        self.rank_to_row = np.lexsort((np.arange(len(catalog)), -catalog.priority))
+        rank = np.empty(len(catalog), dtype=np.int64)
+        rank[self.rank_to_row] = np.arange(len(catalog))
+
+        # Searchable text depends only on (brand, category): one "document" per pair
+        n_categories = len(catalog.categories)
+        pairs = catalog.brand_codes.astype(np.int64) * n_categories + catalog.category_codes
+        doc_keys, doc_of_row = np.unique(pairs, return_inverse=True)
+        self.doc_of_row = doc_of_row.reshape(-1)
+
+        first_row = np.zeros(len(doc_keys), dtype=np.int64)
+        first_row[self.doc_of_row[::-1]] = np.arange(len(catalog))[::-1]
+
+        fields = ([], [], [])
+        doc_tokens = []
+        for d, key in enumerate(doc_keys):
+            category = str(catalog.categories[key % n_categories]).lower()
+            brand = str(catalog.brands[key // n_categories]).lower()
+            name = catalog.names[first_row[d]].lower()
+            for field, text in zip(fields, (category, brand, name)):
+                field.append(text)
+            doc_tokens.append(set(tokenize(category)) | set(tokenize(brand)) | set(tokenize(name)))
+        # Lower-cased (category, brand, name) per document, as fixed-width strings
+        self.doc_fields = tuple(np.array(field, dtype=str) for field in fields)
+
+        self.vocab = np.array(sorted(set().union(*doc_tokens)), dtype=object)
+        token_id = {t: i for i, t in enumerate(self.vocab)}
+
+        # Posting list per token: sorted ranks of every product carrying it
+        token_of, doc_of = [], []
+        for d, tokens in enumerate(doc_tokens):
+            token_of.extend(token_id[t] for t in tokens)
+            doc_of.extend([d] * len(tokens))
+        token_of = np.array(token_of, dtype=np.int64)
+        doc_of = np.array(doc_of, dtype=np.int64)
+
+        rows_by_doc = np.argsort(self.doc_of_row, kind="stable")
+        doc_bounds = np.searchsorted(self.doc_of_row[rows_by_doc], np.arange(len(doc_keys) + 1))
+        doc_ranks = [rank[rows_by_doc[doc_bounds[d]:doc_bounds[d + 1]]] for d in range(len(doc_keys))]
+
+        by_token = np.argsort(token_of, kind="stable")
+        token_bounds = np.searchsorted(token_of[by_token], np.arange(len(self.vocab) + 1))
+        self.token_docs = []
+        self.postings = []
+        for t in range(len(self.vocab)):
+            docs = np.sort(doc_of[by_token[token_bounds[t]:token_bounds[t + 1]]])
+            self.token_docs.append(docs)
+            self.postings.append(np.sort(np.concatenate([doc_ranks[d] for d in docs])))
+
+        grams = {}
+        for t, token in enumerate(self.vocab):
+            for g in _grams(token):
+                grams.setdefault(g, []).append(t)
+        self.grams = {g: np.array(ids, dtype=np.int64) for g, ids in grams.items()}
+
+    # ---------- Term resolution ----------
+
+    def _prefix_tokens(self, term):
+        lo = np.searchsorted(self.vocab, term, side="left")
+        hi = np.searchsorted(self.vocab, term + "\uffff", side="left")
+        return np.arange(lo, hi)
+
+    def _substring_tokens(self, term):
+        if len(term) <= MAX_GRAM:
+            return self.grams.get(term, np.empty(0, dtype=np.int64))
+        candidates = None
+        for i in range(len(term) - MAX_GRAM + 1):
+            ids = self.grams.get(term[i:i + MAX_GRAM])
+            if ids is None:
+                return np.empty(0, dtype=np.int64)
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+        return np.array([t for t in candidates if term in self.vocab[t]], dtype=np.int64)
+
+    def _term_tokens(self, term, prefix_only):
+        """Matching token ids for one term, split into (exact, prefix, infix) tiers"""
+        tokens = self._prefix_tokens(term) if prefix_only else self._substring_tokens(term)
+        tiers = ([], [], [])
+        for t in tokens:
+            token = self.vocab[t]
+            tiers[0 if token == term else 1 if token.startswith(term) else 2].append(t)
+        return tiers
+
+    def _matching_docs(self, query, term_tokens, verify_text):
+        """Documents holding a match for every term (and the whole query text)"""
+        docs = None
+        for tiers in term_tokens:
+            term_docs = np.unique(np.concatenate([self.token_docs[t] for tier in tiers for t in tier]))
+            docs = term_docs if docs is None else np.intersect1d(docs, term_docs, assume_unique=True)
+        if docs is None:
+            docs = np.arange(len(self.doc_fields[0]))
+        if not verify_text:
+            return docs
+        found = np.zeros(len(docs), dtype=bool)
+        for field in self.doc_fields:
+            found |= np.char.find(field[docs], query) >= 0
+        return docs[found]
+
+    # ---------- Search ----------
+
+    def search_rows(self, query, limit=10, mode="substring"):
+        """Catalog rows matching `query`, best first, at most `limit`.
+
+        mode="substring" matches the query anywhere in brand, category or name
+        (the old behaviour); mode="prefix" requires every query term to start
+        a token.
+        """
+        query = str(query).lower()
+        terms = tokenize(query)
+        prefix_only = mode == "prefix"
+
+        term_tokens = [self._term_tokens(term, prefix_only) for term in terms]
+        if any(not any(tiers) for tiers in term_tokens):
+            return np.empty(0, dtype=np.int64)
+
+        # Drive the search from the most selective term
+        if terms:
+            sizes = [sum(len(self.postings[t]) for tier in tiers for t in tier) for tiers in term_tokens]
+            driver = int(np.argmin(sizes))
+            tier_postings = [[self.postings[t] for t in tier] for tier in term_tokens[driver]]
+        else:
+            tier_postings = [[np.arange(len(self.rank_to_row))]]
+
+        # A single term equal to the query needs no check: a token hit is a field hit.
+        # Otherwise resolve the matching documents first (few, compared to products)
+        accepted = None
+        if len(terms) > 1 or (not prefix_only and terms != [query]):
+            accepted = self._matching_docs(query, term_tokens, verify_text=not prefix_only)
+            if len(accepted) == 0:
+                return np.empty(0, dtype=np.int64)
+
+        rows, taken = [], set()
+        for postings in tier_postings:
+            if not postings:
+                continue
+            for block in _iter_union(postings):
+                block_rows = self.rank_to_row[block]
+                if accepted is not None:
+                    block_rows = block_rows[np.isin(self.doc_of_row[block_rows], accepted)]
+                for r in block_rows:
+                    if r in taken:
+                        continue
+                    taken.add(r)
+                    rows.append(r)
+                    if len(rows) >= limit:
+                        return np.array(rows, dtype=np.int64)
+        return np.array(rows, dtype=np.int64)
+
+    def search(self, query, limit=10, mode="substring"):
+        """Product dicts matching `query`, in the same shape as get_product_info"""
+        return [self.catalog.details(r) for r in self.search_rows(query, limit, mode)]
@@ -0,0 +1,74 @@
+# ===========================
+# Serving Entry Point
+# (load a bundle, answer queries as JSON)
+# ===========================
+#
+#   python serve.py artifacts/bundles recommend_with_details '{"user_id": 512345, "top_n": 5}'
+#   python serve.py artifacts/bundles            # one JSON request per stdin line:
+#   {"method": "search_product_by_name", "args": {"search_term": "samsung"}}
+
+import argparse
+import json
+import sys
+import time
+
+from bundle import load_bundle
+from result_cache import RecommendationCache
+
+METHODS = [
+    "recommend_for_user",
+    "recommend_with_details",
+    "get_product_info",
+    "search_product_by_name",
+    "recommend_similar_products",
+    "get_popular_products",
+    "cache_stats",
+]
+
+
+def handle(recommender, method, args):
+    """Run one request against the recommender and return a JSON-ready response"""
+    if method not in METHODS:
+        return {"error": f"unknown method {method!r}", "methods": METHODS}
+    try:
+        return {"result": getattr(recommender, method)(**(args or {}))}
+    except (TypeError, ValueError, KeyError) as e:
+        # Bad arguments: wrong names / types, out-of-range values, unknown keys
+        return {"error": str(e)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve recommendations from an exported bundle")
+    parser.add_argument("bundle", help="bundle root (follows LATEST) or a version directory")
+    parser.add_argument("method", nargs="?", choices=METHODS, help="run one request and exit")
+    parser.add_argument("args", nargs="?", default="{}", help="JSON object of keyword arguments")
+    parser.add_argument("--cache-size", type=int, default=10_000,
+                        help="cached per-user results (0 disables the cache)")
+    parser.add_argument("--cache-ttl", type=float, default=300.0, help="seconds a cached result stays valid")
+    options = parser.parse_args(argv)
+
+    cache = RecommendationCache(options.cache_size, options.cache_ttl) if options.cache_size > 0 else None
+    start = time.perf_counter()
+    recommender = load_bundle(options.bundle, cache=cache)
+    manifest = recommender.manifest
+    print(f"⚡ Loaded bundle {manifest['model_version']} "
+          f"({manifest['n_users']:,} users, {manifest['n_items']:,} items) "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms", file=sys.stderr)
+
+    if options.method:
+        print(json.dumps(handle(recommender, options.method, json.loads(options.args))))
+        return
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            response = handle(recommender, request.get("method"), request.get("args"))
+        except (json.JSONDecodeError, AttributeError) as e:
+            response = {"error": f"bad request: {e}"}
+        print(json.dumps(response), flush=True)
+
+
+if __name__ == "__main__":
+    main()
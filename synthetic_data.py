@@ -0,0 +1,155 @@
+# ===========================
+# Synthetic Event Log Generator
+# (2019-Nov.csv schema, Zipfian users and products, any scale)
+# ===========================
+#
+#   python synthetic_data.py data/events-1M.csv --rows 1000000
+#
+# Columns match the Kaggle "eCommerce behavior data from multi category
+# store" files: event_time, event_type, product_id, category_id,
+# category_code, brand, price, user_id, user_session.
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+EVENT_TYPES = np.array(["view", "cart", "remove_from_cart", "purchase"])
+EVENT_TYPE_PROBS = [0.90, 0.05, 0.03, 0.02]
+
+CATEGORY_CODES = np.array([
+    "electronics.smartphone", "electronics.audio.headphone", "electronics.video.tv",
+    "electronics.clocks", "electronics.tablet", "electronics.camera.photo",
+    "computers.notebook", "computers.desktop", "computers.peripherals.printer",
+    "computers.components.videocards", "appliances.kitchen.washer", "appliances.kitchen.refrigerators",
+    "appliances.environment.vacuum", "apparel.shoes", "furniture.living_room.sofa",
+    "auto.accessories.player", "kids.toys", "construction.tools.drill",
+], dtype=object)
+
+BRANDS = np.array([
+    "samsung", "apple", "xiaomi", "huawei", "lg", "sony", "lenovo", "acer", "asus", "hp",
+    "bosch", "indesit", "philips", "oppo", "artel", "redmond", "lucente", "cordiant",
+], dtype=object)
+
+
+class ZipfSampler:
+    """Draws ranks 0..n-1 with P(rank k) proportional to 1 / (k + 1) ** exponent.
+
+    Unlike `np.random.Generator.zipf` the support is finite and any exponent
+    > 0 works; sampling is one `searchsorted` into the cumulative weights.
+    """
+
+    def __init__(self, n, exponent):
+        weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** exponent
+        self.cdf = np.cumsum(weights)
+        self.cdf /= self.cdf[-1]
+
+    def sample(self, rng, size):
+        return np.minimum(np.searchsorted(self.cdf, rng.random(size)), len(self.cdf) - 1)
+
+
+class SyntheticEventLog:
+    """A reproducible event log with the schema of 2019-Nov.csv.
+
+    Users and products have Zipfian popularity (a few very active users and
+    best-selling products, a long tail of both); which ids are popular is
+    shuffled so popularity does not follow id order. Every product has a
+    fixed category, brand and price, with missing categories / brands and
+    zero prices mixed in at the given rates, as in the real data. Events are
+    spread evenly over `days` starting at `start`, in time order.
+    """
+
+    def __init__(self, n_users=100_000, n_products=20_000, user_exponent=0.7, product_exponent=0.9,
+                 missing_category=0.3, missing_brand=0.15, zero_price=0.02,
+                 start="2019-11-01", days=30, seed=42):
+        self.n_users = n_users
+        self.n_products = n_products
+        self.start = pd.Timestamp(start, tz="UTC")
+        self.days = days
+        self.seed = seed
+
+        rng = np.random.default_rng(seed)
+        self.user_ids = rng.permutation(n_users).astype(np.int64) + 500_000_000
+        self.product_ids = rng.permutation(n_products).astype(np.int64) + 1_000_000
+        self.users = ZipfSampler(n_users, user_exponent)
+        self.products = ZipfSampler(n_products, product_exponent)
+
+        category = rng.integers(0, len(CATEGORY_CODES), n_products)
+        self.category_ids = 2053013555631882655 + category
+        self.category_codes = np.where(rng.random(n_products) < missing_category, None, CATEGORY_CODES[category])
+        self.brands = np.where(rng.random(n_products) < missing_brand, None,
+                               BRANDS[rng.integers(0, len(BRANDS), n_products)])
+        prices = np.round(rng.lognormal(4.5, 1.2, n_products), 2)
+        self.prices = np.where(rng.random(n_products) < zero_price, 0.0, prices)
+
+    def _format_times(self, seconds):
+        """'YYYY-MM-DD HH:MM:SS UTC' strings, formatting each distinct second once"""
+        distinct, inverse = np.unique(seconds, return_inverse=True)
+        stamps = np.datetime64(self.start.tz_localize(None), "s") + distinct.astype("timedelta64[s]")
+        text = pd.Series(np.datetime_as_string(stamps, unit="s")).str.replace("T", " ", regex=False) + " UTC"
+        return text.to_numpy()[inverse]
+
+    def chunks(self, n_rows, chunksize=1_000_000):
+        """Yield DataFrames of at most `chunksize` events, `n_rows` in total"""
+        span = self.days * 86_400
+        for chunk, start in enumerate(range(0, n_rows, chunksize)):
+            size = min(chunksize, n_rows - start)
+            rng = np.random.default_rng([self.seed, chunk])
+            users = self.user_ids[self.users.sample(rng, size)]
+            products = self.products.sample(rng, size)
+
+            # Evenly spaced over the period, so chunks stay in time order
+            seconds = (np.arange(start, start + size) * span) // max(n_rows, 1)
+            day = seconds // 86_400
+            session = pd.Series(users).map("{:x}".format) + "-" + pd.Series(day).astype(str)
+
+            yield pd.DataFrame({
+                "event_time": self._format_times(seconds),
+                "event_type": EVENT_TYPES[rng.choice(len(EVENT_TYPES), size, p=EVENT_TYPE_PROBS)],
+                "product_id": self.product_ids[products],
+                "category_id": self.category_ids[products],
+                "category_code": self.category_codes[products],
+                "brand": self.brands[products],
+                "price": self.prices[products],
+                "user_id": users,
+                "user_session": session,
+            })
+
+    def write_csv(self, path, n_rows, chunksize=1_000_000):
+        """Stream `n_rows` events to a CSV file (written under a temporary name, then renamed)"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            for k, chunk in enumerate(self.chunks(n_rows, chunksize)):
+                chunk.to_csv(f, index=False, header=k == 0)
+        os.replace(tmp, path)
+        return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic event log in the 2019-Nov.csv schema")
+    parser.add_argument("out", help="CSV path to write")
+    parser.add_argument("--rows", type=float, default=1e6, help="number of events (e.g. 1e7)")
+    parser.add_argument("--users", type=int, default=None, help="distinct users (default: rows / 20)")
+    parser.add_argument("--products", type=int, default=None, help="distinct products (default: rows / 50)")
+    parser.add_argument("--user-exponent", type=float, default=0.7)
+    parser.add_argument("--product-exponent", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=42)
+    options = parser.parse_args(argv)
+
+    n_rows = int(options.rows)
+    log = SyntheticEventLog(
+        n_users=options.users or max(n_rows // 20, 100),
+        n_products=options.products or max(n_rows // 50, 100),
+        user_exponent=options.user_exponent,
+        product_exponent=options.product_exponent,
+        seed=options.seed,
+    )
+    log.write_csv(options.out, n_rows)
+    print(f"🧪 Wrote {n_rows:,} synthetic events ({log.n_users:,} users, {log.n_products:,} products) "
+          f"to {options.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# ===========================
+# Test Fixtures
+# (repo root on sys.path, small synthetic data)
+# ===========================
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules are flat files at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def random_interactions(n_users=60, n_items=40, n_ratings=600, seed=0):
+    """Deduplicated (users, items, ratings) code arrays with 1 / 3 / 5 ratings"""
+    rng = np.random.default_rng(seed)
+    keys = np.unique(rng.integers(0, n_users * n_items, n_ratings))
+    rng.shuffle(keys)
+    ratings = rng.choice([1.0, 3.0, 5.0], len(keys), p=[0.7, 0.2, 0.1])
+    return keys // n_items, keys % n_items, ratings
+
+
+def random_scorer(n_users=60, n_items=40, n_factors=8, seed=0, **kwargs):
+    """A HybridScorer over random factors"""
+    from scoring import HybridScorer
+
+    rng = np.random.default_rng(seed)
+    return HybridScorer(rng.normal(0, 0.5, (n_users, n_factors)), rng.normal(0, 0.5, (n_items, n_factors)),
+                        rng.normal(0, 0.3, n_users), rng.normal(0, 0.3, n_items), 2.5, **kwargs)
+
+
+def small_recommender(n_users=60, n_items=40, seed=0, **kwargs):
+    """A Recommender over random factors and interactions, without NCF.
+
+    User ids are 500 + code and product ids 1000 + code.
+    """
+    from catalog import ProductCatalog
+    from interaction_store import InteractionStore
+    from popularity import PopularityStore
+    from recommender import Recommender
+
+    rng = np.random.default_rng(seed)
+    users, items, ratings = random_interactions(n_users, n_items, seed=seed)
+    catalog = ProductCatalog(1000 + np.arange(n_items), rng.integers(0, 2, n_items),
+                             ["electronics.smartphone", "electronics.audio.headphone"],
+                             rng.integers(0, 3, n_items), ["samsung", "apple", "Generic Brand"],
+                             rng.uniform(10, 100, n_items))
+    popularity = PopularityStore.from_interactions(items, n_items, categories=catalog.category_codes)
+    interactions = InteractionStore(users, items, ratings, n_users, n_items)
+    return Recommender(random_scorer(n_users, n_items, seed=seed), interactions,
+                       500 + np.arange(n_users), 1000 + np.arange(n_items), catalog, popularity, **kwargs)
+
+
+@pytest.fixture(scope="session")
+def event_log(tmp_path_factory):
+    """Path of a small synthetic event log in the 2019-Nov.csv schema"""
+    from synthetic_data import SyntheticEventLog
+
+    path = tmp_path_factory.mktemp("data") / "events.csv"
+    SyntheticEventLog(n_users=400, n_products=300, seed=7).write_csv(str(path), 20_000, chunksize=7_000)
+    return str(path)
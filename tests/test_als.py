@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from als import ALSFactorizer
+from conftest import random_interactions
+from interaction_store import InteractionStore
+
+
+def objective(model, users, items, ratings):
+    """The regularised squared error each ALS half-step minimises"""
+    errors = ratings - (model.global_mean + model.bu[users] + model.bi[items]
+                        + np.einsum("ij,ij->i", model.pu[users], model.qi[items]))
+    n_u = np.bincount(users, minlength=len(model.pu))
+    n_i = np.bincount(items, minlength=len(model.qi))
+    penalty = (model.reg * (n_u * (model.pu ** 2).sum(axis=1)).sum() + model.reg_bias * (model.bu ** 2).sum()
+               + model.reg * (n_i * (model.qi ** 2).sum(axis=1)).sum() + model.reg_bias * (model.bi ** 2).sum())
+    return (errors ** 2).sum() + penalty
+
+
+def test_objective_never_increases_and_training_error_drops():
+    users, items, ratings = random_interactions(n_users=80, n_items=50, n_ratings=1500)
+    losses, rmses = [], []
+    for n_iters in range(1, 7):
+        model = ALSFactorizer(n_factors=6, n_iters=n_iters, seed=0).fit(users, items, ratings)
+        losses.append(objective(model, users, items, ratings))
+        rmses.append(np.sqrt(np.mean((model.predict_batch(users, items) - ratings) ** 2)))
+    assert all(later <= earlier * (1 + 1e-9) for earlier, later in zip(losses, losses[1:]))
+    assert rmses[-1] < rmses[0]
+
+
+def test_fit_interactions_matches_fit_on_deduplicated_pairs():
+    users, items, ratings = random_interactions()
+    store = InteractionStore(users, items, ratings, 60, 40)
+    by_arrays = ALSFactorizer(n_factors=6, n_iters=3).fit(users, items, ratings, 60, 40)
+    by_store = ALSFactorizer(n_factors=6, n_iters=3).fit_interactions(store)
+    for name in ("pu", "qi", "bu", "bi"):
+        np.testing.assert_allclose(getattr(by_store, name), getattr(by_arrays, name), atol=1e-6)
+    assert by_store.global_mean == pytest.approx(by_arrays.global_mean)
+
+
+def test_predict_clips_to_the_rating_scale_like_surprise():
+    users, items, ratings = random_interactions()
+    model = ALSFactorizer(n_factors=6, n_iters=2).fit(users, items, ratings)
+    predictions = model.predict_batch(np.repeat(np.arange(60), 40), np.tile(np.arange(40), 60))
+    assert predictions.min() >= 1 and predictions.max() <= 5
+    prediction = model.predict(3, 4, r_ui=5.0)
+    assert prediction.est == pytest.approx(model.predict_batch(np.array([3]), np.array([4]))[0])
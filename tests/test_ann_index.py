@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from ann_index import ANNCandidateGenerator, IVFIndex
+from conftest import random_interactions, random_scorer, small_recommender
+from retrieval import CandidateRetriever, build_seen_index, top_n_indices
+
+
+def _recall(found, exact):
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, exact)])
+
+
+def test_ivf_recall_against_exact_inner_product_search():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(2000, 16)).astype(np.float32)
+    queries = rng.normal(size=(50, 16)).astype(np.float32)
+    exact = top_n_indices(queries @ vectors.T, 10)
+
+    index = IVFIndex(n_lists=32, metric="ip").build(vectors)
+    ids, scores = index.search(queries, 10, n_probe=8)
+    assert _recall(ids, exact) >= 0.8
+    # Scores are the true inner products of the returned items, best first
+    np.testing.assert_allclose(scores, np.take_along_axis(queries @ vectors.T, ids, axis=1), rtol=1e-5)
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+    # Probing every list is an exact scan
+    ids, _ = index.search(queries, 10, n_probe=32)
+    np.testing.assert_array_equal(ids, exact)
+
+
+def test_cosine_index_excludes_items_and_round_trips(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(500, 8)).astype(np.float32)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = IVFIndex(n_lists=10, metric="cosine").build(vectors)
+
+    query = vectors[:3]
+    exclude = [np.array([0]), np.array([1, 2]), np.array([], dtype=np.int64)]
+    ids, _ = index.search(query, 5, n_probe=10, exclude=exclude)
+    for row, skipped in zip(ids, exclude):
+        assert not np.isin(row, skipped).any()
+    cosine = (query / np.linalg.norm(query, axis=1, keepdims=True)) @ unit.T
+    for b, skipped in enumerate(exclude):
+        cosine[b, skipped] = -np.inf
+    np.testing.assert_array_equal(ids, top_n_indices(cosine, 5))
+
+    index.save(str(tmp_path))
+    loaded, _ = IVFIndex.load(str(tmp_path)).search(query, 5, n_probe=10, exclude=exclude)
+    np.testing.assert_array_equal(loaded, ids)
+
+
+def test_candidate_generator_skips_seen_items():
+    users, items, _ = random_interactions(n_users=30, n_items=200, n_ratings=900)
+    scorer = random_scorer(n_users=30, n_items=200)
+    seen = build_seen_index(users, items, 30, 200)
+    generator = ANNCandidateGenerator.build(scorer, seen, n_lists=8, n_candidates=20, n_probe=8)
+
+    candidates = generator.candidates(np.arange(30))
+    assert candidates.shape == (30, 20)
+    for user, row in enumerate(candidates):
+        assert not np.isin(row, seen[user].indices).any()
+
+
+@pytest.mark.parametrize("quantize", [None, "int8"])
+def test_bundle_serves_the_exported_ann_index(tmp_path, quantize):
+    from bundle import export_bundle, load_bundle
+
+    recommender = small_recommender(n_users=60, n_items=200)
+    embeddings = np.random.default_rng(3).normal(size=(200, 8)).astype(np.float32)
+    generator = ANNCandidateGenerator.build(recommender.scorer, recommender.seen_index, ncf_item_embeddings=embeddings,
+                                            n_lists=8, n_candidates=30, ncf_candidates=10, n_probe=3)
+    recommender.item_embeddings = embeddings
+    recommender.retriever = CandidateRetriever(recommender.scorer, generator)
+    export_bundle(str(tmp_path), recommender, quantize=quantize)
+
+    loaded = load_bundle(str(tmp_path))
+    assert loaded.manifest["ann"] == {"n_candidates": 30, "ncf_candidates": 10, "n_probe": 3, "ncf_index": True}
+    loaded_generator = loaded.retriever.generator
+    # The stored lists are memory-mapped, not re-clustered
+    assert isinstance(loaded_generator.svd_index.vectors, np.memmap)
+    assert isinstance(loaded_generator.ncf_index.ids, np.memmap)
+    np.testing.assert_array_equal(loaded_generator.svd_index.ids, generator.svd_index.ids)
+
+    users = np.arange(60)
+    if quantize is None:
+        np.testing.assert_array_equal(loaded_generator.candidates(users), generator.candidates(users))
+        np.testing.assert_array_equal(loaded.retriever.recommend_batch(users, 5)[0],
+                                      recommender.retriever.recommend_batch(users, 5)[0])
+    else:
+        items, _ = loaded.retriever.recommend_batch(users, 5)
+        assert items.shape == (60, 5) and np.all(items >= 0)
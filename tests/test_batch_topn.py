@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pytest
+
+import batch_topn
+from batch_topn import load_top_n, precompute_top_n
+from bundle import export_bundle, load_bundle
+from conftest import small_recommender
+
+JOB = {"top_n": 5, "shard_size": 16, "block_size": 7, "verbose": False}
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    root = str(tmp_path / "bundles")
+    export_bundle(root, small_recommender(), model_version="v1")
+    return root
+
+
+def test_single_pass_matches_the_retriever(bundle, tmp_path):
+    manifest = precompute_top_n(bundle, str(tmp_path / "topn"), n_workers=1, **JOB)
+    assert manifest["n_shards"] == 4 and manifest["model_version"] == "v1"
+
+    _, items, scores = load_top_n(str(tmp_path / "topn"))
+    expected_items, expected_scores = load_bundle(bundle).retriever.recommend_batch(np.arange(60), 5)
+    np.testing.assert_array_equal(items, expected_items)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+    precompute_top_n(bundle, str(tmp_path / "pooled"), n_workers=2, **JOB)
+    np.testing.assert_array_equal(load_top_n(str(tmp_path / "pooled"))[1], items)
+
+
+def test_interrupted_job_resumes_without_redoing_finished_shards(bundle, tmp_path, monkeypatch):
+    out = str(tmp_path / "topn")
+    precompute_top_n(bundle, str(tmp_path / "reference"), n_workers=1, **JOB)
+    run_shard = batch_topn._run_shard
+    done = []
+
+    def crash_after_two(*job):
+        if len(done) == 2:
+            raise KeyboardInterrupt
+        done.append(run_shard(*job))
+        return done[-1]
+
+    monkeypatch.setattr(batch_topn, "_run_shard", crash_after_two)
+    with pytest.raises(KeyboardInterrupt):
+        precompute_top_n(bundle, out, n_workers=1, **JOB)
+    with pytest.raises(ValueError, match="not finished"):
+        load_top_n(out)
+    finished = {path: os.stat(os.path.join(out, path)).st_mtime_ns
+                for path in os.listdir(out) if path.startswith("shard-")}
+    assert len(finished) == 4
+
+    resumed = []
+
+    def record(*job):
+        resumed.append(run_shard(*job))
+        return resumed[-1]
+
+    monkeypatch.setattr(batch_topn, "_run_shard", record)
+    precompute_top_n(bundle, out, n_workers=1, **JOB)
+    assert sorted(resumed) == [2, 3]
+    assert all(os.stat(os.path.join(out, path)).st_mtime_ns == mtime for path, mtime in finished.items())
+
+    _, items, scores = load_top_n(out)
+    _, ref_items, ref_scores = load_top_n(str(tmp_path / "reference"))
+    np.testing.assert_array_equal(items, ref_items)
+    np.testing.assert_array_equal(scores, ref_scores)
+
+
+def test_new_bundle_version_or_job_settings_are_refused(bundle, tmp_path):
+    out = str(tmp_path / "topn")
+    precompute_top_n(bundle, out, n_workers=1, **JOB)
+    with pytest.raises(ValueError, match="another job"):
+        precompute_top_n(bundle, out, n_workers=1, **{**JOB, "top_n": 3})
+
+    export_bundle(bundle, small_recommender(seed=1), model_version="v2")
+    with pytest.raises(ValueError, match="another job"):
+        precompute_top_n(bundle, out, n_workers=1, **JOB)
@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from bundle import load_bundle
+from conftest import ROOT
+from pipeline import Pipeline, PipelineConfig
+
+pytest.importorskip("sklearn")
+pytest.importorskip("tensorflow")
+
+
+@pytest.fixture(scope="module")
+def trained(tmp_path_factory, event_log):
+    """(in-memory Recommender, bundle root) of a small pipeline run with NCF"""
+    tmp = tmp_path_factory.mktemp("bundle")
+    config = PipelineConfig(data_path=event_log, max_rows=8_000, mf_backend="als", n_factors=8, als_iters=3,
+                            embedding_dim=8, ncf_epochs=1, ncf_batch_size=512, ranking_k=(5,),
+                            ranking_eval_max_users=50, cache_dir=str(tmp / "cache"), bundle_dir=str(tmp / "bundles"))
+    pipeline = Pipeline(config, verbose=False)
+    recommender = pipeline.recommender()
+    pipeline.export(recommender)
+    return recommender, config.bundle_dir
+
+
+def test_loaded_bundle_recommends_like_the_trained_recommender(trained):
+    recommender, bundle_dir = trained
+    loaded = load_bundle(bundle_dir)
+    assert loaded.manifest["ncf"]["folded"]
+
+    user_ids = recommender.users.classes
+    expected = recommender.recommend_with_details_batch(user_ids, 10)
+    assert loaded.recommend_with_details_batch(user_ids, 10) == expected
+    assert loaded.recommend_for_user(int(user_ids[3]), 10) == [p["product_id"] for p in expected[3]]
+
+    product_ids = [int(p) for p in recommender.items.classes[:3]]
+    assert loaded.recommend_for_session(product_ids, ["view", "cart", "view"]) == \
+        recommender.recommend_for_session(product_ids, ["view", "cart", "view"])
+    assert loaded.get_popular_products(5) == recommender.get_popular_products(5)
+    for mode in ("category", "embedding"):
+        assert loaded.recommend_similar_products(product_ids[0], 5, mode=mode) == \
+            recommender.recommend_similar_products(product_ids[0], 5, mode=mode)
+
+    users = np.arange(len(user_ids))
+    np.testing.assert_allclose(loaded.scorer.score_users(users, np.arange(5)),
+                               recommender.scorer.score_users(users, np.arange(5)), rtol=1e-6)
+
+
+def test_loading_and_serving_imports_neither_pandas_nor_tensorflow(trained):
+    recommender, bundle_dir = trained
+    script = (
+        "import json, sys\n"
+        f"sys.path.insert(0, {ROOT!r})\n"
+        "from bundle import load_bundle\n"
+        f"recommender = load_bundle({bundle_dir!r})\n"
+        f"recommender.recommend_with_details({int(recommender.users.classes[0])}, 5)\n"
+        "recommender.recommend_similar_products(int(recommender.items.classes[0]), 5, mode='embedding')\n"
+        "print(json.dumps([name for name in ('pandas', 'tensorflow', 'sklearn') if name in sys.modules]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(bundle_dir)).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == []
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog import GENERIC_BRAND, build_product_catalog
+
+
+def old_product_metadata(df):
+    """model.py's original pick: per product, sort by (has_brand, has_price) descending and take the first row"""
+    metadata = df[['product_id', 'category_code', 'brand', 'price']].copy()
+    metadata['brand'] = metadata['brand'].astype(object).fillna('Generic Brand')
+    metadata['price'] = metadata['price'].fillna(0.0)
+    metadata['category_code'] = metadata['category_code'].astype(object).fillna('electronics')
+
+    def get_best_metadata(group):
+        group = group.copy()
+        group['has_brand'] = group['brand'] != 'Generic Brand'
+        group['has_price'] = group['price'] > 0
+        group = group.sort_values(['has_brand', 'has_price'], ascending=False)
+        return group.iloc[0]
+
+    rows = [get_best_metadata(group) for _, group in metadata.groupby('product_id')]
+    return {int(row['product_id']): (row['category_code'], row['brand'], float(row['price'])) for row in rows}
+
+
+def event_frame(n_rows=3_000, seed=0):
+    """Events with duplicate products, missing brands / categories and zero / missing prices"""
+    rng = np.random.default_rng(seed)
+    brand = rng.choice(np.array(["samsung", "apple", "xiaomi", None], dtype=object), n_rows, p=[0.2, 0.2, 0.1, 0.5])
+    category = rng.choice(np.array(["electronics.smartphone", "electronics.audio.headphone", None], dtype=object),
+                          n_rows)
+    price = np.round(rng.uniform(1, 500, n_rows), 2).astype(np.float32)
+    price[rng.random(n_rows) < 0.4] = 0.0
+    price[rng.random(n_rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        "product_id": rng.integers(1_000_000, 1_000_300, n_rows),
+        "category_code": category,
+        "brand": brand,
+        "price": price,
+    })
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_catalog_matches_the_groupby_apply_pick(categorical):
+    df = event_frame()
+    if categorical:
+        # As the ingested table holds them
+        df = df.astype({"category_code": "category", "brand": "category"})
+    catalog = build_product_catalog(df)
+    expected = old_product_metadata(df)
+
+    assert catalog.product_ids.tolist() == sorted(expected)
+    for row, product_id in enumerate(catalog.product_ids):
+        category, brand, price = expected[int(product_id)]
+        assert catalog.categories[catalog.category_codes[row]] == category
+        assert catalog.brands[catalog.brand_codes[row]] == brand
+        assert catalog.prices[row] == np.float32(price)
+    assert catalog.has_brand.sum() == sum(brand != GENERIC_BRAND for _, brand, _ in expected.values())
+
+
+def test_rows_follow_the_item_encoding():
+    sklearn = pytest.importorskip("sklearn.preprocessing")
+    df = event_frame(seed=1)
+    # Encode from a shuffled copy: the classes are sorted either way
+    encoder = sklearn.LabelEncoder().fit(df["product_id"].sample(frac=1.0, random_state=0))
+    catalog = build_product_catalog(df.iloc[::-1], item_classes=encoder.classes_)
+    np.testing.assert_array_equal(catalog.product_ids, encoder.classes_)
+    codes = encoder.transform(df["product_id"])
+    np.testing.assert_array_equal(catalog.product_ids[codes], df["product_id"].to_numpy())
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from als import fold_in, fold_in_rows
+from cold_start import ColdStartEngine
+from conftest import random_scorer, small_recommender
+from ncf_numpy import NumpyNCF
+
+
+def random_ncf(n_users=60, n_items=40, dim=8, seed=0):
+    """A NumpyNCF over random NCFModel-shaped weights"""
+    rng = np.random.default_rng(seed)
+    shapes = [(n_users, dim), (n_items, dim), (2 * dim, 64), (64,), (64,), (64,), (64,), (64,),
+              (64, 32), (32,), (32, 1), (1,)]
+    weights = [rng.normal(0, 0.3, shape).astype(np.float32) for shape in shapes]
+    weights[7] = np.abs(weights[7]) + 0.5  # moving variance
+    return NumpyNCF.from_weights(weights)
+
+
+SESSIONS = [
+    (np.array([3, 7, 11]), np.array([1.0, 3.0, 1.0])),
+    (np.array([], dtype=np.int64), np.array([])),
+    (np.array([0]), np.array([5.0])),
+]
+
+
+def test_fold_in_rows_matches_fold_in_on_gathered_rows():
+    rng = np.random.default_rng(0)
+    qi, bi = rng.normal(0, 0.5, (30, 6)), rng.normal(0, 0.2, 30)
+    indptr = np.array([0, 4, 4, 5])
+    items = np.array([2, 9, 4, 20, 2])
+    ratings = np.array([1.0, 3.0, 1.0, 5.0, 3.0])
+
+    factors, biases = fold_in(indptr, items, ratings, qi, bi, 2.0, reg=0.2, reg_bias=3.0)
+    local_factors, local_biases = fold_in_rows(indptr, np.arange(5), ratings, qi[items], bi[items], 2.0,
+                                               reg=0.2, reg_bias=3.0)
+    np.testing.assert_allclose(local_factors, factors, atol=1e-10)
+    np.testing.assert_allclose(local_biases, biases, atol=1e-10)
+
+
+def test_session_vectors_are_the_ridge_fold_in_and_weighted_mean_embedding():
+    scorer = random_scorer(ncf_predict=random_ncf())
+    engine = ColdStartEngine(scorer, reg=0.1, reg_bias=5.0)
+    factors, biases, embeddings = engine.user_vectors(SESSIONS)
+
+    for row, (items, ratings) in enumerate(SESSIONS):
+        expected_factors, expected_biases = fold_in(np.array([0, len(items)]), items, ratings, scorer.qi,
+                                                    scorer.bi, scorer.global_mean)
+        np.testing.assert_allclose(factors[row], expected_factors[0], atol=1e-6)
+        assert biases[row] == pytest.approx(expected_biases[0])
+        if len(items):
+            mean = (scorer.ncf_predict.item_vectors(items) * ratings[:, None]).sum(axis=0) / ratings.sum()
+            np.testing.assert_allclose(embeddings[row], mean, rtol=1e-5)
+    assert not factors[1].any() and biases[1] == 0.0 and not embeddings[1].any()
+
+
+def test_recommendations_rank_unseen_items_by_the_folded_in_hybrid_score():
+    scorer = random_scorer(ncf_predict=random_ncf())
+    engine = ColdStartEngine(scorer, pool_size=None)
+    factors, biases, embeddings = engine.user_vectors(SESSIONS)
+    top, scores = engine.recommend_batch(SESSIONS, top_n=5)
+
+    all_items = np.arange(scorer.n_items)
+    for row, (items, _) in enumerate(SESSIONS):
+        svd = np.clip(factors[row] @ scorer.qi.T + biases[row] + scorer.bi + scorer.global_mean, 1, 5)
+        ncf = scorer.ncf_predict.predict_vectors(embeddings[row:row + 1], np.zeros(len(all_items), dtype=int),
+                                                 all_items)
+        hybrid = 0.6 * ncf + 0.4 * svd
+        hybrid[items] = -np.inf
+        expected = np.lexsort((all_items, -hybrid))[:5]
+        np.testing.assert_array_equal(top[row], expected)
+        np.testing.assert_allclose(scores[row], hybrid[expected], rtol=1e-5)
+        assert not np.isin(top[row], items).any()
+
+
+def test_without_ncf_the_ranking_follows_the_svd_score():
+    scorer = random_scorer()
+    top, _ = ColdStartEngine(scorer, pool_size=None).recommend_batch(SESSIONS[:1], top_n=4)
+    single, _ = ColdStartEngine(scorer, pool_size=None).recommend(*SESSIONS[0], top_n=4)
+    factors, biases, _ = ColdStartEngine(scorer).user_vectors(SESSIONS[:1])
+    svd = factors[0] @ scorer.qi.T + biases[0] + scorer.bi
+    svd[SESSIONS[0][0]] = -np.inf
+    np.testing.assert_array_equal(top[0], np.argsort(-svd, kind="stable")[:4])
+    np.testing.assert_array_equal(single, top[0])
+
+
+def test_recommender_serves_unknown_users_from_their_session():
+    recommender = small_recommender()
+    popular = [product["product_id"] for product in recommender.get_popular_products(5)]
+
+    session = recommender.recommend_for_user(99, 5, session=[1003, 1007], events=["view", "cart"])
+    assert len(session) == 5 and not {1003, 1007} & set(session)
+    np.testing.assert_array_equal(recommender.encode_session([1003, 1007, 424242], ["view", "cart", "view"])[0],
+                                  [3, 7])
+    with pytest.raises(ValueError):
+        recommender.encode_session([1003, 1007], ["view"])
+
+    # No session, or no product the model knows: the popular products
+    assert recommender.recommend_for_user(99, 5) == popular
+    assert recommender.recommend_for_user(99, 5, session=[424242]) == popular
+    assert recommender.recommend_for_session([1003], events=["remove_from_cart"], top_n=5) == popular
+
+    batch = recommender.recommend_with_details_batch(
+        np.array([99, 98, 97, 500]), 5, sessions=[([1003, 1007], ["view", "cart"]), None, ([424242], None), None])
+    assert [product["product_id"] for product in batch[0]] == session
+    assert [product["product_id"] for product in batch[1]] == popular
+    assert [product["product_id"] for product in batch[2]] == popular
+    assert [product["product_id"] for product in batch[3]] == recommender.recommend_for_user(500, 5)
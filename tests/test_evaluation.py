@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from evaluation import hit_matrix, pointwise_metrics, ranking_metrics, relevance_matrix
+
+
+def test_pointwise_metrics_by_hand():
+    metrics = pointwise_metrics([1.0, 3.0, 5.0, 3.0], [2.0, 3.0, 4.0, 3.25])
+    # errors: 1, 0, -1, 0.25
+    assert metrics["rmse"] == pytest.approx(np.sqrt((1 + 0 + 1 + 0.0625) / 4))
+    assert metrics["mae"] == pytest.approx(2.25 / 4)
+    assert metrics["r2"] == pytest.approx(1 - 2.0625 / 8)
+    assert metrics["within_threshold"] == pytest.approx(50.0)
+    assert metrics["percentage_accuracy"] == pytest.approx((1 - 2.25 / 16) * 100)
+
+
+def test_relevance_matrix_thresholds_and_deduplicates():
+    relevant = relevance_matrix([0, 0, 0, 1, 2], [1, 1, 3, 2, 0], 3, 4, ratings=[5, 5, 1, 3, 1], min_rating=3)
+    np.testing.assert_array_equal(relevant.toarray(), [[0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 0]])
+
+
+def test_ranking_metrics_by_hand():
+    # User 0 has relevant items {1, 3}, user 1 has {2}, user 2 has none (skipped)
+    relevant = relevance_matrix([0, 0, 1], [1, 3, 2], 3, 6)
+    recommended = np.array([
+        [1, 0, 3],    # hits at ranks 1 and 3
+        [4, 5, -1],   # no hit, padded
+        [0, 1, 2],
+    ])
+    metrics = ranking_metrics(recommended, np.arange(3), relevant, k_values=(1, 3))
+    assert metrics["users"] == 2
+
+    at1, at3 = metrics[1], metrics[3]
+    assert at1["precision"] == pytest.approx((1 + 0) / 2)
+    assert at1["recall"] == pytest.approx((0.5 + 0) / 2)
+    assert at1["ndcg"] == pytest.approx((1 + 0) / 2)
+    assert at1["map"] == pytest.approx((1 + 0) / 2)
+    assert at1["coverage"] == pytest.approx(2 / 6)
+
+    dcg = 1 + 1 / np.log2(4)
+    ideal = 1 + 1 / np.log2(3)
+    assert at3["precision"] == pytest.approx((2 / 3 + 0) / 2)
+    assert at3["recall"] == pytest.approx((1 + 0) / 2)
+    assert at3["ndcg"] == pytest.approx((dcg / ideal + 0) / 2)
+    assert at3["map"] == pytest.approx(((1 + 2 / 3) / 2 + 0) / 2)
+    assert at3["coverage"] == pytest.approx(5 / 6)
+
+
+def test_hit_matrix_ignores_padding():
+    relevant = relevance_matrix([0, 1], [0, 2], 2, 3)
+    hits = hit_matrix(np.array([[0, -1], [2, 0]]), np.array([0, 1]), relevant)
+    np.testing.assert_array_equal(hits, [[True, False], [True, False]])
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from conftest import small_recommender
+from http_service import MicroBatcher, RecommendationService
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def read_response(reader):
+    """(status, body) of one response"""
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+async def with_server(service, client):
+    server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+    service.batcher.start()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        try:
+            return await client(reader, writer)
+        finally:
+            writer.close()
+    finally:
+        await service.batcher.stop()
+        server.close()
+        await server.wait_closed()
+
+
+def test_concurrent_requests_are_scored_in_one_batch():
+    recommender = small_recommender()
+    requests = [(500 + k, 3 + k % 2, None) for k in range(6)] + [(-1, 4, ([1000, 1001], ["view", "cart"]))]
+
+    async def main():
+        batcher = MicroBatcher(recommender, max_batch=len(requests), max_wait=5.0)
+        batcher.start()
+        try:
+            return batcher, await asyncio.gather(*(batcher.recommend(*request) for request in requests))
+        finally:
+            await batcher.stop()
+
+    batcher, results = run(main())
+    assert (batcher.batches, batcher.requests) == (1, len(requests))
+    for (user_id, top_n, session), result in zip(requests, results):
+        session, events = session or (None, None)
+        assert result == recommender.recommend_with_details(user_id, top_n, session=session, events=events)
+
+
+def test_a_partial_batch_is_flushed_after_max_wait():
+    recommender = small_recommender()
+
+    async def main():
+        batcher = MicroBatcher(recommender, max_batch=64, max_wait=0.05)
+        batcher.start()
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(batcher.recommend(500, 5), batcher.recommend(501, 5))
+            elapsed = time.perf_counter() - start
+            await batcher.recommend(502, 5)
+            return batcher, results, elapsed
+        finally:
+            await batcher.stop()
+
+    batcher, results, elapsed = run(main())
+    assert 0.04 <= elapsed < 2.0
+    assert (batcher.batches, batcher.requests) == (2, 3)
+    assert results[1] == recommender.recommend_with_details(501, 5)
+
+
+def test_http_routes_answer_and_reject_bad_parameters():
+    recommender = small_recommender()
+    service = RecommendationService(recommender, max_wait=0.001)
+
+    async def client(reader, writer):
+        responses = {}
+        for target in ["/recommendations?user_id=500&top_n=3", "/recommendations?top_n=3",
+                       "/recommendations?user_id=500&top_n=abc", "/recommendations?user_id=500&top_n=0",
+                       "/recommendations?user_id=9&session=1000,x",
+                       "/recommendations?user_id=9&session=1000&events=buy",
+                       "/similar?product_id=1000&mode=other", "/nowhere"]:
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+            responses[target] = await read_response(reader)
+        return responses
+
+    responses = run(with_server(service, client))
+    assert responses["/recommendations?user_id=500&top_n=3"] == (
+        200, {"result": recommender.recommend_with_details(500, 3)})
+    assert responses["/nowhere"][0] == 404
+    bad = {target: body["error"] for target, (status, body) in responses.items() if status == 400}
+    assert set(bad) == set(responses) - {"/recommendations?user_id=500&top_n=3", "/nowhere"}
+    assert "missing parameter 'user_id'" in bad["/recommendations?top_n=3"]
+    assert "must be at least 1" in bad["/recommendations?user_id=500&top_n=0"]
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_malformed_content_length_is_rejected_and_closes_the_connection(length):
+    service = RecommendationService(small_recommender())
+
+    async def client(reader, writer):
+        writer.write(f"GET /health HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+        response = await read_response(reader)
+        return response, await reader.read()
+
+    (status, body), rest = run(with_server(service, client))
+    assert status == 400 and "Content-Length" in body["error"]
+    assert rest == b""
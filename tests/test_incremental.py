@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from als import fold_in
+from conftest import small_recommender
+from incremental import IncrementalUpdater, _in_csr_rows
+from retrieval import build_seen_index
+
+
+def ridge_solution(ratings, factors, biases, global_mean, reg, reg_bias):
+    """[p, b] from the normal equations of one row, written out directly"""
+    X = np.hstack([factors, np.ones((len(factors), 1))])
+    y = ratings - global_mean - biases
+    penalty = np.append(np.full(factors.shape[1], reg * len(ratings)), reg_bias)
+    return np.linalg.solve(X.T @ X + np.diag(penalty), X.T @ y)
+
+
+@pytest.mark.parametrize("n_rated", [1, 3, 12])
+def test_fold_in_solves_the_ridge_problem(n_rated):
+    # Fewer ratings than factors takes the dual path, more takes the primal one
+    rng = np.random.default_rng(n_rated)
+    qi, bi = rng.normal(0, 0.5, (30, 6)), rng.normal(0, 0.2, 30)
+    rated = rng.choice(30, n_rated, replace=False)
+    ratings = rng.choice([1.0, 3.0, 5.0], n_rated)
+    indptr = np.array([0, 0, n_rated])
+
+    factors, biases = fold_in(indptr, rated, ratings, qi, bi, 2.0, reg=0.1, reg_bias=5.0)
+    np.testing.assert_allclose(np.append(factors[1], biases[1]),
+                               ridge_solution(ratings, qi[rated], bi[rated], 2.0, 0.1, 5.0), atol=1e-10)
+    # A row without ratings stays at zero
+    assert not factors[0].any() and biases[0] == 0.0
+
+
+def test_in_csr_rows_matches_a_dense_lookup():
+    rng = np.random.default_rng(0)
+    users, items = rng.integers(0, 20, 150), rng.integers(0, 30, 150)
+    seen = build_seen_index(users, items, 21, 30)
+    rows, columns = rng.integers(0, 21, 500), rng.integers(0, 30, 500)
+    np.testing.assert_array_equal(_in_csr_rows(seen, rows, columns), seen.toarray()[rows, columns] > 0)
+    assert _in_csr_rows(seen, rows[:0], columns[:0]).shape == (0,)
+
+
+def test_update_adds_new_pairs_and_folds_in_users_and_items():
+    pytest.importorskip("tensorflow")
+    recommender = small_recommender()
+    updater = IncrementalUpdater(recommender, verbose=False)
+    seen_items = recommender.interactions.history(0)[0]
+    old_pair = (500, 1000 + int(seen_items[0]))
+    events = {
+        "user_id": np.array([old_pair[0], 9001, 9001, 9001, 9001, 7]),
+        "product_id": np.array([old_pair[1], 1001, 1002, 1001, 7777, 1003]),
+        "event_type": np.array(["purchase", "view", "cart", "purchase", "cart", "view"]),
+        "category_code": np.array([None, None, None, None, "electronics.tablet", None], dtype=object),
+        "brand": np.array([None, None, None, None, "lenovo", None], dtype=object),
+        "price": np.array([0, 0, 0, 0, 199.0, 0]),
+        "timestamp": np.arange(6) + 1_572_566_400,
+    }
+    summary = updater.update(events)
+
+    # The already-seen pair and the repeated (9001, 1001) event are dropped;
+    # user 7 is not a known id, so it becomes a new user as well
+    assert summary["new_pairs"] == 4
+    assert (summary["new_users"], summary["new_items"]) == (2, 1)
+    assert not summary["ncf_updated"]
+
+    user = recommender.users.index_of(9001)
+    items, ratings = recommender.interactions.history(user)
+    assert sorted(recommender.items.ids_of(items).tolist()) == [1001, 1002, 7777]
+    assert sorted(ratings.tolist()) == [1.0, 3.0, 3.0]
+    assert recommender.get_product_info(7777)["brand"] == "lenovo"
+
+    # The new user's factors are the ridge fit against the (updated) item side
+    scorer = recommender.scorer
+    expected = ridge_solution(ratings.astype(np.float64), scorer.qi[items], scorer.bi[items],
+                              scorer.global_mean, updater.reg, updater.reg_bias)
+    np.testing.assert_allclose(np.append(scorer.pu[user], scorer.bu[user]), expected, atol=1e-8)
+    assert not set(recommender.recommend_for_user(9001, 10)) & {1001, 1002, 7777}
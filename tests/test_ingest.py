@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import EVENT_COLUMNS, EVENT_DTYPES, PairDeduper, clean_chunk, load_interactions
+
+
+def single_shot(path, max_rows=None):
+    """The whole log read at once, cleaned, and deduplicated by pandas"""
+    events = pd.read_csv(path, usecols=EVENT_COLUMNS, dtype=EVENT_DTYPES, nrows=max_rows)
+    return clean_chunk(events).drop_duplicates(["user_id", "product_id"]).reset_index(drop=True)
+
+
+def assert_same_table(actual, expected):
+    """Same rows, order and values; categorical vocabularies may differ"""
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_categorical=False)
+
+
+@pytest.mark.parametrize("chunksize", [1_000, 6_999, 50_000])
+def test_streamed_ingest_matches_single_shot_dedupe(event_log, chunksize):
+    table = load_interactions(event_log, chunksize=chunksize, verbose=False)
+    assert_same_table(table, single_shot(event_log))
+    assert not table.duplicated(["user_id", "product_id"]).any()
+
+
+def test_max_rows_limits_the_rows_read(event_log):
+    assert_same_table(load_interactions(event_log, chunksize=3_000, max_rows=8_000, verbose=False),
+                      single_shot(event_log, max_rows=8_000))
+
+
+def test_clean_chunk_filters_rates_and_timestamps():
+    chunk = pd.DataFrame({
+        "event_time": ["2019-11-01 00:00:00 UTC", "2019-11-01 00:00:10 UTC", "2019-11-02 00:00:00 UTC",
+                       "2019-11-03 00:00:00 UTC", None],
+        "user_id": [1, 1, 2, 3, 4],
+        "product_id": [10, 11, 10, 12, 13],
+        "category_code": ["electronics.smartphone", "apparel.shoes", "computers.notebook",
+                          "electronics.audio.headphone", "electronics.tablet"],
+        "brand": ["apple", "nike", None, "sony", "lenovo"],
+        "price": np.array([1.0, 2.0, 3.0, 4.0, 5.0], dtype=np.float32),
+        "event_type": ["view", "purchase", "cart", "remove_from_cart", "view"],
+    })
+    cleaned = clean_chunk(chunk)
+    # Shoes are not electronics, remove_from_cart has no rating, the last row has no time
+    assert cleaned["product_id"].tolist() == [10, 10]
+    assert cleaned["rating"].tolist() == [1.0, 3.0]
+    assert cleaned["timestamp"].tolist() == [1572566400, 1572652800]
+
+
+def test_pair_deduper_keeps_first_occurrences_across_chunks():
+    deduper = PairDeduper()
+    first = deduper.first_occurrences([1, 1, 2, 1], [5, 5, 5, 6])
+    second = deduper.first_occurrences([2, 3, 1, 3], [5, 5, 7, 5])
+    assert first.tolist() == [True, False, True, True]
+    assert second.tolist() == [False, True, True, False]
+    with pytest.raises(ValueError):
+        PairDeduper.pack([2 ** 31], [1])
+
+
+def test_pair_deduper_matches_a_single_pass_over_random_chunks():
+    rng = np.random.default_rng(4)
+    users, products = rng.integers(0, 50, 5_000), rng.integers(0, 80, 5_000)
+    deduper = PairDeduper()
+    masks = [deduper.first_occurrences(users[start:start + 700], products[start:start + 700])
+             for start in range(0, 5_000, 700)]
+
+    expected = ~pd.DataFrame({"u": users, "p": products}).duplicated().to_numpy()
+    np.testing.assert_array_equal(np.concatenate(masks), expected)
+    # The seen keys stay sorted and distinct
+    np.testing.assert_array_equal(deduper._seen, np.unique(PairDeduper.pack(users, products)))
@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import numpy as np
+
+from interaction_cache import interaction_cache_key, load_interaction_cache, save_interaction_cache
+from pipeline import Pipeline, PipelineConfig
+
+FILTERS = {"keywords": ["electronics"], "rating_map": {"view": 1, "cart": 3, "purchase": 5}, "max_rows": None}
+
+
+def test_key_follows_source_contents_and_filter_config(tmp_path):
+    source = tmp_path / "events.csv"
+    source.write_text("a,b\n1,2\n")
+    memo = str(tmp_path / "hashes.json")
+    key = interaction_cache_key(str(source), FILTERS, memo_path=memo)
+    assert interaction_cache_key(str(source), dict(FILTERS), memo_path=memo) == key
+    assert interaction_cache_key(str(source), {**FILTERS, "max_rows": 10}, memo_path=memo) != key
+    assert interaction_cache_key(str(source), {**FILTERS, "keywords": ["audio"]}, memo_path=memo) != key
+
+    source.write_text("a,b\n1,3\n")
+    assert interaction_cache_key(str(source), FILTERS, memo_path=memo) != key
+
+
+def test_save_and_memory_mapped_load(tmp_path):
+    directory = str(tmp_path / "key")
+    assert load_interaction_cache(directory) is None
+
+    arrays = {"user_id": np.array([5, 7, 5]), "rating": np.array([1.0, 3.0, 5.0], dtype=np.float32)}
+    save_interaction_cache(directory, arrays, {"rows": 3})
+    assert not os.path.exists(directory + ".tmp")
+    loaded, meta = load_interaction_cache(directory)
+    assert meta == {"rows": 3}
+    assert isinstance(loaded["user_id"], np.memmap)
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(loaded[name], array)
+        assert loaded[name].dtype == array.dtype
+
+
+def test_pipeline_ingest_warm_start_and_misses(tmp_path, event_log):
+    source = str(tmp_path / "events.csv")
+    shutil.copy(event_log, source)
+    config = PipelineConfig(data_path=source, max_rows=5_000, chunksize=2_000, cache_dir=str(tmp_path / "cache"))
+
+    cold = Pipeline(config, verbose=False).artifacts("ingest")
+    assert not cold.cached
+
+    warm = Pipeline(config, verbose=False).artifacts("ingest")
+    assert warm.cached and warm.fingerprint == cold.fingerprint
+    assert isinstance(warm["user_id"], np.memmap)
+    for name in cold.arrays:
+        np.testing.assert_array_equal(warm[name], cold[name])
+    assert warm.meta == cold.meta
+
+    # Another filter setting or another source file is a miss
+    assert not Pipeline(config.replace(max_rows=4_000), verbose=False).is_cached("ingest")
+    assert not Pipeline(config.replace(keywords=["audio"]), verbose=False).is_cached("ingest")
+    with open(event_log) as f:
+        row = f.readlines()[1]
+    with open(source, "a") as f:
+        f.write(row)
+    assert not Pipeline(config, verbose=False).is_cached("ingest")
@@ -0,0 +1,78 @@
+import numpy as np
+
+from conftest import random_interactions
+from interaction_store import InteractionStore
+
+
+def dense(users, items, ratings, shape):
+    matrix = np.zeros(shape, dtype=np.float32)
+    matrix[users, items] = ratings
+    return matrix
+
+
+def store_and_reference():
+    users, items, ratings = random_interactions()
+    return InteractionStore(users, items, ratings, 60, 40), dense(users, items, ratings, (60, 40))
+
+
+def test_csr_and_csc_hold_the_same_ratings():
+    store, reference = store_and_reference()
+    np.testing.assert_array_equal(store.csr.toarray(), reference)
+    np.testing.assert_array_equal(store.csc.toarray(), reference)
+    assert store.csr.has_sorted_indices and store.csc.has_sorted_indices
+    assert store.csr.dtype == np.float32
+
+
+def test_history_item_users_and_degrees():
+    store, reference = store_and_reference()
+    for user in (0, 17, 59):
+        items, ratings = store.history(user)
+        np.testing.assert_array_equal(items, np.flatnonzero(reference[user]))
+        np.testing.assert_array_equal(ratings, reference[user, items])
+    for item in (0, 21, 39):
+        users, ratings = store.item_users(item)
+        np.testing.assert_array_equal(users, np.flatnonzero(reference[:, item]))
+        np.testing.assert_array_equal(ratings, reference[users, item])
+
+    np.testing.assert_array_equal(store.user_degrees(), (reference > 0).sum(axis=1))
+    expected = (reference > 0).sum(axis=0)
+    np.testing.assert_array_equal(store.item_degrees(), expected)
+    # Once the CSC exists the degrees come from its index pointers
+    assert store.csc.nnz == len(store)
+    np.testing.assert_array_equal(store.item_degrees(), expected)
+
+
+def test_relevance_keeps_ratings_at_or_above_the_threshold():
+    store, reference = store_and_reference()
+    np.testing.assert_array_equal(store.relevance().toarray(), (reference > 0).astype(np.int8))
+    np.testing.assert_array_equal(store.relevance(min_rating=3).toarray(), (reference >= 3).astype(np.int8))
+    assert store.relevance().dtype == np.int8
+
+
+def test_take_split_and_add_follow_table_rows():
+    users, items, ratings = random_interactions()
+    store = InteractionStore(users, items, ratings, 60, 40)
+    rows = np.random.default_rng(0).permutation(len(store))
+    train, test = store.split(rows[:400], rows[400:])
+    for part, selected in ((train, rows[:400]), (test, rows[400:])):
+        np.testing.assert_array_equal(part.users, users[selected])
+        np.testing.assert_array_equal(part.items, items[selected])
+        np.testing.assert_array_equal(part.csr.toarray(), dense(users[selected], items[selected],
+                                                                ratings[selected], (60, 40)))
+    np.testing.assert_array_equal(train.csr.toarray() + test.csr.toarray(), store.csr.toarray())
+
+    grown = store.add([60, 0], [40, 41], [5.0, 3.0], 61, 42)
+    assert grown.shape == (61, 42) and len(grown) == len(store) + 2
+    expected = np.zeros((61, 42), dtype=np.float32)
+    expected[:60, :40] = store.csr.toarray()
+    expected[60, 40], expected[0, 41] = 5.0, 3.0
+    np.testing.assert_array_equal(grown.csr.toarray(), expected)
+
+
+def test_store_from_csr_exposes_entries_in_csr_order():
+    store, reference = store_and_reference()
+    loaded = InteractionStore.from_csr(store.csr)
+    assert len(loaded) == len(store) and loaded.shape == store.shape
+    np.testing.assert_array_equal(dense(loaded.users, loaded.items, loaded.ratings, (60, 40)), reference)
+    assert np.all(np.diff(loaded.users) >= 0)
+    np.testing.assert_array_equal(loaded.csc.toarray(), reference)
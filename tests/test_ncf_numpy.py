@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from ncf_numpy import NumpyNCF, fold_ncf_weights
+from quantization import QuantizedMatrix
+
+tf = pytest.importorskip("tensorflow")
+
+
+@pytest.fixture(scope="module")
+def keras_model():
+    from ncf import NCFModel
+
+    model = NCFModel(50, 30, embedding_dim=8)
+    model({"user": tf.constant([0]), "item": tf.constant([0])}, training=False)
+    # Non-trivial BatchNorm statistics, including negative scales
+    rng = np.random.default_rng(0)
+    weights = model.get_weights()
+    weights[0] = rng.normal(0, 0.5, weights[0].shape).astype(np.float32)
+    weights[1] = rng.normal(0, 0.5, weights[1].shape).astype(np.float32)
+    weights[4] = rng.uniform(-1.5, 1.5, weights[4].shape).astype(np.float32)
+    weights[5] = rng.normal(0, 0.3, weights[5].shape).astype(np.float32)
+    weights[6] = rng.normal(0, 0.3, weights[6].shape).astype(np.float32)
+    weights[7] = rng.uniform(0.2, 2.0, weights[7].shape).astype(np.float32)
+    model.set_weights(weights)
+    return model
+
+
+def keras_predict(model, users, items):
+    from ncf import safe_predict
+    return safe_predict(model, users, items)
+
+
+def test_folded_forward_pass_matches_keras(keras_model):
+    ncf = NumpyNCF.from_model(keras_model)
+    users = np.repeat(np.arange(50), 30)
+    items = np.tile(np.arange(30), 50)
+    np.testing.assert_allclose(ncf.predict(users, items), keras_predict(keras_model, users, items),
+                               rtol=1e-4, atol=1e-5)
+    assert ncf.model is keras_model
+
+
+def test_predict_vectors_with_explicit_user_embeddings(keras_model):
+    ncf = NumpyNCF.from_model(keras_model)
+    users = np.array([3, 3, 7, 11])
+    items = np.array([0, 29, 4, 4])
+    vectors = keras_model.get_weights()[0][[3, 7, 11]]
+    np.testing.assert_allclose(ncf.predict_vectors(vectors, [0, 0, 1, 2], items), ncf.predict(users, items),
+                               rtol=1e-6)
+    np.testing.assert_array_equal(ncf.item_vectors([2, 5]), keras_model.get_weights()[1][[2, 5]])
+
+
+def test_folding_is_exact_for_the_dense_layers(keras_model):
+    weights = keras_model.get_weights()
+    _, _, folded = fold_ncf_weights(weights, epsilon=1e-3)
+    hidden = np.random.default_rng(1).uniform(0, 2, (5, 64))
+    gamma, beta, mean, var, w2, b2 = weights[4:10]
+    normalized = (hidden - mean) / np.sqrt(var + 1e-3) * gamma + beta
+    np.testing.assert_allclose(hidden @ folded["dense2_kernel"] + folded["dense2_bias"], normalized @ w2 + b2,
+                               rtol=1e-5, atol=1e-5)
+
+
+def test_quantized_embeddings_stay_close(keras_model):
+    ncf = NumpyNCF.from_model(keras_model)
+    weights = keras_model.get_weights()
+    tables = [QuantizedMatrix.from_array(weights[0]), QuantizedMatrix.from_array(weights[1])]
+    quantized = NumpyNCF.from_weights(tables + weights[2:])
+    users = np.repeat(np.arange(50), 30)
+    items = np.tile(np.arange(30), 50)
+    np.testing.assert_allclose(quantized.predict(users, items), ncf.predict(users, items), atol=0.05)
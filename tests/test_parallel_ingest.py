@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from instrumentation import PipelineProfiler
+from parallel_ingest import byte_ranges, load_interactions_parallel
+from test_ingest import assert_same_table, single_shot
+
+
+@pytest.mark.parametrize("n_workers, range_bytes", [(2, 50_000), (3, 10 ** 9)])
+def test_parallel_ingest_matches_single_shot_dedupe(event_log, n_workers, range_bytes):
+    table, vocabularies = load_interactions_parallel(event_log, n_workers=n_workers, range_bytes=range_bytes,
+                                                     verbose=False)
+    expected = single_shot(event_log)
+    assert_same_table(table, expected)
+    np.testing.assert_array_equal(vocabularies["user_id"], np.unique(expected["user_id"]))
+    np.testing.assert_array_equal(vocabularies["product_id"], np.unique(expected["product_id"]))
+
+
+def test_parallel_ingest_max_rows_and_profile(event_log):
+    profiler = PipelineProfiler()
+    table, _ = load_interactions_parallel(event_log, n_workers=2, max_rows=8_000, range_bytes=40_000,
+                                          verbose=False, profiler=profiler)
+    assert_same_table(table, single_shot(event_log, max_rows=8_000))
+    assert {"load", "filter", "dedupe"} <= set(profiler.stages)
+
+
+def test_byte_ranges_cover_the_data_at_line_boundaries(event_log):
+    header, ranges = byte_ranges(event_log, range_bytes=30_000)
+    with open(event_log, "rb") as f:
+        data = f.read()
+    assert header == data[:data.index(b"\n")].decode().split(",")
+    assert ranges[0][0] == data.index(b"\n") + 1 and ranges[-1][1] == len(data)
+    for (_, stop), (start, _) in zip(ranges, ranges[1:]):
+        assert stop == start and data[stop - 1:stop] == b"\n"
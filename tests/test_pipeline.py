@@ -0,0 +1,79 @@
+import shutil
+
+import pytest
+
+from pipeline import STAGES, Pipeline, PipelineConfig, main
+
+pytest.importorskip("sklearn")
+
+
+@pytest.fixture
+def config(tmp_path, event_log):
+    # A private copy of the log, so a test can change it
+    source = str(tmp_path / "events.csv")
+    shutil.copy(event_log, source)
+    return PipelineConfig(data_path=source, max_rows=8_000, chunksize=3_000, mf_backend="als", n_factors=4,
+                          als_iters=2, ncf_epochs=0, ranking_k=(5,), ranking_eval_max_users=50,
+                          cache_dir=str(tmp_path / "cache"))
+
+
+def run(config, force=()):
+    """stage -> whether it came from the cache"""
+    pipeline = Pipeline(config, force=force, verbose=False)
+    return {stage: artifacts.cached for stage, artifacts in pipeline.run().items()}
+
+
+def recomputed(result):
+    return {stage for stage, cached in result.items() if not cached}
+
+
+def test_second_run_loads_every_stage_from_the_cache(config):
+    assert recomputed(run(config)) == set(STAGES)
+    assert recomputed(run(config)) == set()
+
+
+@pytest.mark.parametrize("changes, stages", [
+    ({"n_factors": 6}, {"train_svd", "evaluate"}),
+    ({"ranking_k": (3,)}, {"evaluate"}),
+    ({"popularity_half_life": 3600.0}, {"build_metadata"}),
+    ({"split_seed": 1}, {"encode", "train_svd", "train_ncf", "evaluate", "build_metadata"}),
+    ({"max_rows": 7_000}, set(STAGES)),
+])
+def test_changed_stage_config_reruns_the_stage_and_its_dependents(config, changes, stages):
+    run(config)
+    assert recomputed(run(config.replace(**changes))) == stages
+
+
+def test_settings_outside_the_stage_config_keep_the_cache(config, tmp_path):
+    run(config)
+    unrelated = config.replace(chunksize=1_000, ingest_workers=2, use_ann_candidates=True, ann_n_probe=2,
+                               quantize="int8", bundle_dir=str(tmp_path / "bundles"))
+    assert recomputed(run(unrelated)) == set()
+    assert Pipeline(unrelated, verbose=False).status() == Pipeline(config, verbose=False).status()
+
+
+def test_changed_source_file_invalidates_ingest(config):
+    run(config)
+    with open(config.data_path) as f:
+        rows = f.readlines()
+    # One more event inside the max_rows window
+    with open(config.data_path, "w") as f:
+        f.writelines(rows[:2] + rows[1:])
+    assert recomputed(run(config)) == set(STAGES)
+
+
+def test_force_reruns_named_stages_only(config):
+    run(config)
+    assert recomputed(run(config, force=["train_svd"])) == {"train_svd"}
+
+
+@pytest.mark.parametrize("stages, expected", [([], set(STAGES)), (["encode"], {"encode"})])
+def test_force_flag_of_the_cli(config, capsys, stages, expected):
+    arguments = [f"--set=data_path={config.data_path}", "--set=max_rows=8000", "--set=chunksize=3000",
+                 "--set=mf_backend=als", "--set=n_factors=4", "--set=als_iters=2", "--set=ncf_epochs=0",
+                 "--set=ranking_k=[5]", "--set=ranking_eval_max_users=50", f"--set=cache_dir={config.cache_dir}"]
+    main(stages + arguments)
+    capsys.readouterr()
+    main(stages + arguments + ["--force"])
+    output = capsys.readouterr().out
+    assert {stage for stage in STAGES if f"▶️ {stage} (" in output} == expected
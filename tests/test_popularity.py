@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from popularity import PopularityStore
+
+
+def test_decayed_scores_match_the_closed_form_across_a_rebase():
+    rng = np.random.default_rng(0)
+    half_life = 100.0
+    times = np.sort(rng.uniform(0, 60_000, 3_000))
+    items = rng.integers(0, 30, len(times))
+    weights = rng.choice([1.0, 3.0, 5.0], len(times))
+
+    store = PopularityStore(30, half_life=half_life)
+    for chunk in np.array_split(np.arange(len(times)), 6):
+        store.update(items[chunk], times[chunk], weights[chunk])
+    # Exponents reached 600 > 512, so t_ref was moved forward at least once
+    assert store.t_ref > times[0]
+
+    expected = np.bincount(items, weights * np.exp2((times - store.t_ref) / half_life), minlength=30)
+    np.testing.assert_allclose(store.decayed, expected, rtol=1e-9)
+    np.testing.assert_array_equal(store.counts, np.bincount(items, weights, minlength=30))
+    np.testing.assert_array_equal(store.top_n(10, decayed=True), np.lexsort((np.arange(30), -expected))[:10])
+
+
+def test_update_drops_only_the_rankings_of_touched_categories():
+    rng = np.random.default_rng(1)
+    categories = np.repeat([0, 1, 2], 20)
+    items = rng.integers(0, 60, 500)
+    store = PopularityStore.from_interactions(items, 60, categories=categories)
+    before = {category: store.top_n(5, category=category) for category in (None, 0, 1, 2)}
+    kept = {key: store._rankings[key] for key in ((False, 1), (False, 2))}
+
+    new_items = np.array([3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 7])  # category 0 only
+    store.update(new_items)
+    assert set(store._rankings) == {(False, 1), (False, 2)}
+    assert all(store._rankings[key] is ranking for key, ranking in kept.items())
+
+    fresh = PopularityStore.from_interactions(np.concatenate([items, new_items]), 60, categories=categories)
+    for category in (None, 0, 1, 2):
+        np.testing.assert_array_equal(store.top_n(5, category=category), fresh.top_n(5, category=category))
+    np.testing.assert_array_equal(store.top_n(5, category=1), before[1])
+    np.testing.assert_array_equal(store.top_n(5, category=2), before[2])
+    assert store.top_n(1, category=0)[0] == 3
+
+
+def test_top_n_validates_its_arguments():
+    store = PopularityStore.from_interactions([0, 1, 1], 3)
+    with pytest.raises(ValueError, match="top_n must be positive"):
+        store.top_n(0)
+    with pytest.raises(ValueError, match="half_life"):
+        store.top_n(2, decayed=True)
+    np.testing.assert_array_equal(store.top_n(5), [1, 0])
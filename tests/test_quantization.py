@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+import pytest
+from conftest import random_scorer, small_recommender
+
+from quantization import QuantizedHybridScorer, QuantizedMatrix, drift_report
+from scoring import HybridScorer
+
+
+def random_matrix(n_rows=200, n_cols=16, seed=0):
+    rng = np.random.default_rng(seed)
+    # Rows of very different magnitudes, plus an all-zero row
+    matrix = rng.normal(0, 1, (n_rows, n_cols)) * rng.uniform(0.01, 10, (n_rows, 1))
+    matrix[7] = 0.0
+    return matrix.astype(np.float32)
+
+
+def quantized_scorer(scorer, dtype="int8"):
+    return QuantizedHybridScorer(QuantizedMatrix.from_array(scorer.pu, dtype),
+                                 QuantizedMatrix.from_array(scorer.qi, dtype),
+                                 scorer.bu, scorer.bi, scorer.global_mean)
+
+
+def test_int8_round_trip_within_half_a_step():
+    matrix = random_matrix()
+    quantized = QuantizedMatrix.from_array(matrix, "int8")
+    assert quantized.values.dtype == np.int8
+    nonzero = np.arange(len(matrix)) != 7
+    np.testing.assert_allclose(quantized.scales[nonzero], np.abs(matrix[nonzero]).max(axis=1) / 127, rtol=1e-6)
+    error = np.abs(quantized.dequantize() - matrix)
+    assert np.all(error <= quantized.scales[:, None] / 2 * (1 + 1e-5) + 1e-7)
+    assert np.all(quantized.dequantize()[7] == 0.0)
+    assert quantized.nbytes == matrix.size + 4 * len(matrix)
+
+
+def test_float16_round_trip():
+    matrix = random_matrix()
+    quantized = QuantizedMatrix.from_array(matrix, "float16")
+    assert quantized.scales is None
+    np.testing.assert_allclose(quantized.dequantize(), matrix, rtol=2 ** -11, atol=1e-7)
+
+
+def test_rows_and_blockwise_dot_match_the_dequantized_matrix():
+    quantized = QuantizedMatrix.from_array(random_matrix(), "int8")
+    dense = quantized.dequantize()
+    np.testing.assert_array_equal(quantized.rows([3, 3, 150]), dense[[3, 3, 150]])
+    left = np.random.default_rng(1).normal(0, 1, (5, 16)).astype(np.float32)
+    np.testing.assert_allclose(quantized.dot_t(left, block_rows=37), left @ dense.T, rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize("dtype", ["int8", "float16"])
+def test_quantized_scorer_matches_float_scorer(dtype):
+    scorer = random_scorer()
+    quantized = quantized_scorer(scorer, dtype)
+    # Exactly the float scorer over the dequantized tables ...
+    reference = HybridScorer(quantized.pu_q.dequantize(), quantized.qi_q.dequantize(),
+                             scorer.bu, scorer.bi, scorer.global_mean)
+    users = np.array([0, 5, 5, 59])
+    items = np.array([[0, 1, 2], [39, 3, 3], [7, 8, 9], [0, 0, 10]])
+    np.testing.assert_allclose(quantized.svd_scores_all(users), reference.svd_scores_all(users), rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(quantized.score_users(users, items), reference.score_users(users, items),
+                               rtol=1e-5, atol=1e-5)
+    # ... and close to the original float32 factors
+    atol = 0.05 if dtype == "int8" else 0.005
+    np.testing.assert_allclose(quantized.svd_scores_all(users), scorer.svd_scores_all(users), atol=atol)
+    assert quantized.pu_q.nbytes < scorer.pu.astype(np.float32).nbytes
+
+
+def test_drift_report():
+    baseline = small_recommender()
+    report = drift_report(baseline, small_recommender(), n_users=30, top_n=5)
+    assert report["users"] == 30 and report["top_n"] == 5
+    assert report["svd_abs_error"] == {"mean": 0.0, "max": 0.0}
+    assert report["hybrid_abs_error"] == {"mean": 0.0, "max": 0.0}
+    assert report["top_n_overlap"] == 1.0 and report["top_n_identical"] == 1.0
+
+    quantized = small_recommender()
+    quantized.scorer = quantized_scorer(baseline.scorer)
+    quantized.retriever.scorer = quantized.scorer
+    report = drift_report(baseline, quantized, n_users=1000, top_n=5)
+    assert report["users"] == 60
+    assert 0.0 < report["svd_abs_error"]["mean"] <= report["svd_abs_error"]["max"] < 0.05
+    assert report["hybrid_abs_error"]["max"] < 0.05
+    assert 0.8 <= report["top_n_overlap"] <= 1.0
+    assert report["top_n_identical"] <= report["top_n_overlap"]
+
+
+@pytest.mark.parametrize("quantize", [None, "int8"])
+def test_bundle_stores_the_ncf_item_projection_once(tmp_path, quantize):
+    tf = pytest.importorskip("tensorflow")
+    from bundle import export_bundle, load_bundle
+    from ncf import NCFModel
+    from ncf_numpy import NumpyNCF
+
+    model = NCFModel(60, 40, embedding_dim=8)
+    model({"user": tf.constant([0]), "item": tf.constant([0])}, training=False)
+    recommender = small_recommender()
+    reference = NumpyNCF.from_model(model)
+    recommender.scorer.ncf_predict = reference
+    recommender.item_embeddings = reference.item_embedding
+
+    path = export_bundle(str(tmp_path), recommender, ncf_model=model, quantize=quantize)
+    assert os.path.exists(os.path.join(path, "ncf_item_projection.npy"))
+    assert not os.path.exists(os.path.join(path, "ncf_item_embeddings.npy"))
+
+    loaded = load_bundle(str(tmp_path))
+    ncf = loaded.scorer.ncf_predict
+    # The similarity table is the NCF item table, and the projection is read, not rebuilt
+    assert loaded.item_embeddings is ncf.item_embedding
+    assert ncf._item_projection is not None
+    if quantize is None:
+        assert isinstance(ncf.item_projection, np.memmap)
+        np.testing.assert_array_equal(ncf.item_projection, reference.item_projection)
+    else:
+        assert isinstance(ncf.item_projection, QuantizedMatrix)
+        assert "ncf_item_projection" in loaded.manifest["quantization"]["arrays"]
+
+    users = np.repeat(np.arange(60), 40)
+    items = np.tile(np.arange(40), 60)
+    np.testing.assert_allclose(ncf.predict(users, items), reference.predict(users, items),
+                               atol=1e-5 if quantize is None else 0.05)
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from conftest import small_recommender
+from result_cache import RecommendationCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = RecommendationCache(max_entries=2, ttl=None)
+    cache.put(1, 5, "a")
+    cache.put(2, 5, "b")
+    assert cache.get(1, 5) == "a"  # 1 is now the most recent
+    cache.put(3, 5, "c")
+    assert cache.get(2, 5) is None
+    assert (cache.get(1, 5), cache.get(3, 5)) == ("a", "c")
+    assert cache.evictions == 1 and len(cache) == 2
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = RecommendationCache(ttl=10.0, clock=clock)
+    cache.put(1, 5, "a")
+    clock.now = 10.0
+    assert cache.get(1, 5) == "a"
+    clock.now = 10.5
+    assert cache.get(1, 5) is None
+    assert cache.expirations == 1 and len(cache) == 0
+
+
+def test_top_n_and_user_invalidation():
+    cache = RecommendationCache()
+    cache.put(1, 5, "five")
+    cache.put(1, 10, "ten")
+    cache.put(2, 5, "other")
+    assert cache.get(1, 10) == "ten"
+    assert cache.invalidate_user(1) == 2
+    assert cache.get(1, 5) is None and cache.get(1, 10) is None
+    assert cache.get(2, 5) == "other"
+    assert cache.invalidate_user(1) == 0
+
+
+def test_model_version_change_drops_everything():
+    cache = RecommendationCache()
+    cache.set_model_version("v1")
+    cache.put(1, 5, "a")
+    cache.set_model_version("v1")
+    assert cache.get(1, 5) == "a"
+    cache.set_model_version("v2")
+    assert cache.get(1, 5) is None and len(cache) == 0
+    assert cache.invalidations == 1
+
+
+def test_get_or_compute_counts_hits_and_misses():
+    cache = RecommendationCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_compute(1, 5, compute) == "value"
+    assert cache.get_or_compute(1, 5, compute) == "value"
+    stats = cache.stats()
+    assert len(calls) == 1
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_recommender_serves_cached_copies_and_invalidates_users():
+    recommender = small_recommender(cache=RecommendationCache())
+    first = recommender.recommend_with_details(500, 5)
+    first[0]["product_name"] = "changed"
+    again = recommender.recommend_with_details(500, 5)
+    assert again[0]["product_name"] != "changed"
+    assert recommender.cache.hits == 1
+
+    batch = recommender.recommend_with_details_batch(np.array([500, 501]), 5)
+    assert batch[0] == again
+    assert recommender.cache.hits == 2
+
+    recommender.invalidate_users([0])
+    assert recommender.cache.get(0, 5) is None and recommender.cache.get(1, 5) is not None
+
+
+@pytest.mark.parametrize("call", [
+    lambda r, n: r.recommend_for_user(500, n),
+    lambda r, n: r.recommend_with_details(500, n),
+    lambda r, n: r.recommend_with_details_batch(np.array([500, 501]), n),
+    lambda r, n: r.recommend_for_user(-1, n, session=[1000, 1001]),
+    lambda r, n: r.recommend_for_session([1000], top_n=n),
+    lambda r, n: r.recommend_similar_products(1000, n),
+])
+@pytest.mark.parametrize("top_n", [0, -3])
+def test_non_positive_top_n_is_rejected_before_the_cache(call, top_n):
+    recommender = small_recommender(cache=RecommendationCache())
+    with pytest.raises(ValueError, match="top_n must be positive"):
+        call(recommender, top_n)
+    assert len(recommender.cache) == 0 and recommender.cache.misses == 0
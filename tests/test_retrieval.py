@@ -0,0 +1,75 @@
+import numpy as np
+
+from conftest import random_interactions, random_scorer
+from retrieval import ExactRetriever, build_seen_index, top_n_indices
+
+
+def _brute_force(scorer, seen, user, top_n):
+    scores = scorer.score(user, np.arange(scorer.n_items))
+    scores[seen[user].indices] = -np.inf
+    order = np.lexsort((np.arange(len(scores)), -scores))
+    return order[np.isfinite(scores[order])][:top_n]
+
+
+def test_full_pool_matches_brute_force_and_skips_seen_items():
+    users, items, _ = random_interactions()
+    scorer = random_scorer()
+    seen = build_seen_index(users, items, scorer.n_users, scorer.n_items)
+    retriever = ExactRetriever(scorer, seen, pool_size=None)
+
+    top, scores = retriever.recommend_batch(np.arange(scorer.n_users), top_n=10)
+    for user in range(scorer.n_users):
+        assert not np.isin(top[user], seen[user].indices).any()
+        np.testing.assert_array_equal(top[user], _brute_force(scorer, seen, user, 10))
+        assert np.all(np.diff(scores[user]) <= 0)
+
+
+def test_rows_are_padded_when_few_items_are_unseen():
+    scorer = random_scorer(n_users=2, n_items=6)
+    seen = build_seen_index([0, 0, 0, 0], [0, 1, 2, 3], 2, 6)
+    items, scores = ExactRetriever(scorer, seen).recommend_batch(np.array([0, 1]), top_n=4)
+
+    assert sorted(items[0, :2]) == [4, 5]
+    np.testing.assert_array_equal(items[0, 2:], [-1, -1])
+    assert np.all(np.isneginf(scores[0, 2:]))
+    assert (items[1] >= 0).all()
+
+    single, single_scores = ExactRetriever(scorer, seen).recommend(0, top_n=4)
+    np.testing.assert_array_equal(single, items[0, :2])
+    np.testing.assert_allclose(single_scores, scores[0, :2])
+
+
+def test_ties_break_by_index_and_are_stable():
+    scores = np.array([1.0, 3.0, 3.0, 2.0, 3.0, 1.0])
+    np.testing.assert_array_equal(top_n_indices(scores, 4), [1, 2, 4, 3])
+    np.testing.assert_array_equal(top_n_indices(np.vstack([scores, scores[::-1]]), 2), [[1, 2], [1, 3]])
+    np.testing.assert_array_equal(top_n_indices(scores, 10), [1, 2, 4, 3, 0, 5])
+    assert top_n_indices(scores, 0).shape == (0,)
+
+
+def test_equal_scores_give_the_same_lists_every_call():
+    # Identical item factors and biases: every item ties for every user
+    scorer = random_scorer(n_users=5, n_items=30)
+    scorer.qi[:] = scorer.qi[0]
+    scorer.bi[:] = 0.0
+    seen = build_seen_index([0, 1], [3, 0], 5, 30)
+    retriever = ExactRetriever(scorer, seen, pool_size=10)
+
+    first, _ = retriever.recommend_batch(np.arange(5), top_n=5)
+    for _ in range(3):
+        again, _ = retriever.recommend_batch(np.arange(5), top_n=5)
+        np.testing.assert_array_equal(again, first)
+    np.testing.assert_array_equal(first[0], [0, 1, 2, 4, 5])
+    np.testing.assert_array_equal(first[1], [1, 2, 3, 4, 5])
+
+
+def test_default_is_full_catalog_and_the_svd_pre_filter_is_opt_in():
+    # NCF strongly prefers item 39, which has the worst SVD estimate
+    scorer = random_scorer(ncf_predict=lambda users, items: np.where(items == 39, 5.0, 1.0))
+    scorer.bi[39] = -10.0
+    seen = build_seen_index([], [], scorer.n_users, scorer.n_items)
+
+    top, _ = ExactRetriever(scorer, seen).recommend_batch(np.arange(5), top_n=3)
+    assert np.all(top[:, 0] == 39)
+    filtered, _ = ExactRetriever(scorer, seen, pool_size=5).recommend_batch(np.arange(5), top_n=3)
+    assert not np.isin(39, filtered)
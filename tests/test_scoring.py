@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from conftest import random_interactions, random_scorer
+from scoring import HybridScorer
+
+
+def test_svd_scores_match_surprise_predict():
+    surprise = pytest.importorskip("surprise")
+    pd = pytest.importorskip("pandas")
+    users, items, ratings = random_interactions()
+    train = pd.DataFrame({"user": users, "item": items, "rating": ratings})
+    trainset = surprise.Dataset.load_from_df(train, surprise.Reader(rating_scale=(1, 5))).build_full_trainset()
+    model = surprise.SVD(n_factors=8, random_state=0).fit(trainset)
+
+    # Two extra users / items the trainset has never seen fall back to the global mean
+    n_users, n_items = users.max() + 3, items.max() + 3
+    scorer = HybridScorer.from_surprise(model, n_users, n_items)
+    grid_users = np.arange(n_users)
+    grid_items = np.arange(n_items)
+    expected = np.array([[model.predict(u, i).est for i in grid_items] for u in grid_users])
+
+    np.testing.assert_allclose(scorer.svd_scores(grid_users, grid_items), expected, atol=1e-9)
+    np.testing.assert_allclose(scorer.svd_scores_all(grid_users), expected, atol=1e-9)
+    pairs = scorer.svd_scores_pairs(users[:50], items[:50])
+    np.testing.assert_allclose(pairs, [model.predict(u, i).est for u, i in zip(users[:50], items[:50])], atol=1e-9)
+
+
+def test_hybrid_blend_matches_keras_predict():
+    pytest.importorskip("tensorflow")
+    from ncf import NCFModel, safe_predict
+
+    model = NCFModel(60, 40, embedding_dim=8)
+    scorer = random_scorer(ncf_predict=lambda u, i: safe_predict(model, u, i), ncf_batch_size=7)
+    users = np.array([0, 5, 59])
+    candidates = np.array([[1, 2, 3], [39, 0, 7], [4, 4, 10]])
+
+    ncf = safe_predict(model, np.repeat(users, 3), candidates.reshape(-1)).reshape(3, 3)
+    svd = scorer.svd_scores(users, candidates)
+    np.testing.assert_allclose(scorer.ncf_scores(users, candidates), ncf, rtol=1e-6)
+    np.testing.assert_allclose(scorer.score_users(users, candidates), 0.6 * ncf + 0.4 * svd, rtol=1e-6)
+    np.testing.assert_allclose(scorer.predict_pairs(users, candidates[:, 0]), 0.6 * ncf[:, 0] + 0.4 * svd[:, 0],
+                               rtol=1e-6)
+
+
+def test_without_ncf_the_ncf_term_is_the_global_mean():
+    scorer = random_scorer()
+    scores = scorer.score_users(np.array([1, 2]), np.array([3, 4, 5]))
+    np.testing.assert_allclose(scores, 0.6 * 2.5 + 0.4 * scorer.svd_scores(np.array([1, 2]), np.array([3, 4, 5])))
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from catalog import ProductCatalog
+from search_index import ProductSearchIndex, tokenize
+
+CATEGORIES = ["electronics.smartphone", "electronics.audio.headphone", "computers.notebook",
+              "electronics.video.tv", "electronics"]
+BRANDS = ["samsung", "apple", "sony", "samsonite", "Generic Brand", "lg"]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    rng = np.random.default_rng(3)
+    n = 400
+    prices = np.where(rng.random(n) < 0.3, 0.0, rng.uniform(10, 500, n))
+    return ProductCatalog(np.arange(1000, 1000 + n), rng.integers(0, len(CATEGORIES), n), CATEGORIES,
+                          rng.integers(0, len(BRANDS), n), BRANDS, prices)
+
+
+def linear_scan(catalog, query):
+    """Rows whose brand, category or name contains the query, as the old search did"""
+    query = query.lower()
+    rows = []
+    for row in range(len(catalog)):
+        info = catalog.info(row)
+        fields = (str(info["category_code"]), str(info["brand"]), catalog.names[row])
+        if any(query in field.lower() for field in fields):
+            rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize("query", ["samsung", "sam", "SONY", "phone", "o", "audio.head", "apple headphone",
+                                   "smartphone", "tv", "nothing-matches", "lg Tv"])
+def test_substring_search_finds_the_linear_scan_matches(catalog, query):
+    index = ProductSearchIndex(catalog)
+    rows = index.search_rows(query, limit=len(catalog))
+    assert sorted(rows) == linear_scan(catalog, query)
+    assert len(set(rows.tolist())) == len(rows)
+
+
+@pytest.mark.parametrize("query", ["samsung", "s", "phone", "sony tv"])
+def test_ranking_is_deterministic_and_limit_takes_a_prefix(catalog, query):
+    index = ProductSearchIndex(catalog)
+    full = index.search_rows(query, limit=len(catalog))
+    for limit in (1, 5, 17):
+        np.testing.assert_array_equal(index.search_rows(query, limit=limit), full[:limit])
+    np.testing.assert_array_equal(ProductSearchIndex(catalog).search_rows(query, limit=len(catalog)), full)
+
+
+def _by_priority(catalog, rows):
+    rows = np.asarray(rows)
+    return rows[np.lexsort((rows, -catalog.priority[rows]))].tolist()
+
+
+def test_exact_then_prefix_then_infix_hits_each_by_priority(catalog):
+    index = ProductSearchIndex(catalog)
+    brand_rows = {brand: np.flatnonzero(catalog.brands[catalog.brand_codes] == brand) for brand in BRANDS}
+
+    # "sony" equals a token; "son" starts "sony" and is inside "samsonite"
+    assert index.search_rows("sony", limit=len(catalog)).tolist() == _by_priority(catalog, brand_rows["sony"])
+    assert index.search_rows("son", limit=len(catalog)).tolist() == (
+        _by_priority(catalog, brand_rows["sony"]) + _by_priority(catalog, brand_rows["samsonite"]))
+
+
+def test_prefix_mode_requires_terms_to_start_a_token(catalog):
+    index = ProductSearchIndex(catalog)
+    rows = index.search_rows("phone", limit=len(catalog), mode="prefix")
+    # "phone" is only ever inside "smartphone" / "headphone"
+    assert len(rows) == 0
+    rows = index.search_rows("head", limit=len(catalog), mode="prefix")
+    assert sorted(rows) == [r for r in range(len(catalog))
+                            if any(t.startswith("head") for t in tokenize(catalog.names[r]) +
+                                   tokenize(catalog.info(r)["category_code"]))]
+
+
+def test_search_returns_product_details(catalog):
+    results = ProductSearchIndex(catalog).search("apple", limit=3)
+    assert len(results) == 3
+    assert all(result["brand"] == "apple" for result in results)
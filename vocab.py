@@ -0,0 +1,75 @@
+# ===========================
+# ID Vocabulary
+# (raw id <-> dense code mapping without sklearn)
+# ===========================
+
+import numpy as np
+
+
+class IdVocabulary:
+    """Maps raw integer ids to dense codes 0..n-1 and back.
+
+    Code k is `classes[k]`, so a vocabulary built from `LabelEncoder.classes_`
+    reproduces the encoder exactly. Lookups go through a sorted view of the
+    classes (`np.searchsorted`); when the classes are already sorted, as
+    LabelEncoder's are, no permutation is stored.
+    """
+
+    def __init__(self, classes):
+        self.classes = np.asarray(classes)
+        if len(self.classes) < 2 or np.all(self.classes[1:] > self.classes[:-1]):
+            self._order = None
+            self._sorted = self.classes
+        else:
+            self._order = np.argsort(self.classes, kind="stable")
+            self._sorted = self.classes[self._order]
+
+    def __len__(self):
+        return len(self.classes)
+
+    def __contains__(self, raw_id):
+        return self.index_of(raw_id) >= 0
+
+    def index_of(self, raw_ids):
+        """Codes of raw ids (scalar or array); unknown or malformed ids map to -1"""
+        scalar = np.ndim(raw_ids) == 0
+        try:
+            raw = np.atleast_1d(np.asarray(raw_ids, dtype=self.classes.dtype))
+        except (TypeError, ValueError, OverflowError):
+            return -1 if scalar else np.full(np.shape(raw_ids), -1, dtype=np.int64)
+
+        codes = np.full(len(raw), -1, dtype=np.int64)
+        if len(self._sorted):
+            pos = np.minimum(np.searchsorted(self._sorted, raw), len(self._sorted) - 1)
+            found = self._sorted[pos] == raw
+            hits = pos[found] if self._order is None else self._order[pos[found]]
+            codes[found] = hits
+        return int(codes[0]) if scalar else codes
+
+    def extend(self, raw_ids):
+        """Codes for raw ids, appending unseen ids as new codes (in first-seen order)"""
+        raw = np.asarray(raw_ids, dtype=self.classes.dtype)
+        codes = self.index_of(raw)
+        missing = codes < 0
+        if not missing.any():
+            return codes
+
+        new_ids, first = np.unique(raw[missing], return_index=True)
+        new_ids = new_ids[np.argsort(first)]
+        start = len(self.classes)
+        self.classes = np.concatenate([self.classes, new_ids])
+
+        # Merge the new ids into the sorted view instead of re-sorting everything
+        new_codes = np.arange(start, len(self.classes))
+        order = np.argsort(new_ids)
+        positions = np.searchsorted(self._sorted, new_ids[order])
+        old_order = np.arange(start) if self._order is None else self._order
+        self._sorted = np.insert(self._sorted, positions, new_ids[order])
+        self._order = np.insert(old_order, positions, new_codes[order])
+
+        codes[missing] = self.index_of(raw[missing])
+        return codes
+
+    def ids_of(self, codes):
+        """Raw ids for an array of codes"""
+        return self.classes[np.asarray(codes, dtype=np.int64)]